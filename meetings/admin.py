@@ -1,8 +1,12 @@
+import json
+
 from django.contrib import admin
 from django.contrib.contenttypes.admin import GenericTabularInline
+from django.utils.html import format_html
 
 from .models import (Division, Office, Official, Email, Phone, Address,
         SocialMediaChannel, Website, ContactAttempt, Meeting, Source)
+from .forms import SourceForm
 
 
 admin.site.register(Division)
@@ -36,6 +40,7 @@ class WebsiteInline(admin.TabularInline):
 
 class SourceInline(GenericTabularInline):
     model = Source
+    form = SourceForm
     extra = 1
 
 
@@ -43,6 +48,12 @@ class SourceInline(GenericTabularInline):
 class MeetingAdmin(admin.ModelAdmin):
     inlines = [SourceInline,]
     search_fields = ['official__name']
+    readonly_fields = ('parsed_notes',)
+
+    def parsed_notes(self, obj):
+        return format_html('<pre>{}</pre>',
+            json.dumps(obj.fields_from_notes(), indent=2, sort_keys=True))
+    parsed_notes.short_description = "Fields parsed from notes"
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
             if db_field.name == "official":
@@ -1,12 +1,187 @@
+import base64
+import binascii
 from datetime import datetime
+import hashlib
 
-from meetings.models import Official
+from django.conf.urls import url
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from meetings.bulk import clean_meeting, clean_source_urls, create_meetings
+from meetings.forms import OfficialMeetingForm
+from meetings.models import Meeting, Official, Source
+from meetings.search import search
+from meetings.versions import get_data_version, get_last_modified
 
 from restless.constants import OK
 from restless.dj import DjangoResource
+from restless.exceptions import BadRequest, Forbidden
 from restless.preparers import FieldsPreparer
 
-class OfficialResource(DjangoResource):
+
+def encode_cursor(direction, pk):
+    """
+    Encode a pagination cursor
+
+    Args:
+        direction (string): Either 'next' to page forward from the object
+            with primary key ``pk`` or 'prev' to page backward from it.
+        pk (int): Primary key of the last object seen in ``direction``.
+
+    Returns:
+        Opaque string that can be passed in the ``cursor`` query parameter.
+
+    """
+    raw = "{}:{}".format(direction, pk).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a pagination cursor created with ``encode_cursor()``
+
+    Returns:
+        Tuple of direction and primary key.
+
+    Raises:
+        BadRequest if the cursor isn't valid.
+
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        direction, pk = raw.split(':')
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise BadRequest("Invalid cursor '{}'".format(cursor))
+
+    if direction not in ('next', 'prev'):
+        raise BadRequest("Invalid cursor '{}'".format(cursor))
+
+    return direction, pk
+
+
+class Page(object):
+    """A page of objects and cursors for the pages around it"""
+
+    def __init__(self, objects, limit, next_cursor=None, prev_cursor=None):
+        self.objects = objects
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def paginate(qs, cursor=None, limit=100):
+    """
+    Get a page of objects from a queryset using keyset pagination
+
+    Pages are ordered by primary key and each page is selected with a
+    range condition on the primary key rather than an ``OFFSET``, so
+    fetching a page costs the same no matter how deep into the results
+    it is.
+
+    Args:
+        qs (QuerySet): Filtered objects to page through.
+        cursor (string): Cursor from a previous page, or ``None`` for the
+            first page.
+        limit (int): Maximum number of objects in the page.
+
+    Returns:
+        A ``Page``.
+
+    """
+    if cursor is None:
+        direction, pk = 'next', None
+    else:
+        direction, pk = decode_cursor(cursor)
+
+    if direction == 'next':
+        if pk is not None:
+            qs = qs.filter(pk__gt=pk)
+        # Fetch an extra object to find out if there's another page
+        objects = list(qs.order_by('pk')[:limit + 1])
+        has_more = len(objects) > limit
+        objects = objects[:limit]
+        next_cursor = (encode_cursor('next', objects[-1].pk)
+                       if has_more else None)
+        prev_cursor = (encode_cursor('prev', objects[0].pk)
+                       if pk is not None and objects else None)
+
+    else:
+        objects = list(qs.filter(pk__lt=pk).order_by('-pk')[:limit + 1])
+        has_more = len(objects) > limit
+        objects = list(reversed(objects[:limit]))
+        next_cursor = (encode_cursor('next', objects[-1].pk)
+                       if objects else None)
+        prev_cursor = (encode_cursor('prev', objects[0].pk)
+                       if has_more else None)
+
+    return Page(objects, limit, next_cursor, prev_cursor)
+
+
+def iterate_in_chunks(qs, chunk_size=100, load_related=None):
+    """
+    Iterate over a queryset, fetching it in keyset-paginated chunks
+
+    Unlike ``QuerySet.iterator()``, each chunk is a separate query, so
+    ``select_related()`` and ``prefetch_related()`` lookups on ``qs`` are
+    applied one chunk at a time and only one chunk is held in memory.
+    ``load_related``, if given, is called with the objects of each chunk
+    to load anything else they need.
+
+    """
+    cursor = None
+    while True:
+        page = paginate(qs, cursor, chunk_size)
+        if load_related is not None:
+            load_related(page.objects)
+
+        for obj in page.objects:
+            yield obj
+
+        if page.next_cursor is None:
+            break
+
+        cursor = page.next_cursor
+
+
+class BaseResource(DjangoResource):
+    """Resource that can be read from any origin and is paginated"""
+
+    # Number of objects in a page when the ``limit`` query parameter isn't
+    # specified
+    default_limit = 100
+
+    # Maximum number of objects that can be requested in a page
+    max_limit = 500
+
+    def build_response(self, data, status=OK):
+        resp = super(BaseResource, self).build_response(data, status)
+        resp['Access-Control-Allow-Origin'] = '*'
+        return resp
+
+    def get_limit(self):
+        limit = self.request.GET.get('limit')
+        if limit is None:
+            return self.default_limit
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise BadRequest("Invalid limit '{}'".format(limit))
+
+        if limit < 1:
+            raise BadRequest("Invalid limit '{}'".format(limit))
+
+        return min(limit, self.max_limit)
+
+
+class OfficialResource(BaseResource):
     preparer = FieldsPreparer(fields={
         'id': 'id',
         'name': 'name',
@@ -15,14 +190,224 @@ class OfficialResource(DjangoResource):
         'meeting_info_source': 'meeting_info_source',
     })
 
+    # Nested fields that are prepared in addition to the fields of
+    # ``preparer``, unless the ``fields`` query parameter says otherwise
+    default_nested_fields = ('meetings', 'social_media', 'office')
+
+    # Relations that can be requested with the ``include_field`` query
+    # parameter
+    extra_fields = set(['phones', 'emails'])
+
+    # Number of officials fetched from the database at a time when
+    # streaming the export
+    export_chunk_size = 100
+
+    http_methods = dict(DjangoResource.http_methods, export={
+        'GET': 'export',
+    })
+
+    # Number of seconds to cache serialized responses.  Cached responses
+    # are keyed by the data version, so they never go stale.
+    cache_timeout = 60 * 60 * 24
+
+    # Endpoints whose serialized responses are cached
+    cached_endpoints = ('list',)
+
+    @classmethod
+    def urls(cls, name_prefix=None):
+        urlpatterns = super(OfficialResource, cls).urls(name_prefix)
+        return [
+            url(r'^export/$', cls.as_view('export'),
+                name=cls.build_url_name('export', name_prefix)),
+        ] + urlpatterns
+
+    def handle(self, endpoint, *args, **kwargs):
+        """
+        Handle a request, answering conditional and repeated GETs from cache
+
+        Responses are tagged with the current data version, which changes
+        whenever officials or their meetings are saved.  Requests whose
+        validators match the current version get a 304 response and
+        requests for data that has already been serialized get the cached
+        body, neither of which touches the database.
+
+        """
+        self.endpoint = endpoint
+        if self.request_method() != 'GET':
+            return super(OfficialResource, self).handle(endpoint, *args,
+                **kwargs)
+
+        version = get_data_version()
+        etag = self.get_etag(version)
+        last_modified = get_last_modified(version)
+
+        response = get_conditional_response(self.request, etag=etag,
+            last_modified=last_modified)
+        if response is not None:
+            response['Access-Control-Allow-Origin'] = '*'
+
+        elif endpoint in self.cached_endpoints:
+            cache_key = self.get_cache_key(version)
+            content = cache.get(cache_key)
+            if content is not None:
+                response = self.build_response(content)
+
+            else:
+                response = super(OfficialResource, self).handle(endpoint,
+                    *args, **kwargs)
+                if response.status_code == OK:
+                    cache.set(cache_key, response.content, self.cache_timeout)
+
+        else:
+            response = super(OfficialResource, self).handle(endpoint, *args,
+                **kwargs)
+
+        if response.status_code in (OK, 304):
+            response['ETag'] = quote_etag(etag)
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
+
+    def get_etag(self, version):
+        """Get an entity tag for the response to the current request"""
+        digest = hashlib.md5(
+            self.request.get_full_path().encode('utf-8')).hexdigest()
+        return "{}-{}".format(version, digest)
+
+    def get_cache_key(self, version):
+        return 'meetings:api:{}'.format(self.get_etag(version))
+
     def build_response(self, data, status=OK):
-        resp = super(OfficialResource, self).build_response(data, status)
-        resp['Access-Control-Allow-Origin'] = '*'
-        return resp
+        if self.endpoint == 'export' and status == OK:
+            resp = StreamingHttpResponse(data,
+                content_type='application/x-ndjson')
+            resp['Access-Control-Allow-Origin'] = '*'
+            return resp
 
-    def list(self):
-        qs = Official.objects.all()
+        return super(OfficialResource, self).build_response(data, status)
+
+    def serialize(self, method, endpoint, data):
+        if endpoint == 'export':
+            return self.serialize_ndjson(data)
+
+        return super(OfficialResource, self).serialize(method, endpoint, data)
+
+    def serialize_ndjson(self, data):
+        """
+        Lazily serialize officials as newline-delimited JSON
+
+        Returns:
+            Generator that yields one serialized official per line.
+
+        """
+        for item in data:
+            yield self.serializer.serialize(self.prepare(item)) + '\n'
+
+    def get_include_fields(self):
+        include_fields = []
+        for fieldname in self.request.GET.getlist('include_field'):
+            if fieldname in self.extra_fields and fieldname not in include_fields:
+                include_fields.append(fieldname)
+
+        return include_fields
+
+    def get_fields(self):
+        """
+        Get the names of the fields to include for each official
+
+        By default, these are the fields of ``preparer``, the nested fields
+        in ``default_nested_fields`` and any extra fields requested with
+        ``include_field``.  A comma-separated ``fields`` query parameter
+        replaces the fields of ``preparer`` and the default nested fields.
+
+        """
+        if hasattr(self, '_fields'):
+            return self._fields
+
+        available_fields = (list(self.preparer.fields.keys()) +
+            list(self.default_nested_fields) + sorted(self.extra_fields))
+        fields_param = self.request.GET.get('fields')
+        if fields_param is None:
+            fields = list(self.preparer.fields.keys()) + \
+                list(self.default_nested_fields)
+
+        else:
+            fields = []
+            for fieldname in fields_param.split(','):
+                fieldname = fieldname.strip()
+                if fieldname not in available_fields:
+                    raise BadRequest("Invalid field '{}'".format(fieldname))
+
+                if fieldname not in fields:
+                    fields.append(fieldname)
 
+        for fieldname in self.get_include_fields():
+            if fieldname not in fields:
+                fields.append(fieldname)
+
+        self._fields = fields
+        return fields
+
+    def get_field_preparer(self):
+        """Get a preparer for the requested fields of ``preparer``"""
+        if not hasattr(self, '_field_preparer'):
+            fields = self.get_fields()
+            self._field_preparer = FieldsPreparer(fields={
+                k: v for k, v in self.preparer.fields.items() if k in fields
+            })
+
+        return self._field_preparer
+
+    def get_prefetches(self, fields):
+        prefetches = []
+
+        if 'meetings' in fields:
+            prefetches.extend([
+                Prefetch('meetings',
+                    queryset=Meeting.objects.order_by('date')),
+            ])
+
+        if 'social_media' in fields:
+            prefetches.append('channels')
+
+        prefetches.extend(f for f in fields if f in self.extra_fields)
+
+        return prefetches
+
+    def get_only_fields(self, fields):
+        """Get the model fields needed to prepare the requested fields"""
+        only_fields = ['id']
+        only_fields.extend(self.preparer.fields[f] for f in fields
+                           if f in self.preparer.fields)
+
+        if 'office' in fields:
+            only_fields.extend([
+                'office',
+                'office__name',
+                'office__division__ocd_id',
+                'office__division__name',
+            ])
+
+        return only_fields
+
+    def get_queryset(self):
+        """
+        Get officials with every relation used by ``prepare()`` loaded up front
+
+        Only the columns and relations needed for the requested fields are
+        loaded.  Listing the officials takes a fixed number of queries,
+        regardless of the number of officials.
+
+        """
+        fields = self.get_fields()
+        qs = Official.objects.only(*self.get_only_fields(fields))
+
+        if 'office' in fields:
+            qs = qs.select_related('office__division')
+
+        return qs.prefetch_related(*self.get_prefetches(fields))
+
+    def filter_queryset(self, qs):
         without_meeting_since = self.request.GET.get('without_meeting_since')
         if without_meeting_since is not None:
             since_date = datetime.strptime(without_meeting_since,
@@ -35,23 +420,53 @@ class OfficialResource(DjangoResource):
 
         return qs
 
+    def list(self):
+        qs = self.filter_queryset(self.get_queryset())
+        self.page = paginate(qs, self.request.GET.get('cursor'),
+            self.get_limit())
+        self.load_related(self.page.objects)
+        return self.page.objects
+
+    def export(self):
+        """
+        Get every matching official, for streaming as newline-delimited JSON
+        """
+        qs = self.filter_queryset(self.get_queryset())
+        return iterate_in_chunks(qs, self.export_chunk_size,
+            self.load_related)
+
+    def load_related(self, officials):
+        """Load what can't be prefetched by ``get_queryset()``"""
+        if 'meetings' in self.get_fields():
+            # Only the URLs of the sources are needed, so they're loaded
+            # without creating a ``Source`` for each one
+            Source.objects.prefetch_urls(
+                m for o in officials for m in o.meetings.all())
+
+    def wrap_list_response(self, data):
+        response = super(OfficialResource, self).wrap_list_response(data)
+        response['meta'] = {
+            'limit': self.page.limit,
+            'next': self.page.next_cursor,
+            'prev': self.page.prev_cursor,
+        }
+        return response
+
     def prepare(self, data):
-        prepped = super(OfficialResource, self).prepare(data)
-        prepped['meetings'] = self._prepare_meetings(data)
-        prepped['social_media'] = self._prepare_social_media(data)
-        prepped['office'] = self._prepare_office(data)
-
-        extra_fields = set(['phones', 'emails'])
-        include_fields = self.request.GET.getlist('include_field')
-        for fieldname in include_fields:
-            if fieldname in extra_fields:
+        field_preparer = self.get_field_preparer()
+        # ``FieldsPreparer`` returns the object itself when it has no fields
+        prepped = field_preparer.prepare(data) if field_preparer.fields else {}
+
+        for fieldname in self.get_fields():
+            if fieldname not in self.preparer.fields:
                 preparer = getattr(self, '_prepare_{0}'.format(fieldname))
                 prepped[fieldname] = preparer(data)
 
         return prepped
 
     def _prepare_meetings(self, data):
-        return [self._prepare_meeting(m) for m in data.meetings.order_by('date')]
+        # Meetings are prefetched in date order by ``get_queryset()``
+        return [self._prepare_meeting(m) for m in data.meetings.all()]
 
     def _prepare_meeting(self, meeting):
         prepared = {
@@ -61,7 +476,8 @@ class OfficialResource(DjangoResource):
             'meeting_type': meeting.meeting_type,
             'location': meeting.location,
             'event_website': meeting.event_website,
-            'sources': [s.url for s in meeting.sources.all()],
+            'sources': meeting.source_urls,
+            'notes_fields': meeting.fields_from_notes(),
         }
 
         return prepared
@@ -99,3 +515,237 @@ class OfficialResource(DjangoResource):
 
     def _prepare_email(self, data):
         return data.address
+
+
+class SearchResource(BaseResource):
+    """
+    Officials and meetings matching the ``q`` query parameter
+
+    Results are ordered by rank, best matches first, and paginated with the
+    ``page`` and ``limit`` query parameters.
+
+    """
+    default_limit = 20
+    max_limit = 100
+
+    http_methods = {
+        'list': {
+            'GET': 'list',
+        },
+    }
+
+    def get_page_number(self):
+        page = self.request.GET.get('page', '1')
+        try:
+            page = int(page)
+        except ValueError:
+            raise BadRequest("Invalid page '{}'".format(page))
+
+        if page < 1:
+            raise BadRequest("Invalid page '{}'".format(page))
+
+        return page
+
+    def list(self):
+        self.page_number = self.get_page_number()
+        self.limit = self.get_limit()
+        offset = (self.page_number - 1) * self.limit
+
+        # Fetch an extra result to find out if there's another page
+        results = search(self.request.GET.get('q', ''))[
+            offset:offset + self.limit + 1]
+        self.has_next = len(results) > self.limit
+
+        return results[:self.limit]
+
+    def wrap_list_response(self, data):
+        response = super(SearchResource, self).wrap_list_response(data)
+        response['meta'] = {
+            'limit': self.limit,
+            'page': self.page_number,
+            'next': self.page_number + 1 if self.has_next else None,
+            'prev': self.page_number - 1 if self.page_number > 1 else None,
+        }
+        return response
+
+    def prepare(self, data):
+        official = data.official
+        prepared = {
+            'type': 'meeting' if data.meeting_id else 'official',
+            'rank': data.rank,
+            'official': {
+                'id': official.id,
+                'name': official.name,
+                'office': official.office.name,
+                'division': official.office.division.name,
+            },
+            'meeting': None,
+        }
+
+        if data.meeting_id:
+            prepared['meeting'] = {
+                'id': data.meeting.id,
+                'date': data.meeting.date,
+                'location': data.meeting.location,
+            }
+
+        return prepared
+
+
+class InvalidBatch(BadRequest):
+    """Some of the items in a batch aren't valid"""
+
+    def __init__(self, msg, items):
+        super(InvalidBatch, self).__init__(msg)
+        self.items = items
+
+
+class MeetingBatchResource(BaseResource):
+    """
+    Creates many meetings, with their sources, in one request
+
+    The request body is a JSON array of meetings.  Each meeting has the ID
+    of its ``official``, the fields of ``OfficialMeetingForm`` and an
+    optional array of ``sources`` URLs.  For example::
+
+        [
+            {
+                "official": 12,
+                "date": "2017-08-01",
+                "time": "18:30",
+                "meeting_type": "in-person",
+                "location": "Public library",
+                "sources": ["https://example.com/town-hall"]
+            }
+        ]
+
+    Either every meeting is created or, if any of them are invalid, none
+    are and the errors of each invalid meeting are returned along with its
+    index in the array.
+
+    """
+    # Maximum number of meetings in a request
+    max_batch_size = 5000
+
+    http_methods = {
+        'list': {
+            'POST': 'create',
+        },
+    }
+
+    def is_authenticated(self):
+        if not self.request.user.is_authenticated():
+            return False
+
+        # restless exempts its views from CSRF protection, but this resource
+        # is authenticated by the session cookie, so other sites could post
+        # to it on behalf of a logged-in user without this check
+        if CsrfViewMiddleware().process_view(self.request, None, (), {}):
+            raise Forbidden("CSRF verification failed")
+
+        return True
+
+    def deserialize_list(self, body):
+        try:
+            data = super(MeetingBatchResource, self).deserialize_list(body)
+        except ValueError:
+            raise BadRequest("Invalid JSON")
+
+        if not isinstance(data, list):
+            raise BadRequest("Expected an array of meetings")
+
+        if len(data) > self.max_batch_size:
+            raise BadRequest("Batches can't have more than {} meetings".format(
+                self.max_batch_size))
+
+        return data
+
+    def build_error(self, err):
+        if isinstance(err, InvalidBatch):
+            body = self.serializer.serialize({
+                'error': err.args[0],
+                'items': err.items,
+            })
+            return self.build_response(body, status=err.status)
+
+        return super(MeetingBatchResource, self).build_error(err)
+
+    def get_officials(self, items):
+        """Get the officials of every item in one query"""
+        ids = set()
+        for item in items:
+            if isinstance(item, dict):
+                official_id = item.get('official')
+                if isinstance(official_id, int) and \
+                        not isinstance(official_id, bool):
+                    ids.add(official_id)
+
+        return Official.objects.only('id').in_bulk(ids)
+
+    def clean_item(self, item, officials):
+        """
+        Validate an item in the batch
+
+        Returns:
+            Tuple of an unsaved meeting and its source URLs, or of ``None``
+            and a dictionary of errors keyed by field name.
+
+        """
+        if not isinstance(item, dict):
+            return None, {'__all__': ["Expected an object"]}
+
+        errors = {}
+        official = officials.get(item.get('official'))
+        if official is None:
+            errors['official'] = ["No official with ID {}".format(
+                item.get('official'))]
+
+        data = {}
+        for name in OfficialMeetingForm.Meta.fields:
+            value = item.get(name)
+            if value is None or isinstance(value, str):
+                data[name] = value
+            else:
+                errors[name] = ["Expected a string"]
+
+        meeting, meeting_errors = clean_meeting(data)
+        for name, field_errors in meeting_errors.items():
+            errors.setdefault(name, field_errors)
+
+        sources = item.get('sources', [])
+        if not isinstance(sources, list):
+            errors['sources'] = ["Expected an array of URLs"]
+        else:
+            try:
+                source_urls = clean_source_urls(sources)
+            except ValidationError as e:
+                errors['sources'] = [str(m) for m in e.messages]
+
+        if errors:
+            return None, errors
+
+        meeting.official = official
+        return meeting, source_urls
+
+    def create(self):
+        officials = self.get_officials(self.data)
+        meetings = []
+        source_urls = []
+        invalid = []
+        for index, item in enumerate(self.data):
+            meeting, result = self.clean_item(item, officials)
+            if meeting is None:
+                invalid.append({'index': index, 'errors': result})
+            else:
+                meetings.append(meeting)
+                source_urls.append(result)
+
+        if invalid:
+            raise InvalidBatch("{} of {} meetings are invalid".format(
+                len(invalid), len(self.data)), invalid)
+
+        meetings = create_meetings(meetings, source_urls)
+        return {
+            'count': len(meetings),
+            'ids': [meeting.pk for meeting in meetings],
+        }
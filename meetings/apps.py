@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class MeetingsConfig(AppConfig):
     name = 'meetings'
+
+    def ready(self):
+        # Connect signal handlers
+        from . import signals  # noqa
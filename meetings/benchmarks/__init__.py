@@ -0,0 +1,8 @@
+"""
+Benchmarks for the queries and views that serve officials and meetings
+
+The benchmarks fill a throwaway test database with synthetic data, so they
+can be run against any configured database.  Run them with the
+``benchmark`` management command.
+
+"""
@@ -0,0 +1,188 @@
+"""Generate synthetic officials, meetings and contact attempts"""
+from datetime import timedelta
+import random
+
+from django.contrib.contenttypes.models import ContentType
+
+from meetings.bulk import bulk_create
+from meetings.models import (ContactAttempt, Division, Email, Meeting,
+    Office, Official, OfficialSummary, Phone, RepresentativeClaim,
+    SocialMediaChannel, Source, SourceURL)
+from meetings.search import index_meetings, index_officials
+
+STATES = [
+    'al', 'ak', 'az', 'ar', 'ca', 'co', 'ct', 'de', 'fl', 'ga',
+    'hi', 'id', 'il', 'in', 'ia', 'ks', 'ky', 'la', 'me', 'md',
+    'ma', 'mi', 'mn', 'ms', 'mo', 'mt', 'ne', 'nv', 'nh', 'nj',
+    'nm', 'ny', 'nc', 'nd', 'oh', 'ok', 'or', 'pa', 'ri', 'sc',
+    'sd', 'tn', 'tx', 'ut', 'vt', 'va', 'wa', 'wv', 'wi', 'wy',
+]
+
+PARTIES = ['Democratic', 'Republican']
+
+MEETING_INFO_SOURCES = ['', '', '', "Twitter", "Social media"]
+
+
+def create_officials(districts):
+    """
+    Create divisions, offices and officials
+
+    Args:
+        districts (list): Tuples of OCD IDs, division names and office
+            names.
+
+    Returns:
+        List of the officials, one for each district.
+
+    """
+    divisions = []
+    for ocd_id, division_name, office_name in districts:
+        division = Division(ocd_id=ocd_id, name=division_name)
+        division.parse_ocd_id()
+        divisions.append(division)
+    divisions = bulk_create(Division, divisions)
+
+    offices = bulk_create(Office, [
+        Office(division=division, name=office_name)
+        for division, (ocd_id, division_name, office_name)
+        in zip(divisions, districts)
+    ])
+
+    officials = bulk_create(Official, [
+        Official(
+            name="Official {}".format(office.pk),
+            party=random.choice(PARTIES),
+            office=office,
+            # Some officials promote their meetings on social media
+            meeting_info_source=random.choice(MEETING_INFO_SOURCES),
+        )
+        for office in offices
+    ])
+    OfficialSummary.objects.refresh([o.pk for o in officials])
+    index_officials([o.pk for o in officials])
+    RepresentativeClaim.objects.add([o.pk for o in officials])
+
+    return officials
+
+
+def create_us_reps(count):
+    """Create officials for congressional districts spread across the states"""
+    districts = []
+    for i in range(count):
+        state = STATES[i % len(STATES)]
+        number = i // len(STATES) + 1
+        name = "{} congressional district {}".format(state.upper(), number)
+        districts.append((
+            "ocd-division/country:us/state:{}/cd:{}".format(state, number),
+            name,
+            "United States House of Representatives {}".format(name),
+        ))
+
+    return create_officials(districts)
+
+
+def create_state_legislators(count):
+    """
+    Create officials for state legislative districts
+
+    Districts alternate between lower and upper chambers and are spread
+    across the states.
+
+    """
+    districts = []
+    for i in range(count):
+        state = STATES[i % len(STATES)]
+        chamber = ('sldl', 'sldu')[i // len(STATES) % 2]
+        number = i // (len(STATES) * 2) + 1
+        name = "{} {} district {}".format(state.upper(),
+            "House" if chamber == 'sldl' else "Senate", number)
+        districts.append((
+            "ocd-division/country:us/state:{}/{}:{}".format(state, chamber,
+                number),
+            name,
+            "{} State Legislature".format(name),
+        ))
+
+    return create_officials(districts)
+
+
+def create_contact_details(officials):
+    """Create a phone number, e-mail address and Twitter account per official"""
+    Phone.objects.bulk_create([
+        Phone(official=official, phone="(202) 555-{:04d}".format(
+            official.pk % 10000))
+        for official in officials
+    ])
+    Email.objects.bulk_create([
+        Email(official=official,
+            address="official{}@example.com".format(official.pk))
+        for official in officials
+    ])
+    SocialMediaChannel.objects.bulk_create([
+        SocialMediaChannel(official=official, channel_type='Twitter',
+            channel_id="Official{}".format(official.pk))
+        for official in officials
+    ])
+
+
+def create_meetings(officials, count, start_date, end_date):
+    """
+    Create meetings, each with a source, for officials
+
+    Args:
+        officials (list): Officials to create meetings for.
+        count (int): Number of meetings to create for each official.
+        start_date (date): Earliest date of a meeting.
+        end_date (date): Latest date of a meeting.
+
+    """
+    days = (end_date - start_date).days
+    meetings = [
+        Meeting(
+            official=official,
+            date=start_date + timedelta(days=random.randint(0, days)),
+            meeting_type=random.choice(Meeting.MEETING_TYPE_CHOICES)[0],
+            location="{} Main Street".format(random.randint(1, 999)),
+        )
+        for official in officials
+        for i in range(count)
+    ]
+    for meeting in meetings:
+        meeting.parse_notes()
+
+    meetings = bulk_create(Meeting, meetings)
+
+    content_type = ContentType.objects.get_for_model(Meeting)
+    url_ids = SourceURL.objects.ids_for(
+        "https://example.com/meetings/{}".format(meeting.pk)
+        for meeting in meetings)
+    Source.objects.bulk_create([
+        Source(
+            source_url_id=url_ids[
+                "https://example.com/meetings/{}".format(meeting.pk)],
+            content_type=content_type,
+            object_id=meeting.pk,
+        )
+        for meeting in meetings
+    ])
+    OfficialSummary.objects.refresh([o.pk for o in officials])
+    index_meetings([m.pk for m in meetings])
+
+    return meetings
+
+
+def create_contact_attempts(officials, count, user):
+    """Create contact attempts by a user for officials"""
+    contact_attempts = bulk_create(ContactAttempt, [
+        ContactAttempt(
+            official=official,
+            user=user,
+            method=random.choice(ContactAttempt.METHOD_CHOICES)[0],
+            contacted=random.choice([True, False]),
+        )
+        for official in officials
+        for i in range(count)
+    ])
+    OfficialSummary.objects.refresh([o.pk for o in officials])
+
+    return contact_attempts
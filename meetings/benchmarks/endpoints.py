@@ -0,0 +1,140 @@
+"""
+How the API and pages perform with a realistic amount of data
+
+The database is filled with every House district, state legislators and
+years of meetings, with sources, and contact attempts.  Each scenario is
+timed with a cold cache, so the numbers reflect the queries and rendering
+rather than cached responses.
+
+"""
+from collections import OrderedDict
+from datetime import date
+from itertools import product
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+
+from meetings.models import Official
+
+from .data import (create_contact_attempts, create_contact_details,
+    create_meetings, create_state_legislators, create_us_reps)
+from .utils import measure
+
+SINCE_DATE = date(2017, 1, 1)
+
+API_FILTERS = OrderedDict([
+    ("no filter", {}),
+    ("without_meeting_since", {
+        'without_meeting_since': SINCE_DATE.strftime('%Y-%m-%d'),
+    }),
+    ("through_twitter", {'through_twitter': 'true'}),
+    ("both filters", {
+        'without_meeting_since': SINCE_DATE.strftime('%Y-%m-%d'),
+        'through_twitter': 'true',
+    }),
+])
+
+API_INCLUDE_FIELDS = ([], ['phones'], ['emails'], ['phones', 'emails'])
+
+
+def create_data(officials, legislators, meetings, contact_attempts):
+    """
+    Fill the database
+
+    Args:
+        officials (int): Number of U.S. Representatives.
+        legislators (int): Number of state legislators.
+        meetings (int): Number of meetings per representative.  State
+            legislators get a tenth as many.
+        contact_attempts (int): Number of contact attempts per
+            representative.
+
+    Returns:
+        Tuple of the representatives and the user who made the contact
+        attempts.
+
+    """
+    user = get_user_model().objects.create_user('benchmark@example.com')
+    reps = create_us_reps(officials)
+    state_legislators = create_state_legislators(legislators)
+    create_contact_details(reps + state_legislators)
+    # Leave a quarter of the representatives without meetings or contact
+    # attempts for the call page to pick from
+    create_meetings(reps[:len(reps) * 3 // 4], meetings, date(2010, 1, 1),
+        date(2018, 12, 31))
+    create_meetings(state_legislators, meetings // 10, date(2010, 1, 1),
+        date(2018, 12, 31))
+    create_contact_attempts(reps[:len(reps) // 2], contact_attempts, user)
+
+    return reps, user
+
+
+def get_api_scenarios(client):
+    scenarios = []
+    for (filter_name, params), include_fields in product(
+            API_FILTERS.items(), API_INCLUDE_FIELDS):
+        name = "API {}".format(filter_name)
+        if include_fields:
+            name += " + {}".format(", ".join(include_fields))
+
+        data = dict(params, include_field=include_fields)
+        scenarios.append((name,
+            lambda data=data: client.get('/api/v1/officials/', data)))
+
+    return scenarios
+
+
+def get_page_scenarios(client, rep):
+    detail_url = '/meetings/officials/{}-{}/'.format(rep.pk, rep.slug)
+
+    # The official that's posted about is picked outside of the timing
+    posted = {}
+
+    def pick_uncontacted():
+        official = Official.objects.us_reps().without_meetings()\
+            .without_contact_attempts().first()
+        posted['data'] = {
+            'representative': official.pk,
+            'contact_attempt-method': 'phone',
+            'contact_attempt-contacted': 'on',
+            'contact_attempt-notes': "Left a voicemail",
+            'meeting_info_source-meeting_info_source': "",
+        }
+        cache.clear()
+
+    return [
+        ("List", None, lambda: client.get('/meetings/')),
+        ("List without_meetings_since", None, lambda: client.get(
+            '/meetings/', {
+                'without_meetings_since': SINCE_DATE.strftime('%Y-%m-%d'),
+            })),
+        ("Detail", None, lambda: client.get(detail_url)),
+        ("Call rep GET", None, lambda: client.get('/meetings/call-us-rep/')),
+        ("Call rep POST", pick_uncontacted, lambda: client.post(
+            '/meetings/call-us-rep/', posted['data'])),
+    ]
+
+
+def run(officials=435, repeat=5, legislators=7000, meetings=50,
+        contact_attempts=5, **kwargs):
+    """
+    Run the scenarios
+
+    Returns:
+        Ordered dictionary of results keyed by scenario name.
+
+    """
+    reps, user = create_data(officials, legislators, meetings,
+        contact_attempts)
+    client = Client()
+    client.force_login(user)
+
+    results = OrderedDict()
+    for name, func in get_api_scenarios(client):
+        results[name] = measure(func, repeat, setup=cache.clear)
+
+    for name, setup, func in get_page_scenarios(client, reps[0]):
+        results[name] = measure(func, repeat, setup=setup or cache.clear)
+
+    return results
@@ -0,0 +1,69 @@
+"""
+How the officials filters scale as meeting history grows
+
+Meetings and contact attempts are added in steps and the filters are timed
+after each step.  All the meetings are before the date the filters use, so
+every filter returns the same officials at every step.
+
+"""
+from collections import OrderedDict
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+
+from meetings.models import Official
+
+from .data import create_contact_attempts, create_meetings, create_us_reps
+from .utils import measure
+
+HISTORY_SIZES = (0, 10, 50, 100)
+
+SINCE_DATE = date(2017, 1, 1)
+
+
+def get_scenarios(client):
+    since = SINCE_DATE.strftime('%Y-%m-%d')
+    return [
+        ("API without_meeting_since", lambda: client.get(
+            '/api/v1/officials/', {
+                'without_meeting_since': since,
+                'fields': 'id,name',
+            })),
+        ("List without_meetings_since", lambda: client.get('/meetings/', {
+            'without_meetings_since': since,
+        })),
+        ("without_meetings()", lambda: list(
+            Official.objects.without_meetings().values_list('pk'))),
+        ("without_contact_attempts()", lambda: list(
+            Official.objects.without_contact_attempts().values_list('pk'))),
+    ]
+
+
+def run(officials=100, repeat=5, history_sizes=HISTORY_SIZES, **kwargs):
+    """
+    Run the scenarios at each history size
+
+    Returns:
+        Ordered dictionary of results keyed by scenario name and history
+        size.
+
+    """
+    reps = create_us_reps(officials)
+    user = get_user_model().objects.create_user('benchmark@example.com')
+    client = Client()
+
+    results = OrderedDict()
+    history_size = 0
+    for size in history_sizes:
+        create_meetings(reps, size - history_size,
+            date(2010, 1, 1), date(2016, 12, 31))
+        create_contact_attempts(reps, size - history_size, user)
+        history_size = size
+
+        for name, func in get_scenarios(client):
+            results["{} (history {})".format(name, size)] = measure(func,
+                repeat, setup=cache.clear)
+
+    return results
@@ -0,0 +1,83 @@
+import math
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    """Get a percentile of a list of values, using the nearest-rank method"""
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def measure(func, repeat=5, setup=None):
+    """
+    Time calls to a function and count the queries each call runs
+
+    Args:
+        func (callable): Function to measure.
+        repeat (int): Number of times to call ``func``.
+        setup (callable): Optional function called before each call to
+            ``func``, outside of the timing.
+
+    Returns:
+        Dictionary of timing percentiles, in milliseconds, and the number of
+        queries run by the last call.
+
+    """
+    timings = []
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'min': min(timings),
+        'p50': percentile(timings, 50),
+        'p90': percentile(timings, 90),
+        'p99': percentile(timings, 99),
+        'max': max(timings),
+        'queries': len(queries),
+    }
+
+
+def compare(result, baseline, threshold=20, min_difference=1.0):
+    """
+    Compare a scenario's result with its baseline
+
+    Args:
+        result (dict): Result returned by ``measure()``.
+        baseline (dict): Result of the same scenario from an earlier run,
+            or ``None`` if the scenario is new.
+        threshold (float): Percentage by which the median time can grow
+            before it counts as a regression.
+        min_difference (float): Number of milliseconds by which the median
+            time has to grow to count as a regression, so that noise in
+            very fast scenarios isn't reported.
+
+    Returns:
+        Tuple of the percentage change in the median time, or ``None`` if
+        there's no baseline, and a list of the ways the scenario regressed.
+
+    """
+    if baseline is None:
+        return None, []
+
+    base = max(baseline['p50'], 0.001)
+    change = (result['p50'] - base) / base * 100
+    regressions = []
+    if (change > threshold and
+            result['p50'] - baseline['p50'] >= min_difference):
+        regressions.append("p50 {:+.0f}%".format(change))
+
+    if result['queries'] > baseline['queries']:
+        regressions.append("queries {} -> {}".format(baseline['queries'],
+            result['queries']))
+
+    return change, regressions
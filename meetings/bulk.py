@@ -0,0 +1,130 @@
+"""
+Create many records at once with bulk inserts
+
+``bulk_create()`` doesn't call ``save()`` or send signals, so the functions
+here do the work that the signal handlers in ``meetings.signals`` would
+otherwise do: updating officials' summaries and search entries and bumping
+the data versions.
+
+"""
+from django import forms
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from .forms import OfficialMeetingForm
+from .models import Meeting, OfficialSummary, Source, SourceURL
+from .search import index_meetings
+from .versions import bump_data_version
+
+
+def bulk_create(model, objs):
+    """
+    Bulk create objects and return them with their primary keys
+
+    Not every database backend sets primary keys on bulk created objects.
+    On those that don't, the objects are fetched again, which assumes that
+    nothing else creates objects of the same model at the same time.  Call
+    this in a transaction so that a concurrent insert fails rather than
+    being mixed up with these objects.
+
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+
+    last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    model.objects.bulk_create(objs)
+    return list(model.objects.filter(pk__gt=last_pk).order_by('pk'))
+
+
+def clean_meeting(data):
+    """
+    Validate the fields of a meeting, other than its official and sources
+
+    This applies the same validation as ``OfficialMeetingForm``, except that
+    it requires a date.  Rather than creating a form for each meeting, which
+    copies every field and widget, it uses the form class's fields, so it's
+    fast enough to validate thousands of meetings.
+
+    Args:
+        data (dict): Strings keyed by the names of the fields of
+            ``OfficialMeetingForm``.
+
+    Returns:
+        Tuple of an unsaved meeting, or ``None`` if the fields aren't valid,
+        and a dictionary of lists of error messages keyed by field name.
+
+    """
+    errors = {}
+    cleaned_data = {}
+    for name, field in OfficialMeetingForm.base_fields.items():
+        try:
+            cleaned_data[name] = field.clean(data.get(name))
+        except ValidationError as e:
+            errors[name] = [str(m) for m in e.messages]
+
+    if 'date' in cleaned_data and not cleaned_data['date']:
+        errors['date'] = [str(forms.Field.default_error_messages['required'])]
+
+    if errors:
+        return None, errors
+
+    meeting = Meeting(**cleaned_data)
+    try:
+        meeting.full_clean(exclude=['official'])
+    except ValidationError as e:
+        return None, {name: [str(m) for m in messages]
+                      for name, messages in e.message_dict.items()}
+
+    return meeting, {}
+
+
+def clean_source_urls(urls):
+    """
+    Validate source URLs
+
+    Raises:
+        ValidationError if any of the URLs aren't valid.
+
+    """
+    url_field = forms.URLField()
+    return [url_field.clean(url) for url in urls]
+
+
+def create_meetings(meetings, source_urls):
+    """
+    Create meetings and their sources in a single transaction
+
+    Args:
+        meetings (list): Unsaved meetings.
+        source_urls (list): Lists of source URLs, one for each meeting.
+
+    Returns:
+        List of the meetings, with their primary keys, in the same order.
+
+    """
+    for meeting in meetings:
+        meeting.parse_notes()
+
+    with transaction.atomic():
+        meetings = bulk_create(Meeting, meetings)
+
+        if any(source_urls):
+            content_type = ContentType.objects.get_for_model(Meeting)
+            url_ids = SourceURL.objects.ids_for(
+                url for urls in source_urls for url in urls)
+            Source.objects.bulk_create([
+                Source(source_url_id=url_ids[url], content_type=content_type,
+                    object_id=meeting.pk)
+                for meeting, urls in zip(meetings, source_urls)
+                for url in urls
+            ])
+
+        official_ids = set(meeting.official_id for meeting in meetings)
+        OfficialSummary.objects.refresh(official_ids, bump=False)
+        index_meetings([meeting.pk for meeting in meetings])
+        bump_data_version(official_ids)
+
+    return meetings
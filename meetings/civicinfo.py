@@ -0,0 +1,216 @@
+"""Client for the Google Civic Information API"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import build_opener
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://www.googleapis.com/civicinfo/v2/'
+
+
+class CivicInfoError(Exception):
+    pass
+
+
+class CivicInfoClient(object):
+    """
+    Client for the Google Civic Information API
+
+    Requests that fail because of a network error, a server error or rate
+    limiting are retried, waiting exponentially longer between attempts.
+
+    Args:
+        api_key (string): Google API key.
+        base_url (string): URL of the API.  Override this to use a fake
+            version of the API.
+        retries (int): Number of times to retry a failed request.
+        backoff (float): Seconds to wait before the first retry.  The wait
+            doubles with each retry.
+        timeout (float): Seconds to wait for a response.
+        opener (OpenerDirector): ``urllib`` opener used to make requests.
+
+    """
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, retries=3,
+                 backoff=1.0, timeout=30, opener=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.opener = opener or build_opener()
+
+    def representative_info_by_division(self, ocd_id, roles=None):
+        """
+        Get the offices and officials for a division
+
+        Args:
+            ocd_id (string): OCD division ID.
+            roles (string): Optional role of the offices to include, such as
+                'legislatorLowerBody'.
+
+        Returns:
+            Dictionary of the API response.
+
+        """
+        params = {}
+        if self.api_key:
+            params['key'] = self.api_key
+        if roles:
+            params['roles'] = roles
+
+        url = "{}representatives/{}".format(self.base_url,
+            quote(ocd_id, safe=''))
+        if params:
+            url += '?' + urlencode(params)
+
+        return self._get(url)
+
+    def _get(self, url):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.opener.open(url, timeout=self.timeout)
+                try:
+                    return json.loads(response.read().decode('utf-8'))
+                finally:
+                    response.close()
+
+            except HTTPError as e:
+                if e.code != 429 and e.code < 500:
+                    raise CivicInfoError("{} returned {}".format(url, e.code))
+                err = e
+
+            except (URLError, socket.timeout) as e:
+                err = e
+
+            if attempt == self.retries:
+                raise CivicInfoError("{} failed: {}".format(url, err))
+
+            wait = self.backoff * 2 ** attempt
+            logger.warning("Retrying %s in %.1f seconds after error: %s",
+                url, wait, err)
+            time.sleep(wait)
+
+
+class ResponseCache(object):
+    """
+    On-disk cache of raw API responses
+
+    Each response is stored in a JSON file, along with the parameters of the
+    request and the time it was fetched.  Files are named by a hash of the
+    request parameters.
+
+    Args:
+        directory (string): Directory where responses are stored.  It's
+            created if it doesn't exist.
+
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, ocd_id, roles):
+        key = json.dumps([ocd_id, roles]).encode('utf-8')
+        filename = hashlib.sha256(key).hexdigest() + '.json'
+        return os.path.join(self.directory, filename)
+
+    def get(self, ocd_id, roles=None, max_age=None):
+        """
+        Get a cached response
+
+        Args:
+            ocd_id (string): OCD division ID.
+            roles (string): Roles requested with the division.
+            max_age (float): Seconds after which a response is considered
+                stale.  By default, responses never go stale.
+
+        Returns:
+            Dictionary of the API response, or ``None`` if no response is
+            cached or if it's stale.
+
+        """
+        try:
+            with open(self._path(ocd_id, roles)) as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        if max_age is not None and time.time() - entry['fetched'] > max_age:
+            return None
+
+        return entry['response']
+
+    def set(self, ocd_id, roles, response):
+        os.makedirs(self.directory, exist_ok=True)
+
+        entry = {
+            'ocd_id': ocd_id,
+            'roles': roles,
+            'fetched': time.time(),
+            'response': response,
+        }
+        # Write to a temporary file and then move it into place so readers
+        # never see a partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(ocd_id, roles))
+
+    def ocd_ids(self, roles=None):
+        """Get the OCD IDs of the cached responses for some roles"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        ocd_ids = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.json'):
+                continue
+
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    entry = json.load(f)
+            except (IOError, ValueError):
+                continue
+
+            if entry['roles'] == roles:
+                ocd_ids.append(entry['ocd_id'])
+
+        return sorted(ocd_ids)
+
+
+class CachingCivicInfoClient(object):
+    """
+    Civic Information API client that caches responses on disk
+
+    Args:
+        client (CivicInfoClient): Client used to fetch responses that aren't
+            cached.
+        cache (ResponseCache): Cache of responses.
+        max_age (float): Seconds after which cached responses are fetched
+            again.  By default, cached responses are always used.
+        offline (bool): Only use cached responses, regardless of their age.
+
+    """
+    def __init__(self, client, cache, max_age=None, offline=False):
+        self.client = client
+        self.cache = cache
+        self.max_age = max_age
+        self.offline = offline
+
+    def representative_info_by_division(self, ocd_id, roles=None):
+        max_age = None if self.offline else self.max_age
+        response = self.cache.get(ocd_id, roles, max_age)
+        if response is not None:
+            return response
+
+        if self.offline:
+            raise CivicInfoError("No cached response for {}".format(ocd_id))
+
+        response = self.client.representative_info_by_division(ocd_id, roles)
+        self.cache.set(ocd_id, roles, response)
+        return response
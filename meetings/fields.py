@@ -0,0 +1,33 @@
+import json
+
+from django.db import models
+
+
+class JSONField(models.TextField):
+    """
+    Stores JSON-serializable values as text
+
+    Unlike ``django.contrib.postgres.fields.JSONField`` this works with any
+    database, including SQLite in development.
+
+    """
+    def from_db_value(self, value, expression, connection, context):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or not isinstance(value, str):
+            return value
+
+        if value == '':
+            return None
+
+        return json.loads(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+
+        return json.dumps(value, sort_keys=True)
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
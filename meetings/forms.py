@@ -2,7 +2,7 @@ from django import forms
 from django.contrib.contenttypes.forms import generic_inlineformset_factory
 from django.utils.translation import ugettext_lazy as _
 
-from .models import ContactAttempt, Meeting, Official, Source
+from .models import ContactAttempt, Meeting, Official, Source, SourceURL
 
 # Use Bootstrap's class
 DEFAULT_FORM_WIDGET_CLASS = 'form-control'
@@ -51,24 +51,37 @@ class MeetingForm(forms.ModelForm):
         }
 
 
+class OfficialMeetingForm(MeetingForm):
+    """Meeting form for an official that's set by the view"""
+
+    class Meta(MeetingForm.Meta):
+        fields = [f for f in MeetingForm.Meta.fields if f != 'official']
+
+
 class SourceForm(forms.ModelForm):
+    # URLs are stored once in ``SourceURL``, so the URL is a form field
+    # rather than a model field.  Use HTML5 input types to get widgets and
+    # do some client-side validation.
+    url = forms.URLField(
+        label=_("Source URL"),
+        max_length=SourceURL._meta.get_field('url').max_length,
+        widget=forms.URLInput(attrs={
+            'class': DEFAULT_FORM_WIDGET_CLASS,
+        }))
+
     class Meta:
         model = Source
-        # Use HTML5 input types to get widgets and do some client-side
-        # validation
-        fields = [
-            'url',
-        ]
+        fields = []
 
-        labels = {
-            'url': _("Source URL"),
-        }
+    def __init__(self, *args, **kwargs):
+        super(SourceForm, self).__init__(*args, **kwargs)
+        if self.instance.source_url_id is not None:
+            self.initial.setdefault('url', self.instance.url)
 
-        widgets = {
-            'url': forms.URLInput(attrs={
-                'class': DEFAULT_FORM_WIDGET_CLASS,
-            }),
-        }
+    def save(self, commit=True):
+        url = self.cleaned_data['url']
+        self.instance.source_url_id = SourceURL.objects.ids_for([url])[url]
+        return super(SourceForm, self).save(commit)
 
 
 SourceFormSet = generic_inlineformset_factory(
@@ -82,10 +95,9 @@ SourceFormSet = generic_inlineformset_factory(
 class ContactAttemptForm(forms.ModelForm):
     class Meta:
         model = ContactAttempt
-        fields = ['user', 'official', 'contacted', 'notes', 'method']
+        # The user and official are set by the view
+        fields = ['contacted', 'notes', 'method']
         widgets = {
-            'user': forms.HiddenInput(),
-            'official': forms.HiddenInput(),
             'contacted': forms.CheckboxInput(attrs={
                 'class': 'form-check-input',
             }),
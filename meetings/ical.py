@@ -0,0 +1,235 @@
+"""
+Read and write iCalendar (RFC 5545) files
+
+Only what's needed to import and publish meetings is supported: the
+``VEVENT`` components of a calendar and their ``DTSTART``, ``LOCATION``,
+``DESCRIPTION``, ``URL`` and ``X-OFFICIAL`` properties.  Files are read a
+line at a time, so calendars of any size can be read without loading them
+into memory.
+
+"""
+from datetime import datetime
+
+# Maximum length of a content line, in octets, not counting the line break
+MAX_LINE_LENGTH = 75
+
+PRODID = '-//publicmeetings//Meetings//EN'
+
+
+def escape(value):
+    """Escape a text property value"""
+    return value.replace('\\', '\\\\').replace(';', '\\;')\
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """Fold a content line so no line is longer than 75 octets"""
+    if len(line.encode('utf-8')) <= MAX_LINE_LENGTH:
+        return line + '\r\n'
+
+    lines = []
+    current = []
+    length = 0
+    limit = MAX_LINE_LENGTH
+    for char in line:
+        char_length = len(char.encode('utf-8'))
+        if length + char_length > limit:
+            lines.append(''.join(current))
+            current = []
+            length = 0
+            # Continuation lines start with a space
+            limit = MAX_LINE_LENGTH - 1
+
+        current.append(char)
+        length += char_length
+
+    lines.append(''.join(current))
+    return '\r\n '.join(lines) + '\r\n'
+
+
+def unescape(value):
+    """Unescape a text property value"""
+    chars = []
+    escaped = False
+    for char in value:
+        if escaped:
+            chars.append('\n' if char in 'nN' else char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        else:
+            chars.append(char)
+
+    return ''.join(chars)
+
+
+def unfold(lines):
+    """
+    Join folded content lines
+
+    Long lines are folded by inserting a line break followed by a space or
+    tab.
+
+    """
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+
+        if current:
+            yield current
+
+        current = line
+
+    if current:
+        yield current
+
+
+def parse_line(line):
+    """
+    Split a content line into its name, parameters and value
+
+    Returns:
+        Tuple of the upper case property name, a dictionary of parameters
+        keyed by upper case name, and the raw value.
+
+    """
+    # The value starts at the first colon that isn't in a quoted parameter
+    # value
+    quoted = False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            break
+    else:
+        raise ValueError("Invalid content line '{}'".format(line))
+
+    name, *params = line[:i].split(';')
+    parameters = {}
+    for param in params:
+        key, _, value = param.partition('=')
+        parameters[key.upper()] = value.strip('"')
+
+    return name.upper(), parameters, line[i + 1:]
+
+
+def parse_date_time(value):
+    """
+    Parse a ``DATE`` or ``DATE-TIME`` value
+
+    Times are taken as they're written, in the meeting's local time.  UTC
+    times and time zone parameters aren't converted.
+
+    Returns:
+        Tuple of a date and a time, which is ``None`` for dates.
+
+    """
+    if 'T' not in value:
+        return datetime.strptime(value, '%Y%m%d').date(), None
+
+    parsed = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    return parsed.date(), parsed.time()
+
+
+class Event(dict):
+    """
+    Values of an event's properties, keyed by upper case property name
+
+    Content lines of the event that can't be parsed are skipped and their
+    errors are listed in ``errors``.
+
+    """
+    def __init__(self):
+        super(Event, self).__init__()
+        self.errors = []
+
+
+def read_events(lines):
+    """
+    Read the events of a calendar
+
+    Args:
+        lines: Iterable of the lines of an iCalendar file, such as an open
+            file.
+
+    Yields:
+        An ``Event`` for each event of its properties' values.  Text values
+        are unescaped.  Only the first value of each property is kept.
+
+    """
+    event = None
+    # Depth of components, like alarms, nested in the current event
+    depth = 0
+    for line in unfold(lines):
+        if not line.strip():
+            continue
+
+        try:
+            name, parameters, value = parse_line(line)
+        except ValueError as e:
+            # Lines outside of events aren't read anyway
+            if event is not None:
+                event.errors.append(str(e))
+            continue
+
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = Event()
+            depth = 0
+        elif event is None:
+            continue
+        elif name == 'BEGIN':
+            depth += 1
+        elif name == 'END' and depth:
+            depth -= 1
+        elif name == 'END' and value.upper() == 'VEVENT':
+            yield event
+            event = None
+        elif not depth and name not in event:
+            if name in ('DTSTART', 'DTEND', 'URL'):
+                event[name] = value
+            else:
+                event[name] = unescape(value)
+
+
+def format_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def format_date_time(value):
+    """Format a date and time without a time zone, as a floating time"""
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def write_calendar(name, events):
+    """
+    Write a calendar
+
+    Args:
+        name (str): Name of the calendar, shown by calendar apps.
+        events: Iterable of lists of tuples of property names and values
+            for each event.  Values are written as they are, so text values
+            need to be escaped.
+
+    Yields:
+        The calendar's folded content lines.
+
+    """
+    for line in (
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:{}'.format(PRODID),
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            'X-WR-CALNAME:{}'.format(escape(name))):
+        yield fold(line)
+
+    for properties in events:
+        yield fold('BEGIN:VEVENT')
+        for name, value in properties:
+            yield fold('{}:{}'.format(name, value))
+        yield fold('END:VEVENT')
+
+    yield fold('END:VCALENDAR')
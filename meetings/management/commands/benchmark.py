@@ -0,0 +1,133 @@
+from collections import OrderedDict
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+    teardown_test_environment)
+
+from meetings.benchmarks import endpoints, filters
+from meetings.benchmarks.utils import compare
+
+SUITES = {
+    'endpoints': endpoints,
+    'filters': filters,
+}
+
+
+class Command(BaseCommand):
+    help = "Runs benchmarks against a throwaway test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', nargs='*',
+            help="Benchmark suites to run, out of {}.  Defaults to all of "
+                 "them.".format(", ".join(sorted(SUITES))))
+        parser.add_argument('--officials', type=int, default=435,
+            help="Number of U.S. Representatives to create")
+        parser.add_argument('--legislators', type=int, default=7000,
+            help="Number of state legislators to create")
+        parser.add_argument('--meetings', type=int, default=50,
+            help="Number of meetings to create for each representative")
+        parser.add_argument('--repeat', type=int, default=5,
+            help="Number of times to run each scenario")
+        parser.add_argument('--baseline',
+            help="JSON file of results from an earlier run to compare with")
+        parser.add_argument('--threshold', type=float, default=20,
+            help="Percentage by which a scenario's median time can grow "
+                 "before it counts as a regression")
+        parser.add_argument('--save-baseline',
+            help="Write the results to this JSON file")
+
+    def load_baseline(self, path):
+        if path is None:
+            return {}
+
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, ValueError) as e:
+            raise CommandError("Couldn't read baseline {}: {}".format(path, e))
+
+    def write_results(self, results, baseline, threshold):
+        """
+        Write a table of results
+
+        Returns:
+            Number of scenarios that regressed.
+
+        """
+        num_regressed = 0
+        self.stdout.write("{:<48} {:>9} {:>9} {:>9} {:>8} {:>8}  {}".format(
+            "Scenario", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Queries",
+            "Change", "Regressions"))
+        for name, result in results.items():
+            change, regressions = compare(result, baseline.get(name),
+                threshold)
+            if regressions:
+                num_regressed += 1
+
+            self.stdout.write(
+                "{:<48} {:>9.1f} {:>9.1f} {:>9.1f} {:>8} {:>8}  {}".format(
+                    name, result['p50'], result['p90'], result['p99'],
+                    result['queries'],
+                    "" if change is None else "{:+.0f}%".format(change),
+                    ", ".join(regressions)))
+
+        return num_regressed
+
+    def handle(self, *args, **options):
+        suites = options['suite'] or sorted(SUITES)
+        for suite in suites:
+            if suite not in SUITES:
+                raise CommandError("Unknown benchmark suite '{}'".format(suite))
+
+        baseline = self.load_baseline(options['baseline'])
+
+        # Keep the metrics of every request out of the results, but still
+        # show requests that go over budget
+        metrics_logger = logging.getLogger('meetings.middleware')
+        metrics_log_level = metrics_logger.level
+        metrics_logger.setLevel(logging.WARNING)
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        results = OrderedDict()
+        try:
+            for suite in suites:
+                # Each suite gets a fresh database
+                connection.creation.create_test_db(verbosity=0,
+                    autoclobber=True)
+                try:
+                    # Use a private cache so the benchmarks can clear it
+                    with override_settings(
+                            CACHES={
+                                'default': {
+                                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                },
+                            },
+                            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+                        results[suite] = SUITES[suite].run(
+                            officials=options['officials'],
+                            legislators=options['legislators'],
+                            meetings=options['meetings'],
+                            repeat=options['repeat'])
+                finally:
+                    connection.creation.destroy_test_db(old_name,
+                        verbosity=0)
+        finally:
+            teardown_test_environment()
+            metrics_logger.setLevel(metrics_log_level)
+
+        num_regressed = 0
+        for suite, suite_results in results.items():
+            self.stdout.write(suite)
+            num_regressed += self.write_results(suite_results,
+                baseline.get(suite, {}), options['threshold'])
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if num_regressed:
+            raise CommandError("{} scenarios regressed".format(num_regressed))
@@ -1,76 +1,402 @@
 import argparse
-
-from apiclient.discovery import build
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from meetings.models import (Division, Office, Official, Address,
-    SocialMediaChannel, Email, Website, Phone)
+from meetings.civicinfo import (CachingCivicInfoClient, CivicInfoClient,
+    CivicInfoError, ResponseCache)
+from meetings.models import (Division, Office, Official, OfficialSummary,
+    Address, SocialMediaChannel, Email, Website, Phone, RepresentativeClaim)
+from meetings.search import index_officials
+from meetings.versions import bump_data_version, bump_official_versions
 
 
 class Command(BaseCommand):
-    help = 'Closes the specified poll for voting'
+    help = ("Loads U.S. Representatives for congressional districts from "
+            "the Google Civic Information API")
+
+    roles = 'legislatorLowerBody'
+
+    # Fields that identify each kind of contact detail when syncing
+    contact_detail_fields = OrderedDict([
+        (Address, ('line1', 'line2', 'line3', 'city', 'state',
+            'postal_code')),
+        (SocialMediaChannel, ('channel_type', 'channel_id')),
+        (Phone, ('phone',)),
+        (Website, ('url',)),
+        (Email, ('address',)),
+    ])
+
+    # Client for the Civic Information API.  If this isn't set, a client
+    # is created using the ``GOOGLE_API_KEY`` setting.  Either way, the
+    # client is wrapped in one that caches responses on disk, unless the
+    # cache is disabled.
+    client = None
 
     def add_arguments(self, parser):
         parser.add_argument('ocd_id', nargs='*', type=str)
         parser.add_argument('--infile', type=argparse.FileType('r'))
+        parser.add_argument('--workers', type=int, default=4,
+            help="Number of divisions to fetch from the API at once")
+        parser.add_argument('--batch-size', type=int, default=50,
+            help="Number of divisions to save in each transaction")
+        parser.add_argument('--retries', type=int, default=3,
+            help="Number of times to retry a failed API request")
+        parser.add_argument('--cache-dir',
+            default=settings.CIVIC_INFO_CACHE_DIR,
+            help="Directory where API responses are cached")
+        parser.add_argument('--no-cache', action='store_true',
+            help="Don't read or write cached API responses")
+        parser.add_argument('--refresh-older-than', type=float,
+            default=settings.CIVIC_INFO_CACHE_TTL, metavar='DAYS',
+            help="Fetch divisions whose cached responses are older than "
+                 "this number of days again")
+        parser.add_argument('--sync', action='store_true',
+            help="Update the party, contact details and office of existing "
+                 "officials to match the API")
+        parser.add_argument('--offline', action='store_true',
+            help="Only use cached API responses.  If no OCD IDs are "
+                 "specified, load every cached division.")
+
+    def get_client(self, options):
+        client = self.client
+        if client is None:
+            client = CivicInfoClient(settings.GOOGLE_API_KEY,
+                retries=options['retries'])
+
+        if options['no_cache']:
+            return client
+
+        return CachingCivicInfoClient(client,
+            ResponseCache(options['cache_dir']),
+            max_age=options['refresh_older_than'] * 24 * 60 * 60,
+            offline=options['offline'])
+
+    def _fetch(self, client, ocd_id):
+        try:
+            return ocd_id, client.representative_info_by_division(ocd_id,
+                roles=self.roles)
+        except CivicInfoError as e:
+            self.stderr.write("Could not fetch {}: {}".format(ocd_id, e))
+            return ocd_id, None
+
+    def _parse_response(self, ocd_id, response):
+        division = response['divisions'][ocd_id]
+        office_index = division['officeIndices'][0]
+        office = response['offices'][office_index]
+        official_index = office['officialIndices'][0]
+        official = response['officials'][official_index]
+
+        return division, office, official
+
+    def _create_divisions(self, divisions):
+        """
+        Get or create divisions
+
+        Args:
+            divisions (dict): Division names, keyed by OCD ID.
+
+        Returns:
+            Dictionary of division models keyed by OCD ID.
+
+        """
+        existing = {d.ocd_id: d
+                    for d in Division.objects.filter(ocd_id__in=divisions)}
+        new_divisions = []
+        for ocd_id, name in divisions.items():
+            if ocd_id not in existing:
+                division = Division(ocd_id=ocd_id, name=name)
+                division.parse_ocd_id()
+                new_divisions.append(division)
+
+        if new_divisions:
+            Division.objects.bulk_create(new_divisions)
+            existing = {d.ocd_id: d
+                        for d in Division.objects.filter(ocd_id__in=divisions)}
+
+        return existing
+
+    def _create_offices(self, offices):
+        """
+        Get or create offices
+
+        Args:
+            offices (list): Tuples of division models and office names.
+
+        Returns:
+            Dictionary of office models keyed by division ID and name.
+
+        """
+        division_ids = [division.pk for division, name in offices]
+        filtered = Office.objects.filter(division_id__in=division_ids)
+        existing = {(o.division_id, o.name): o for o in filtered}
+        new_offices = [
+            Office(division=division, name=name)
+            for division, name in offices
+            if (division.pk, name) not in existing
+        ]
+
+        if new_offices:
+            Office.objects.bulk_create(new_offices)
+            existing = {(o.division_id, o.name): o for o in filtered.all()}
+
+        return existing
+
+    def _create_officials(self, officials):
+        """
+        Get or create officials
+
+        Args:
+            officials (list): Tuples of office models and official data from
+                the API.
+
+        Returns:
+            Tuple of a dictionary of official models keyed by office ID and
+            name and a set of the IDs of officials that were created.
+
+        """
+        office_ids = [office.pk for office, official in officials]
+        filtered = Official.objects.filter(office_id__in=office_ids)
+        existing = {(o.office_id, o.name): o for o in filtered}
+        new_officials = [
+            Official(
+                name=official['name'],
+                office=office,
+                party=official['party']
+            )
+            for office, official in officials
+            if (office.pk, official['name']) not in existing
+        ]
+
+        created_ids = set()
+        if new_officials:
+            existing_ids = set(o.pk for o in existing.values())
+            Official.objects.bulk_create(new_officials)
+            existing = {(o.office_id, o.name): o for o in filtered.all()}
+            created_ids = set(o.pk for o in existing.values()) - existing_ids
+
+        return existing, created_ids
+
+    def _create_contact_details(self, official, official_model):
+        addresses = [
+            Address(
+                official=official_model,
+                line1=address['line1'],
+                line2=address.get('line2', ''),
+                line3=address.get('line3', ''),
+                city=address['city'],
+                state=address['state'],
+                postal_code=address['zip']
+            )
+            for address in official.get('address', [])
+        ]
+
+        channels = [
+            SocialMediaChannel(
+                channel_id=channel['id'],
+                channel_type=channel['type'],
+                official=official_model
+            )
+            for channel in official.get('channels', [])
+        ]
+
+        phones = [
+            Phone(
+                phone=number,
+                official=official_model
+            )
+            for number in official.get('phones', [])
+        ]
+
+        websites = [
+            Website(
+                url=url,
+                official=official_model
+            )
+            for url in official.get('urls', [])
+        ]
+
+        emails = [
+            Email(
+                address=email,
+                official=official_model
+            )
+            for email in official.get('emails', [])
+        ]
+
+        return {
+            Address: addresses,
+            SocialMediaChannel: channels,
+            Phone: phones,
+            Website: websites,
+            Email: emails,
+        }
+
+    def _sync_contact_details(self, officials):
+        """
+        Make officials' contact details match the ones from the API
+
+        The current contact details of all the officials are loaded with a
+        single query per kind of contact detail.  Only the contact details
+        that were added or removed are inserted or deleted.
+
+        Args:
+            officials (list): Tuples of official models and official data
+                from the API.
 
-    def _create_division(self, ocd_id, division):
-        return Division.objects.get_or_create(ocd_id=ocd_id, defaults={
-            'name': division['name']
-        })
-
-    def _create_office(self, office, division_model):
-        return Office.objects.get_or_create(division=division_model,
-            name=office['name'])
-
-    def _create_official(self, official, office_model):
-        official_model, created = Official.objects.get_or_create(
-            name=official['name'],
-            office=office_model,
-            defaults={
-              'party': official['party']
+        """
+        official_ids = [official_model.pk
+                        for official_model, official in officials]
+        wanted = {}
+        for official_model, official in officials:
+            details = self._create_contact_details(official, official_model)
+            for model, objs in details.items():
+                wanted.setdefault(model, []).extend(objs)
+
+        for model, key_fields in self.contact_detail_fields.items():
+            def key(obj):
+                return (obj.official_id,) + tuple(getattr(obj, f)
+                                                  for f in key_fields)
+
+            existing = {}
+            duplicate_ids = []
+            for obj in model.objects.filter(official_id__in=official_ids):
+                if key(obj) in existing:
+                    duplicate_ids.append(obj.pk)
+                else:
+                    existing[key(obj)] = obj.pk
+
+            new_objs = []
+            for obj in wanted.get(model, []):
+                if existing.pop(key(obj), None) is None:
+                    new_objs.append(obj)
+
+            # Whatever is left in ``existing`` is no longer listed
+            delete_ids = list(existing.values()) + duplicate_ids
+
+            if new_objs:
+                model.objects.bulk_create(new_objs)
+                self.changes[model.__name__, 'created'] += len(new_objs)
+
+            if delete_ids:
+                model.objects.filter(pk__in=delete_ids).delete()
+                self.changes[model.__name__, 'deleted'] += len(delete_ids)
+
+    def _sync_officials(self, officials, office_ids):
+        """
+        Update officials' party and whether they're in office
+
+        Officials of the offices who aren't in the API responses anymore are
+        marked as out of office.
+
+        Args:
+            officials (list): Tuples of official models and official data
+                from the API.
+            office_ids (list): IDs of the offices in the API responses.
+
+        """
+        official_ids = set()
+        by_party = {}
+        for official_model, official in officials:
+            official_ids.add(official_model.pk)
+            party = official.get('party', '')
+            if official_model.party != party:
+                by_party.setdefault(party, []).append(official_model.pk)
+
+        for party, ids in by_party.items():
+            Official.objects.filter(pk__in=ids).update(party=party)
+            self.changes['Official', 'updated'] += len(ids)
+
+        num_in_office = Official.objects.filter(pk__in=official_ids,
+            in_office=False).update(in_office=True)
+        self.changes['Official', 'returned to office'] += num_in_office
+
+        num_out_of_office = Official.objects\
+            .filter(office_id__in=office_ids, in_office=True)\
+            .exclude(pk__in=official_ids)\
+            .update(in_office=False)
+        self.changes['Official', 'left office'] += num_out_of_office
+
+    def _save_batch(self, batch, sync=False):
+        """
+        Save the divisions, offices and officials from API responses
+
+        Everything in the batch is saved in a single transaction, using bulk
+        inserts.  Contact details are only saved for new officials, unless
+        ``sync`` is true, in which case existing officials are updated to
+        match the API responses.
+
+        Args:
+            batch (list): Tuples of OCD IDs and the division, office and
+                official parsed from the API response for the OCD ID.
+            sync (bool): Update existing officials.
+
+        Returns:
+            Number of officials that were created.
+
+        """
+        with transaction.atomic():
+            division_models = self._create_divisions({
+                ocd_id: division['name']
+                for ocd_id, division, office, official in batch
             })
 
-        if created:
-            for address in official['address']:
-                Address.objects.create(
-                    official=official_model,
-                    line1=address['line1'],
-                    line2=address.get('line2', ''),
-                    line3=address.get('line3', ''),
-                    city=address['city'],
-                    state=address['state'],
-                    postal_code=address['zip']
-                )
-
-            for channel in official['channels']:
-                SocialMediaChannel.objects.create(
-                    channel_id=channel['id'],
-                    channel_type=channel['type'],
-                    official=official_model
-                )
-
-            for number in official['phones']:
-                Phone.objects.create(
-                    phone=number,
-                    official=official_model
-                )
-
-            for url in official['urls']:
-                Website.objects.create(
-                    url=url,
-                    official=official_model
-                )
-
-            for email in official.get('emails', []):
-                Email.objects.create(
-                    address=email,
-                    official=official_model
-                )
-
-        return official, created
+            office_models = self._create_offices([
+                (division_models[ocd_id], office['name'])
+                for ocd_id, division, office, official in batch
+            ])
+            batch_offices = [
+                office_models[(division_models[ocd_id].pk, office['name'])]
+                for ocd_id, division, office, official in batch
+            ]
+
+            official_models, created_ids = self._create_officials([
+                (office_model, official)
+                for office_model, (ocd_id, division, office, official)
+                in zip(batch_offices, batch)
+            ])
+            self.changes['Official', 'created'] += len(created_ids)
+
+            officials = [
+                (official_models[(office_model.pk, official['name'])],
+                    official)
+                for office_model, (ocd_id, division, office, official)
+                in zip(batch_offices, batch)
+            ]
+
+            if sync:
+                self._sync_officials(officials,
+                    [office_model.pk for office_model in batch_offices])
+                self._sync_contact_details(officials)
+                # Bulk updates don't send the signals that invalidate cached
+                # pages
+                bump_official_versions(
+                    [official_model.pk for official_model, o in officials])
+
+            else:
+                contact_details = {}
+                for official_model, official in officials:
+                    if official_model.pk not in created_ids:
+                        continue
+
+                    details = self._create_contact_details(official,
+                        official_model)
+                    for model, objs in details.items():
+                        contact_details.setdefault(model, []).extend(objs)
+
+                for model, objs in contact_details.items():
+                    model.objects.bulk_create(objs)
+
+            # Bulk inserts don't send the signals that create summaries,
+            # search entries and claims
+            OfficialSummary.objects.refresh(created_ids)
+            index_officials(created_ids)
+            RepresentativeClaim.objects.add(created_ids)
+
+        return len(created_ids)
 
     def handle(self, *args, **options):
         ocd_ids = []
@@ -82,22 +408,56 @@ class Command(BaseCommand):
         else:
             ocd_ids = options['ocd_id']
 
-        service = build('civicinfo', 'v2', developerKey=settings.GOOGLE_API_KEY)
-        resource = service.representatives()
-
-        for ocd_id in ocd_ids:
-            request = resource.representativeInfoByDivision(
-                ocdId=ocd_id,
-                roles='legislatorLowerBody')
-            response = request.execute()
-
-            division = response['divisions'][ocd_id]
-            office_index = response['divisions'][ocd_id]['officeIndices'][0]
-            office = response['offices'][office_index]
-            official_index = office['officialIndices'][0]
-            official = response['officials'][official_index]
-
-            division_model, created = self._create_division(ocd_id, division)
-            office_model, created = self._create_office(office, division_model)
-            official_model, created = self._create_official(official,
-                office_model)
+        if options['offline'] and options['no_cache']:
+            raise CommandError("--offline can't be used with --no-cache")
+
+        if options['offline'] and not ocd_ids:
+            ocd_ids = ResponseCache(options['cache_dir']).ocd_ids(self.roles)
+
+        # Each division only needs to be fetched once
+        ocd_ids = list(OrderedDict.fromkeys(ocd_ids))
+
+        client = self.get_client(options)
+        num_fetched = 0
+        num_created = 0
+        batch = []
+        self.changes = Counter()
+
+        # Divisions are fetched in worker threads while the main thread
+        # saves the ones that have already been fetched
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            responses = executor.map(lambda ocd_id: self._fetch(client, ocd_id),
+                ocd_ids)
+            for ocd_id, response in responses:
+                if response is None:
+                    continue
+
+                try:
+                    batch.append((ocd_id,) +
+                        self._parse_response(ocd_id, response))
+                except (KeyError, IndexError):
+                    self.stderr.write("Could not find a representative for "
+                        "{}".format(ocd_id))
+                    continue
+
+                num_fetched += 1
+                if len(batch) >= options['batch_size']:
+                    num_created += self._save_batch(batch, options['sync'])
+                    batch = []
+
+        if batch:
+            num_created += self._save_batch(batch, options['sync'])
+
+        # Bulk inserts don't send the signals that update the data version
+        bump_data_version()
+
+        self.stdout.write("Fetched {} of {} divisions and created {} "
+            "officials".format(num_fetched, len(ocd_ids), num_created))
+
+        if options['sync']:
+            for (model_name, change), count in sorted(self.changes.items()):
+                if not count:
+                    continue
+
+                self.stdout.write("{} {}: {}".format(model_name, change,
+                    count))
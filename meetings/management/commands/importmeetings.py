@@ -0,0 +1,280 @@
+import csv
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from meetings.bulk import clean_meeting, clean_source_urls, create_meetings
+from meetings.ical import parse_date_time, read_events
+from meetings.models import ImportCheckpoint, Official
+
+
+class OfficialLookup(object):
+    """
+    Finds officials by ID, OCD ID or name without querying the database
+
+    Every official is loaded once.  When more than one official has the
+    same name or division, officials in office are preferred.
+
+    """
+    def __init__(self, officials):
+        self.ids = set()
+        self.by_ocd_id = {}
+        self.by_name = {}
+        for pk, name, ocd_id, in_office in officials:
+            self.ids.add(pk)
+            self.by_ocd_id.setdefault(ocd_id, []).append((in_office, pk))
+            self.by_name.setdefault(name.lower(), []).append((in_office, pk))
+
+    @classmethod
+    def load(cls):
+        return cls(Official.objects.values_list('pk', 'name',
+            'office__division__ocd_id', 'in_office').iterator())
+
+    def _pick(self, candidates, value):
+        in_office = [pk for current, pk in candidates if current]
+        if len(in_office) > 1 or (not in_office and len(candidates) > 1):
+            raise ValueError("More than one official matches '{}'".format(
+                value))
+
+        return in_office[0] if in_office else candidates[0][1]
+
+    def get(self, value):
+        """
+        Get the ID of the official identified by a string
+
+        Raises:
+            ValueError if no official, or more than one, matches.
+
+        """
+        value = value.strip()
+        if value.isdigit() and int(value) in self.ids:
+            return int(value)
+
+        for lookup, key in ((self.by_ocd_id, value),
+                            (self.by_name, value.lower())):
+            if key in lookup:
+                return self._pick(lookup[key], value)
+
+        raise ValueError("No official matches '{}'".format(value))
+
+
+class Command(BaseCommand):
+    help = ("Imports meetings from a CSV or iCalendar file.  CSV files have "
+            "a header row with an official column, with the ID, OCD ID or "
+            "name of the official, the columns of the meeting form, and a "
+            "sources column of URLs separated by spaces.")
+
+    formats = ('csv', 'ics')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path',
+            help="CSV or iCalendar file to import")
+        parser.add_argument('--format', choices=self.formats,
+            help="Format of the file.  Defaults to the file's extension.")
+        parser.add_argument('--official',
+            help="ID, OCD ID or name of the official for rows that don't "
+                 "name one, such as the events of an official's calendar")
+        parser.add_argument('--source', action='append', default=[],
+            help="Source URL added to every meeting, such as the URL of the "
+                 "calendar.  Can be given more than once.")
+        parser.add_argument('--batch-size', type=int, default=500,
+            help="Number of meetings to save in each transaction")
+        parser.add_argument('--checkpoint',
+            help="Name under which the number of imported rows is recorded "
+                 "in the database, in the same transaction as each batch.  "
+                 "If it exists, the rows it records are skipped, so an "
+                 "interrupted import can be resumed.")
+        parser.add_argument('--dry-run', action='store_true',
+            help="Check every row without saving anything")
+
+    def get_format(self, options):
+        if options['format']:
+            return options['format']
+
+        extension = os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if extension not in self.formats:
+            raise CommandError("Can't tell the format of {}.  Use "
+                "--format.".format(options['path']))
+
+        return extension
+
+    def read_csv(self, f):
+        """
+        Read the rows of a CSV file
+
+        Yields:
+            Tuple of a row and a dictionary of the errors found while
+            reading it, keyed by field name.
+
+        """
+        for row in csv.DictReader(f):
+            row['sources'] = (row.get('sources') or '').split()
+            yield row, {}
+
+    def read_ics(self, f):
+        """Read the events of an iCalendar file like ``read_csv()``"""
+        for event in read_events(f):
+            row = {
+                'official': event.get('X-OFFICIAL', ''),
+                'location': event.get('LOCATION', ''),
+                'event_website': event.get('URL', ''),
+                'notes': event.get('DESCRIPTION', ''),
+                'sources': [],
+            }
+
+            if event.get('DTSTART'):
+                try:
+                    start_date, start_time = parse_date_time(event['DTSTART'])
+                except ValueError:
+                    row['date'] = event['DTSTART']
+                else:
+                    row['date'] = start_date.isoformat()
+                    if start_time is not None:
+                        row['time'] = start_time.strftime('%H:%M')
+
+            yield row, {'event': event.errors} if event.errors else {}
+
+    def read_checkpoint(self, name, input_path):
+        """Get the number of rows that were already imported"""
+        if name is None:
+            return 0
+
+        try:
+            checkpoint = ImportCheckpoint.objects.get(name=name)
+        except ImportCheckpoint.DoesNotExist:
+            return 0
+
+        if checkpoint.path != os.path.abspath(input_path):
+            raise CommandError("The checkpoint {} is for {}".format(name,
+                checkpoint.path))
+
+        return checkpoint.rows
+
+    def write_checkpoint(self, name, input_path, rows):
+        ImportCheckpoint.objects.update_or_create(name=name, defaults={
+            'path': os.path.abspath(input_path),
+            'rows': rows,
+        })
+
+    def clean_row(self, row, officials, options):
+        """
+        Validate a row
+
+        Returns:
+            Tuple of an unsaved meeting and its source URLs, or of ``None``
+            and a dictionary of errors keyed by field name.
+
+        """
+        errors = {}
+        official_id = None
+        identifier = (row.get('official') or '').strip() or \
+            options['official']
+        if not identifier:
+            errors['official'] = ["No official"]
+        else:
+            try:
+                official_id = officials.get(identifier)
+            except ValueError as e:
+                errors['official'] = [str(e)]
+
+        meeting, meeting_errors = clean_meeting(row)
+        errors.update(meeting_errors)
+
+        try:
+            source_urls = clean_source_urls(row['sources'] +
+                options['source'])
+        except ValidationError as e:
+            errors['sources'] = list(e.messages)
+
+        if errors:
+            return None, errors
+
+        meeting.official_id = official_id
+        return meeting, source_urls
+
+    def save_batch(self, batch, options, path, rows):
+        """
+        Save a batch of meetings
+
+        The checkpoint is written in the same transaction, so it always
+        matches the meetings that were saved.
+
+        """
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            if batch:
+                meetings, source_urls = zip(*batch)
+                create_meetings(list(meetings), list(source_urls))
+
+            if options['checkpoint']:
+                self.write_checkpoint(options['checkpoint'], path, rows)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['dry_run'] and options['checkpoint']:
+            raise CommandError("--checkpoint can't be used with --dry-run")
+
+        file_format = self.get_format(options)
+        path = options['path']
+        skip = self.read_checkpoint(options['checkpoint'], path)
+
+        officials = OfficialLookup.load()
+        if options['official']:
+            try:
+                officials.get(options['official'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        num_rows = 0
+        num_imported = 0
+        num_invalid = 0
+        batch = []
+        start = time.perf_counter()
+
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = getattr(self, 'read_{}'.format(file_format))
+            for num_rows, (row, errors) in enumerate(reader(f), 1):
+                if num_rows <= skip:
+                    continue
+
+                if errors:
+                    meeting, result = None, errors
+                else:
+                    meeting, result = self.clean_row(row, officials, options)
+                if meeting is None:
+                    num_invalid += 1
+                    self.stderr.write("Row {}: {}".format(num_rows, "; ".join(
+                        "{}: {}".format(name, " ".join(messages))
+                        for name, messages in sorted(result.items()))))
+                    continue
+
+                batch.append((meeting, result))
+                if len(batch) >= options['batch_size']:
+                    self.save_batch(batch, options, path, num_rows)
+                    num_imported += len(batch)
+                    batch = []
+
+                    if options['verbosity'] > 1:
+                        self.stdout.write("Imported {} meetings from {} "
+                            "rows".format(num_imported, num_rows - skip))
+
+        # Save the last batch, and the checkpoint for any rows after it
+        # that were skipped
+        if batch or options['checkpoint']:
+            self.save_batch(batch, options, path, num_rows)
+            num_imported += len(batch)
+
+        elapsed = time.perf_counter() - start
+        num_read = max(num_rows - skip, 0)
+        self.stdout.write("{} {} meetings from {} rows, skipping {} invalid "
+            "rows, in {:.1f} seconds ({:.0f} rows/second)".format(
+                "Checked" if options['dry_run'] else "Imported",
+                num_imported, num_read, num_invalid, elapsed,
+                num_read / elapsed if elapsed else 0))
@@ -0,0 +1,114 @@
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+    as_completed, wait)
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from meetings.models import Meeting, NOTES_SCHEMA_VERSION, parse_notes
+from meetings.versions import bump_data_version
+
+
+def parse_chunk(rows):
+    """
+    Parse the notes of a chunk of meetings
+
+    This runs in a worker process, so it doesn't touch the database.
+
+    Args:
+        rows (list): Tuples of meeting IDs and notes.
+
+    Returns:
+        List of tuples of meeting IDs and the fields parsed from their notes.
+
+    """
+    return [(pk, parse_notes(notes)) for pk, notes in rows]
+
+
+class Command(BaseCommand):
+    help = ("Parses the ArchieML notes of meetings whose notes haven't been "
+            "parsed by the current version of the parser")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+            help="Parse the notes of all meetings")
+        parser.add_argument('--chunk-size', type=int, default=500,
+            help="Number of meetings to parse in each worker process at a "
+                 "time")
+        parser.add_argument('--workers', type=int, default=None,
+            help="Number of worker processes.  Defaults to the number of "
+                 "CPUs")
+
+    def get_chunks(self, queryset, chunk_size):
+        """
+        Read the IDs and notes of meetings a chunk at a time
+
+        Each chunk is a separate query for the meetings after the last one
+        of the previous chunk, so only the chunks that are being parsed are
+        in memory.
+
+        """
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)
+                .values_list('pk', 'notes')[:chunk_size])
+            if not rows:
+                return
+
+            yield rows
+            last_pk = rows[-1][0]
+
+    def save_chunk(self, parsed):
+        """
+        Save the parsed fields of a chunk of meetings
+
+        Meetings with the same fields, most commonly those without notes,
+        are updated together.
+
+        Returns:
+            Number of meetings that were updated.
+
+        """
+        by_fields = {}
+        for pk, fields in parsed:
+            key = json.dumps(fields, sort_keys=True)
+            by_fields.setdefault(key, (fields, []))[1].append(pk)
+
+        with transaction.atomic():
+            for fields, ids in by_fields.values():
+                Meeting.objects.filter(pk__in=ids).update(
+                    notes_fields=fields,
+                    notes_version=NOTES_SCHEMA_VERSION
+                )
+
+        return len(parsed)
+
+    def handle(self, *args, **options):
+        meetings = Meeting.objects.order_by('pk')
+        if not options['all']:
+            meetings = meetings.exclude(notes_version=NOTES_SCHEMA_VERSION)
+
+        num_parsed = 0
+        workers = options['workers'] or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Chunks are read as workers become free rather than all up
+            # front, keeping at most two for each worker in flight
+            pending = set()
+            for chunk in self.get_chunks(meetings, options['chunk_size']):
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending,
+                        return_when=FIRST_COMPLETED)
+                    for future in done:
+                        num_parsed += self.save_chunk(future.result())
+
+                pending.add(executor.submit(parse_chunk, chunk))
+
+            for future in as_completed(pending):
+                num_parsed += self.save_chunk(future.result())
+
+        if num_parsed:
+            bump_data_version()
+
+        self.stdout.write("Parsed the notes of {} meetings".format(
+            num_parsed))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from meetings.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Recreates the search entries of every official and meeting"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+            help="Number of officials or meetings to index at a time")
+
+    def handle(self, *args, **options):
+        num_entries = rebuild_index(options['chunk_size'])
+        self.stdout.write("Created {} search entries".format(num_entries))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from meetings.models import OfficialSummary
+from meetings.versions import bump_data_version
+
+
+class Command(BaseCommand):
+    help = ("Updates summaries of officials' meetings whose next meeting "
+            "has passed")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+            help="Recompute the summaries of all officials")
+        parser.add_argument('--rebuild', action='store_true',
+            help="Delete all summaries and recompute them from scratch")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            created_ids = OfficialSummary.objects.rebuild()
+            bump_data_version()
+            self.stdout.write("Rebuilt {} summaries".format(len(created_ids)))
+            return
+
+        if options['all']:
+            official_ids = None
+        else:
+            official_ids = OfficialSummary.objects.stale()\
+                .values_list('official_id', flat=True)
+
+        changed_ids = OfficialSummary.objects.refresh(official_ids)
+        self.stdout.write("Updated {} summaries".format(len(changed_ids)))
@@ -0,0 +1,216 @@
+"""
+Records how many queries each request runs and how long it takes
+
+The metrics are grouped by the name of the URL pattern that handled the
+request, so they can be compared with a budget for each view in the
+``QUERY_BUDGETS`` setting.  For example::
+
+    QUERY_BUDGETS = {
+        'official-detail': {'queries': 9, 'duplicates': 0},
+        'api_official_list': {'queries': 6, 'db_time': 200},
+    }
+
+``queries`` is the maximum number of queries, ``duplicates`` the maximum
+number of queries that repeat an earlier query with different parameters
+and ``db_time`` the maximum number of milliseconds spent in the database.
+
+A request that goes over budget is logged as a warning.  When the
+``QUERY_BUDGETS_ENFORCED`` setting is true, as it is when running the test
+suite, it raises ``QueryBudgetExceeded`` instead.
+
+Recording queries keeps the SQL of every query in memory until the end of
+the request, so every request is only measured in debug mode and when
+budgets are enforced.  Otherwise, the ``QUERY_METRICS_SAMPLE_RATE`` setting
+is the fraction of requests that are measured.
+
+The queries of streaming responses, like the officials export, run while
+the response is sent, so they're counted once the stream is finished.  By
+then the headers have been sent, so they don't get ``X-Query-*`` headers,
+and a stream that goes over budget raises ``QueryBudgetExceeded`` when
+it's consumed.
+
+"""
+from collections import Counter
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Literals in SQL, which are replaced to find queries that only differ in
+# their parameters
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\?, )*\?\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more queries, or took longer, than its budget allows"""
+
+
+def fingerprint(sql):
+    """Normalize SQL so queries that only differ in their literals match"""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+def get_over_budget(metrics, budget):
+    """Get descriptions of the ways a request went over its budget"""
+    over = []
+    for name in ('queries', 'duplicates', 'db_time'):
+        if name in budget and metrics[name] > budget[name]:
+            over.append("{} {} > {}".format(name, metrics[name],
+                budget[name]))
+
+    return over
+
+
+class QueryMetricsMiddleware(object):
+    """
+    Records query counts, database time and render time for each request
+
+    Duplicate queries are the queries whose fingerprints, the SQL with its
+    literals replaced, match an earlier query in the same request.  They're
+    usually a sign of an N+1 problem.
+
+    In debug mode, the metrics are added to the response as ``X-Query-*``
+    headers.
+
+    """
+    # Maximum number of duplicate fingerprints that are logged
+    max_logged_duplicates = 5
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_measure(request):
+            return self.get_response(request)
+
+        request._query_metrics_render_time = None
+        debug_cursors = {}
+        start_indexes = {}
+        for connection in connections.all():
+            debug_cursors[connection.alias] = connection.force_debug_cursor
+            connection.force_debug_cursor = True
+            start_indexes[connection.alias] = len(connection.queries_log)
+
+        def finish():
+            queries = []
+            for connection in connections.all():
+                queries.extend(list(connection.queries_log)[
+                    start_indexes.get(connection.alias, 0):])
+                connection.force_debug_cursor = debug_cursors.get(
+                    connection.alias, False)
+
+            return self.get_metrics(request, queries,
+                time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            finish()
+            raise
+
+        if response.streaming:
+            response.streaming_content = self.measure_stream(request,
+                response, response.streaming_content, finish)
+            return response
+
+        self.report(request, response, finish())
+        return response
+
+    def should_measure(self, request):
+        if settings.DEBUG or getattr(settings, 'QUERY_BUDGETS_ENFORCED',
+                False):
+            return True
+
+        return random.random() < getattr(settings,
+            'QUERY_METRICS_SAMPLE_RATE', 0)
+
+    def measure_stream(self, request, response, content, finish):
+        """Report the metrics of a streaming response once it's sent"""
+        try:
+            for chunk in content:
+                yield chunk
+        finally:
+            self.report(request, response, finish())
+
+    def process_template_response(self, request, response):
+        # Template responses are rendered after this, so rendering is
+        # timed with a callback
+        render_start = time.perf_counter()
+
+        def record_render_time(response):
+            request._query_metrics_render_time = \
+                time.perf_counter() - render_start
+
+        response.add_post_render_callback(record_render_time)
+        return response
+
+    def get_metrics(self, request, queries, elapsed):
+        fingerprints = Counter(fingerprint(q['sql']) for q in queries)
+        duplicates = Counter({sql: count for sql, count in fingerprints.items()
+                              if count > 1})
+        render_time = request._query_metrics_render_time
+        resolver_match = getattr(request, 'resolver_match', None)
+
+        return {
+            'view': resolver_match.view_name if resolver_match else None,
+            'method': request.method,
+            'path': request.path,
+            'queries': len(queries),
+            'duplicates': sum(duplicates.values()) - len(duplicates),
+            'duplicate_fingerprints': [
+                {
+                    'fingerprint': hashlib.md5(
+                        sql.encode('utf-8')).hexdigest()[:8],
+                    'count': count,
+                    'sql': sql,
+                }
+                for sql, count in duplicates.most_common(
+                    self.max_logged_duplicates)
+            ],
+            'db_time': round(sum(float(q['time']) for q in queries) * 1000,
+                1),
+            'render_time': (None if render_time is None
+                            else round(render_time * 1000, 1)),
+            'total_time': round(elapsed * 1000, 1),
+        }
+
+    def report(self, request, response, metrics):
+        if settings.DEBUG and not response.streaming:
+            response['X-Query-View'] = metrics['view'] or ''
+            response['X-Query-Count'] = str(metrics['queries'])
+            response['X-Query-Duplicates'] = str(metrics['duplicates'])
+            response['X-Query-Fingerprints'] = ', '.join(
+                d['fingerprint'] for d in metrics['duplicate_fingerprints'])
+            response['X-Query-DB-Time'] = str(metrics['db_time'])
+            if metrics['render_time'] is not None:
+                response['X-Query-Render-Time'] = str(metrics['render_time'])
+            response['X-Query-Total-Time'] = str(metrics['total_time'])
+
+        logger.info(json.dumps(metrics, sort_keys=True))
+
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        if metrics['view'] not in budgets:
+            return
+
+        over = get_over_budget(metrics, budgets[metrics['view']])
+        if not over:
+            return
+
+        message = "{} {} went over its budget: {}".format(request.method,
+            metrics['view'], ", ".join(over))
+        if getattr(settings, 'QUERY_BUDGETS_ENFORCED', False):
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
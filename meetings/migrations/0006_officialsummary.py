@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:17
+from __future__ import unicode_literals
+
+from datetime import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_summaries(apps, schema_editor):
+    Official = apps.get_model('meetings', 'Official')
+    OfficialSummary = apps.get_model('meetings', 'OfficialSummary')
+
+    today = datetime.now().date()
+    summaries = Official.objects.annotate(
+        last_meeting_date=models.Max(models.Case(
+            models.When(meetings__date__lt=today, then='meetings__date'),
+            output_field=models.DateField())),
+        next_meeting_date=models.Min(models.Case(
+            models.When(meetings__date__gte=today, then='meetings__date'),
+            output_field=models.DateField())),
+    ).values_list('pk', 'last_meeting_date', 'next_meeting_date')
+
+    OfficialSummary.objects.bulk_create([
+        OfficialSummary(
+            official_id=pk,
+            last_meeting_date=last_meeting_date,
+            next_meeting_date=next_meeting_date
+        )
+        for pk, last_meeting_date, next_meeting_date in summaries
+    ])
+
+
+def remove_summaries(apps, schema_editor):
+    OfficialSummary = apps.get_model('meetings', 'OfficialSummary')
+    OfficialSummary.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0005_auto_20170630_2212'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficialSummary',
+            fields=[
+                ('official', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='meetings.Official')),
+                ('last_meeting_date', models.DateField(blank=True, help_text='Date of the most recent meeting before today', null=True)),
+                ('next_meeting_date', models.DateField(blank=True, help_text='Date of the first meeting on or after today', null=True)),
+            ],
+        ),
+        migrations.RunPython(add_summaries, remove_summaries),
+    ]
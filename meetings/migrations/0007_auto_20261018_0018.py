@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:18
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0006_officialsummary'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='contactattempt',
+            index_together=set([('official', 'datetime')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='meeting',
+            index_together=set([('official', 'date')]),
+        ),
+    ]
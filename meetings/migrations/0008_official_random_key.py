@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:20
+from __future__ import unicode_literals
+
+import random
+
+from django.db import migrations, models
+import meetings.models
+
+
+def randomize_keys(apps, schema_editor):
+    # Adding the field gives every existing official the same key
+    Official = apps.get_model('meetings', 'Official')
+    for pk in Official.objects.values_list('pk', flat=True):
+        Official.objects.filter(pk=pk).update(random_key=random.random())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0007_auto_20261018_0018'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='official',
+            name='random_key',
+            field=models.FloatField(db_index=True, default=meetings.models.get_random_key, editable=False, help_text='Random number used to pick officials at random'),
+        ),
+        migrations.RunPython(randomize_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def parse_ocd_id(ocd_id):
+    components = {
+        'country': '',
+        'state': '',
+        'district_type': '',
+        'district_number': None,
+        'parent_ocd_id': '',
+    }
+
+    bits = ocd_id.split('/')
+    parts = [bit.split(':', 1) for bit in bits[1:] if ':' in bit]
+    for part_type, part_id in parts:
+        if part_type in ('country', 'state'):
+            components[part_type] = part_id
+
+    if len(parts) > 1:
+        components['parent_ocd_id'] = '/'.join(bits[:-1])
+
+        part_type, part_id = parts[-1]
+        if part_type not in ('country', 'state'):
+            components['district_type'] = part_type
+            if part_id.isdigit():
+                components['district_number'] = int(part_id)
+
+    return components
+
+
+def parse_ocd_ids(apps, schema_editor):
+    Division = apps.get_model('meetings', 'Division')
+
+    for pk, ocd_id in Division.objects.values_list('pk', 'ocd_id'):
+        Division.objects.filter(pk=pk).update(**parse_ocd_id(ocd_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0008_official_random_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='division',
+            name='country',
+            field=models.CharField(blank=True, editable=False, help_text='Country code from the OCD ID', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='district_number',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Number of the division below the state level', null=True),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='district_type',
+            field=models.CharField(blank=True, editable=False, help_text="Type of the division below the state level, e.g. 'cd'", max_length=50),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='parent_ocd_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='OCD ID of the division that contains this one', max_length=254),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='state',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='State code from the OCD ID', max_length=2),
+        ),
+        migrations.AlterIndexTogether(
+            name='division',
+            index_together=set([('country', 'district_type', 'state')]),
+        ),
+        migrations.RunPython(parse_ocd_ids, migrations.RunPython.noop),
+    ]
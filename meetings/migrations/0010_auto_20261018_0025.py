@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import meetings.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0009_auto_20261018_0020'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='notes_fields',
+            field=meetings.fields.JSONField(default=dict, editable=False, help_text='Fields parsed from the ArchieML notes'),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='notes_version',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, help_text='Version of the parser used to parse the notes'),
+        ),
+    ]
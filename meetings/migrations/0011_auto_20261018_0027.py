@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:27
+from __future__ import unicode_literals
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def rebuild_summaries(apps, schema_editor):
+    Official = apps.get_model('meetings', 'Official')
+    OfficialSummary = apps.get_model('meetings', 'OfficialSummary')
+
+    today = datetime.now().date()
+    meetings = Official.objects.order_by().annotate(
+        last_meeting_date=models.Max(models.Case(
+            models.When(meetings__date__lt=today, then='meetings__date'),
+            output_field=models.DateField())),
+        next_meeting_date=models.Min(models.Case(
+            models.When(meetings__date__gte=today, then='meetings__date'),
+            output_field=models.DateField())),
+        latest_meeting_date=models.Max('meetings__date'),
+        meeting_count=models.Count('meetings'),
+    ).values_list('pk', 'office__division__state', 'last_meeting_date',
+        'next_meeting_date', 'latest_meeting_date', 'meeting_count')
+    contact_attempts = dict(
+        (pk, (count, last_contact_datetime))
+        for pk, count, last_contact_datetime in Official.objects.order_by()
+        .annotate(
+            contact_attempt_count=models.Count('contact_attempts'),
+            last_contact_datetime=models.Max('contact_attempts__datetime'),
+        ).values_list('pk', 'contact_attempt_count', 'last_contact_datetime')
+    )
+
+    OfficialSummary.objects.all().delete()
+    OfficialSummary.objects.bulk_create([
+        OfficialSummary(
+            official_id=pk,
+            state=state or '',
+            last_meeting_date=last_meeting_date,
+            next_meeting_date=next_meeting_date,
+            latest_meeting_date=latest_meeting_date,
+            meeting_count=meeting_count,
+            contact_attempt_count=contact_attempts[pk][0],
+            last_contact_datetime=contact_attempts[pk][1]
+        )
+        for (pk, state, last_meeting_date, next_meeting_date,
+             latest_meeting_date, meeting_count) in meetings
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0010_auto_20261018_0025'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='officialsummary',
+            name='contact_attempt_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of attempts to contact the official'),
+        ),
+        migrations.AddField(
+            model_name='officialsummary',
+            name='last_contact_datetime',
+            field=models.DateTimeField(blank=True, help_text='Date and time of the most recent contact attempt', null=True),
+        ),
+        migrations.AddField(
+            model_name='officialsummary',
+            name='latest_meeting_date',
+            field=models.DateField(blank=True, db_index=True, help_text="Date of the official's latest meeting, past or future", null=True),
+        ),
+        migrations.AddField(
+            model_name='officialsummary',
+            name='meeting_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of meetings'),
+        ),
+        migrations.AddField(
+            model_name='officialsummary',
+            name='state',
+            field=models.CharField(blank=True, help_text="State code of the official's division", max_length=2),
+        ),
+        migrations.AlterIndexTogether(
+            name='officialsummary',
+            index_together=set([('meeting_count', 'contact_attempt_count'), ('state', 'latest_meeting_date')]),
+        ),
+        migrations.RunPython(rebuild_summaries, migrations.RunPython.noop),
+    ]
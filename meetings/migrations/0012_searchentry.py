@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:28
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRES_SQL = {
+    'forwards': [
+        "ALTER TABLE meetings_searchentry ADD COLUMN search_vector tsvector",
+        "CREATE INDEX meetings_searchentry_search_vector "
+        "ON meetings_searchentry USING GIN (search_vector)",
+        "CREATE TRIGGER meetings_searchentry_search_vector_update "
+        "BEFORE INSERT OR UPDATE ON meetings_searchentry FOR EACH ROW "
+        "EXECUTE PROCEDURE tsvector_update_trigger("
+        "search_vector, 'pg_catalog.english', text)",
+    ],
+    'backwards': [
+        "DROP TRIGGER meetings_searchentry_search_vector_update "
+        "ON meetings_searchentry",
+        "DROP INDEX meetings_searchentry_search_vector",
+        "ALTER TABLE meetings_searchentry DROP COLUMN search_vector",
+    ],
+}
+
+SQLITE_SQL = {
+    'forwards': [
+        "CREATE VIRTUAL TABLE meetings_searchentry_fts USING fts5("
+        "text, content='meetings_searchentry', content_rowid='id', "
+        "tokenize='porter unicode61')",
+        "CREATE TRIGGER meetings_searchentry_fts_insert "
+        "AFTER INSERT ON meetings_searchentry BEGIN "
+        "INSERT INTO meetings_searchentry_fts(rowid, text) "
+        "VALUES (new.id, new.text); END",
+        "CREATE TRIGGER meetings_searchentry_fts_delete "
+        "AFTER DELETE ON meetings_searchentry BEGIN "
+        "INSERT INTO meetings_searchentry_fts(meetings_searchentry_fts, "
+        "rowid, text) VALUES ('delete', old.id, old.text); END",
+        "CREATE TRIGGER meetings_searchentry_fts_update "
+        "AFTER UPDATE ON meetings_searchentry BEGIN "
+        "INSERT INTO meetings_searchentry_fts(meetings_searchentry_fts, "
+        "rowid, text) VALUES ('delete', old.id, old.text); "
+        "INSERT INTO meetings_searchentry_fts(rowid, text) "
+        "VALUES (new.id, new.text); END",
+    ],
+    'backwards': [
+        "DROP TRIGGER meetings_searchentry_fts_update",
+        "DROP TRIGGER meetings_searchentry_fts_delete",
+        "DROP TRIGGER meetings_searchentry_fts_insert",
+        "DROP TABLE meetings_searchentry_fts",
+    ],
+}
+
+
+def run_vendor_sql(schema_editor, direction):
+    sql = {
+        'postgresql': POSTGRES_SQL,
+        'sqlite': SQLITE_SQL,
+    }.get(schema_editor.connection.vendor)
+    if sql is None:
+        return
+
+    for statement in sql[direction]:
+        schema_editor.execute(statement)
+
+
+def add_search_index(apps, schema_editor):
+    run_vendor_sql(schema_editor, 'forwards')
+
+    Official = apps.get_model('meetings', 'Official')
+    Meeting = apps.get_model('meetings', 'Meeting')
+    SearchEntry = apps.get_model('meetings', 'SearchEntry')
+
+    SearchEntry.objects.bulk_create([
+        SearchEntry(
+            official_id=official.pk,
+            text=' '.join([official.name, official.office.name,
+                official.office.division.name])
+        )
+        for official in Official.objects.select_related('office__division')
+    ])
+    SearchEntry.objects.bulk_create([
+        SearchEntry(
+            official_id=meeting.official_id,
+            meeting_id=meeting.pk,
+            text=' '.join(t for t in (meeting.location, meeting.notes) if t)
+        )
+        for meeting in Meeting.objects.only('official_id', 'location',
+            'notes')
+    ])
+
+
+def remove_search_index(apps, schema_editor):
+    SearchEntry = apps.get_model('meetings', 'SearchEntry')
+    SearchEntry.objects.all().delete()
+
+    run_vendor_sql(schema_editor, 'backwards')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0011_auto_20261018_0027'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('meeting', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='meetings.Meeting')),
+                ('official', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='meetings.Official')),
+            ],
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
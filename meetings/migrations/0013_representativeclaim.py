@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 00:39
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def add_claims(apps, schema_editor):
+    """Create expired claims for the existing officials"""
+    Official = apps.get_model('meetings', 'Official')
+    RepresentativeClaim = apps.get_model('meetings', 'RepresentativeClaim')
+
+    now = timezone.now()
+    RepresentativeClaim.objects.bulk_create([
+        RepresentativeClaim(official_id=pk, expires_at=now)
+        for pk in Official.objects.values_list('pk', flat=True).iterator()
+    ], batch_size=500)
+
+
+def remove_claims(apps, schema_editor):
+    RepresentativeClaim = apps.get_model('meetings', 'RepresentativeClaim')
+    RepresentativeClaim.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('meetings', '0012_searchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepresentativeClaim',
+            fields=[
+                ('official', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='claim', serialize=False, to='meetings.Official')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the lease ends and the official can be claimed again')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(add_claims, remove_claims),
+    ]
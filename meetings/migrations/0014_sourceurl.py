@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 01:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0013_representativeclaim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceURL',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2000)),
+                ('url_hash', models.CharField(editable=False, help_text='SHA-256 hash of the normalized URL', max_length=64, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='source_url',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sources', to='meetings.SourceURL'),
+        ),
+        migrations.AlterIndexTogether(
+            name='source',
+            index_together=set([('content_type', 'object_id')]),
+        ),
+        # Source URLs are copied to ``SourceURL`` and removed in later
+        # migrations.  Sources are updated in a separate migration, because
+        # PostgreSQL can't alter a table with pending foreign key checks in
+        # the same transaction.
+        migrations.AlterField(
+            model_name='source',
+            name='url',
+            field=models.URLField(null=True),
+        ),
+    ]
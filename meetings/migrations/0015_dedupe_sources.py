@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 01:02
+from __future__ import unicode_literals
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+from django.db import migrations, models
+
+# Number of rows handled in each query
+BATCH_SIZE = 500
+
+
+# Copies of ``SourceURL.normalize()`` and ``SourceURL.hash()``, so this
+# migration doesn't change if they do
+def normalize(url):
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+        parts.path, parts.query, parts.fragment))
+
+
+def hash_url(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def dedupe_sources(apps, schema_editor):
+    """
+    Store each source URL once and remove sources that repeat a URL
+
+    Sources of the same object whose URLs are the same once normalized are
+    merged, keeping the oldest.
+
+    """
+    Source = apps.get_model('meetings', 'Source')
+    SourceURL = apps.get_model('meetings', 'SourceURL')
+
+    urls = {url: normalize(url) for url in
+            Source.objects.order_by().values_list('url', flat=True)
+            .distinct().iterator()}
+
+    normalized_urls = set(urls.values())
+    for chunk in chunks(normalized_urls):
+        SourceURL.objects.bulk_create([
+            SourceURL(url=url, url_hash=hash_url(url)) for url in chunk])
+
+    ids = {}
+    for chunk in chunks(hash_url(url) for url in normalized_urls):
+        ids.update(SourceURL.objects.filter(url_hash__in=chunk)
+            .values_list('url_hash', 'pk'))
+
+    for chunk in chunks(urls):
+        Source.objects.filter(url__in=chunk).update(source_url=models.Case(
+            *[models.When(url=url, then=models.Value(
+                ids[hash_url(urls[url])])) for url in chunk],
+            output_field=models.IntegerField()))
+
+    seen = set()
+    duplicates = []
+    for pk, *key in Source.objects.order_by('pk').values_list('pk',
+            'content_type_id', 'object_id', 'source_url_id').iterator():
+        key = tuple(key)
+        if key in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(key)
+
+    for chunk in chunks(duplicates):
+        Source.objects.filter(pk__in=chunk).delete()
+
+
+def restore_urls(apps, schema_editor):
+    Source = apps.get_model('meetings', 'Source')
+    SourceURL = apps.get_model('meetings', 'SourceURL')
+
+    for source_url in SourceURL.objects.iterator():
+        Source.objects.filter(source_url=source_url).update(
+            url=source_url.url)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0014_sourceurl'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_sources, restore_urls),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 01:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0015_dedupe_sources'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='source',
+            name='url',
+        ),
+        migrations.AlterField(
+            model_name='source',
+            name='source_url',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sources', to='meetings.SourceURL'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.5 on 2026-10-18 01:14
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0016_remove_source_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=254, unique=True)),
+                ('path', models.TextField(help_text='Absolute path of the imported file')),
+                ('rows', models.PositiveIntegerField(default=0, help_text='Number of rows that have been imported or skipped')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,4 +1,7 @@
 from datetime import datetime
+import hashlib
+import random
+from urllib.parse import urlsplit, urlunsplit
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
@@ -8,7 +11,74 @@ from django.utils.text import slugify
 
 import archieml
 
-from .query import OfficialQuerySet
+from .fields import JSONField
+from .query import (OfficialQuerySet, OfficialSummaryQuerySet,
+    RepresentativeClaimQuerySet, SourceQuerySet, SourceURLQuerySet)
+
+
+# Increment this when ``parse_notes()`` changes so meetings whose notes were
+# parsed with an older version can be found and parsed again
+NOTES_SCHEMA_VERSION = 1
+
+
+def parse_ocd_id(ocd_id):
+    """
+    Parse an Open Civic Data division ID into its components
+
+    Args:
+        ocd_id (string): OCD division ID, for example
+            "ocd-division/country:us/state:ky/cd:5".
+
+    Returns:
+        Dictionary with the division's country, state, district type,
+        district number and the OCD ID of its parent division.  Components
+        that aren't part of the ID are blank.
+
+    """
+    components = {
+        'country': '',
+        'state': '',
+        'district_type': '',
+        'district_number': None,
+        'parent_ocd_id': '',
+    }
+
+    bits = ocd_id.split('/')
+    parts = [bit.split(':', 1) for bit in bits[1:] if ':' in bit]
+    for part_type, part_id in parts:
+        if part_type in ('country', 'state'):
+            components[part_type] = part_id
+
+    if len(parts) > 1:
+        components['parent_ocd_id'] = '/'.join(bits[:-1])
+
+        part_type, part_id = parts[-1]
+        if part_type not in ('country', 'state'):
+            components['district_type'] = part_type
+            if part_id.isdigit():
+                components['district_number'] = int(part_id)
+
+    return components
+
+
+def parse_notes(notes):
+    """
+    Parse ArchieML notes into a dictionary
+
+    Args:
+        notes (string): ArchieML text.
+
+    Returns:
+        Dictionary of the values from the notes, keyed by the slugified
+        keys with underscores instead of hyphens.
+
+    """
+    normalized = {}
+    parsed = archieml.loads(notes)
+    for k, v in parsed.items():
+        normalized[slugify(k).replace('-', '_')] = v
+
+    return normalized
 
 
 class Division(models.Model):
@@ -23,12 +93,60 @@ class Division(models.Model):
         max_length=254,
         help_text="Name of political division")
 
+    # These are parsed from the OCD ID when the division is saved so
+    # divisions can be looked up using indexes
+    country = models.CharField(
+        max_length=2,
+        blank=True,
+        editable=False,
+        help_text="Country code from the OCD ID")
+    state = models.CharField(
+        max_length=2,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="State code from the OCD ID")
+    district_type = models.CharField(
+        max_length=50,
+        blank=True,
+        editable=False,
+        help_text="Type of the division below the state level, e.g. 'cd'")
+    district_number = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Number of the division below the state level")
+    parent_ocd_id = models.CharField(
+        max_length=254,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="OCD ID of the division that contains this one")
+
     class Meta:
         ordering = ['ocd_id']
+        index_together = [
+            ['country', 'district_type', 'state'],
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.parse_ocd_id()
+        super(Division, self).save(*args, **kwargs)
+
+    def parse_ocd_id(self):
+        """
+        Set the fields parsed from the OCD ID
+
+        This is called when the division is saved, but needs to be called
+        explicitly when creating divisions with ``bulk_create()``.
+
+        """
+        for name, value in parse_ocd_id(self.ocd_id).items():
+            setattr(self, name, value)
+
 
 class Office(models.Model):
     """Political office"""
@@ -46,6 +164,10 @@ class Office(models.Model):
         return self.name
 
 
+def get_random_key():
+    return random.random()
+
+
 class Official(models.Model):
     """A person holding political office"""
 
@@ -64,6 +186,11 @@ class Official(models.Model):
         on_delete=models.CASCADE,
         related_name='officials'
     )
+    random_key = models.FloatField(
+        default=get_random_key,
+        db_index=True,
+        editable=False,
+        help_text="Random number used to pick officials at random")
 
     objects = OfficialQuerySet.as_manager()
 
@@ -81,6 +208,64 @@ class Official(models.Model):
         return slugify(self.name)
 
 
+class OfficialSummary(models.Model):
+    """
+    Summary of an official's meetings and contact attempts
+
+    This duplicates information from the official's meetings and contact
+    attempts so that many officials can be listed along with their meeting
+    dates in a single query, and so officials without recent meetings can be
+    found with range scans over this table's indexes.  It's updated when
+    meetings and contact attempts are saved or deleted.  It also needs to be
+    updated daily, with the ``updateofficialsummaries`` management command,
+    because the next meeting becomes the last meeting once its date passes.
+
+    """
+    official = models.OneToOneField(
+        'Official',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary')
+    state = models.CharField(
+        max_length=2,
+        blank=True,
+        help_text="State code of the official's division")
+    last_meeting_date = models.DateField(
+        blank=True,
+        null=True,
+        help_text="Date of the most recent meeting before today")
+    next_meeting_date = models.DateField(
+        blank=True,
+        null=True,
+        help_text="Date of the first meeting on or after today")
+    latest_meeting_date = models.DateField(
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="Date of the official's latest meeting, past or future")
+    meeting_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of meetings")
+    contact_attempt_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of attempts to contact the official")
+    last_contact_datetime = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Date and time of the most recent contact attempt")
+
+    objects = OfficialSummaryQuerySet.as_manager()
+
+    class Meta:
+        index_together = [
+            ['state', 'latest_meeting_date'],
+            ['meeting_count', 'contact_attempt_count'],
+        ]
+
+    def __str__(self):
+        return str(self.official)
+
+
 class Address(models.Model):
     """Mailing address for an official"""
 
@@ -181,19 +366,57 @@ class Meeting(models.Model):
         choices=MEETING_TYPE_CHOICES, blank=True, null=True)
     event_website = models.URLField(blank=True)
     notes = models.TextField(blank=True)
+    # These are parsed from the notes when the meeting is saved so the notes
+    # don't have to be parsed each time the fields are needed
+    notes_fields = JSONField(
+        default=dict,
+        editable=False,
+        help_text="Fields parsed from the ArchieML notes")
+    notes_version = models.PositiveSmallIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        help_text="Version of the parser used to parse the notes")
     official = models.ForeignKey('Official', related_name='meetings')
     sources = GenericRelation('Source', related_query_name='meetings')
 
+    class Meta:
+        # Serves looking up an official's meetings by date, such as when
+        # finding officials without meetings since a date
+        index_together = [
+            ['official', 'date'],
+        ]
+
     def __str__(self):
         return "{} on {}".format(self.official, self.date)
 
+    def save(self, *args, **kwargs):
+        self.parse_notes()
+        super(Meeting, self).save(*args, **kwargs)
+
+    def parse_notes(self):
+        """
+        Set the fields parsed from the notes
+
+        This is called when the meeting is saved, but needs to be called
+        explicitly before saving meetings with ``bulk_create()``.
+
+        """
+        self.notes_fields = parse_notes(self.notes)
+        self.notes_version = NOTES_SCHEMA_VERSION
+
     def fields_from_notes(self):
-        normalized = {}
-        parsed = archieml.loads(self.notes)
-        for k, v in parsed.items():
-            normalized[slugify(k).replace('-', '_')] = v
+        """
+        Returns the fields from the notes
+
+        The stored fields are used unless they were parsed by an older
+        version of the parser.
 
-        return normalized
+        """
+        if self.notes_version != NOTES_SCHEMA_VERSION:
+            return parse_notes(self.notes)
+
+        return self.notes_fields
 
 
 class ContactAttempt(models.Model):
@@ -210,17 +433,178 @@ class ContactAttempt(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL)
     official = models.ForeignKey('Official', related_name='contact_attempts')
 
+    class Meta:
+        index_together = [
+            ['official', 'datetime'],
+        ]
+
     def __str__(self):
         return "{} on {} by {}".format(self.official, self.datetime, self.user)
 
 
+class RepresentativeClaim(models.Model):
+    """
+    Lease on an official, given to a user who's going to contact them
+
+    While the lease lasts, the official isn't given to other users.  There's
+    at most one claim for each official.  Expired claims are kept and
+    reused when the official is claimed again.
+
+    """
+    official = models.OneToOneField(
+        'Official',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='claim')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+')
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="When the lease ends and the official can be claimed again")
+
+    objects = RepresentativeClaimQuerySet.as_manager()
+
+    def __str__(self):
+        return "{} claimed by {}".format(self.official, self.user)
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Number of rows of a file that have been imported by ``importmeetings``
+
+    The checkpoint is saved in the same transaction as each batch of
+    meetings, so an interrupted import resumes right after the last batch
+    that was saved.
+
+    """
+    name = models.CharField(max_length=254, unique=True)
+    path = models.TextField(help_text="Absolute path of the imported file")
+    rows = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of rows that have been imported or skipped")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "{} ({} rows)".format(self.name, self.rows)
+
+
+class DataVersion(models.Model):
+    """
+    Version of data that's cached or served with conditional responses
+
+    Versions are kept in the database rather than the cache, so they're
+    never culled and are changed in the same transaction as the data they
+    cover.  See ``meetings.versions``.
+
+    """
+    key = models.CharField(max_length=254, unique=True)
+    version = models.CharField(max_length=64)
+
+    def __str__(self):
+        return "{}: {}".format(self.key, self.version)
+
+
+class SourceURL(models.Model):
+    """
+    URL that's the source of one or more pieces of information
+
+    Each URL is stored once, however many sources cite it.  URLs are
+    normalized and looked up by a hash of the normalized URL, which has a
+    unique index.  The hash is short and has a fixed length, unlike the
+    URL, so the index stays small.
+
+    """
+    url = models.URLField(max_length=2000)
+    url_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        editable=False,
+        help_text="SHA-256 hash of the normalized URL")
+
+    objects = SourceURLQuerySet.as_manager()
+
+    def __str__(self):
+        return self.url
+
+    @staticmethod
+    def normalize(url):
+        """
+        Normalize a URL so different ways of writing it are stored once
+
+        Surrounding whitespace is removed and the scheme and host are
+        lowercased.  The rest of the URL can be case sensitive, so it's
+        kept as it is.
+
+        """
+        parts = urlsplit(url.strip())
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+            parts.path, parts.query, parts.fragment))
+
+    @staticmethod
+    def hash(url):
+        """Hash a normalized URL"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.url = self.normalize(self.url)
+        self.url_hash = self.hash(self.url)
+        super(SourceURL, self).save(*args, **kwargs)
+
+
 class Source(models.Model):
     """Source for a piece of information in this system"""
 
-    url = models.URLField()
+    source_url = models.ForeignKey(
+        'SourceURL',
+        on_delete=models.PROTECT,
+        related_name='sources')
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
 
+    objects = SourceQuerySet.as_manager()
+
+    class Meta:
+        # Serves looking up the sources of an object
+        index_together = [
+            ['content_type', 'object_id'],
+        ]
+
     def __str__(self):
         return self.url
+
+    @property
+    def url(self):
+        return self.source_url.url
+
+
+class SearchEntry(models.Model):
+    """
+    Searchable text for an official or one of their meetings
+
+    Entries for officials have the names of the official, their office and
+    their division.  Entries for meetings have the meeting's location and
+    notes.  The full-text index over ``text`` isn't a model field.  It's
+    maintained by database triggers that are created by a migration: a
+    ``tsvector`` column with a GIN index on PostgreSQL and an FTS5 table on
+    SQLite.  See ``meetings.search``.
+
+    """
+    official = models.ForeignKey(
+        'Official',
+        on_delete=models.CASCADE,
+        related_name='+')
+    meeting = models.ForeignKey(
+        'Meeting',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+')
+    text = models.TextField()
+
+    def __str__(self):
+        return str(self.meeting or self.official)
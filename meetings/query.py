@@ -1,22 +1,46 @@
-from django.db import models
+from datetime import datetime, timedelta
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .versions import bump_official_versions
 
 
 class OfficialQuerySet(models.QuerySet):
     def us_reps(self):
         """Get officials that are members of the United States House of Representatives"""
         return self.filter(
-            office__division__ocd_id__regex=r'ocd-division/country:us/state:[a-z]{2}/cd:\d+')
+            office__division__country='us',
+            office__division__district_type='cd',
+            office__division__state__gt='',
+            office__division__district_number__isnull=False)
+
+    def children_of(self, ocd_id):
+        """Get officials for the divisions directly within a division"""
+        return self.filter(office__division__parent_ocd_id=ocd_id)
+
+    def in_state(self, state):
+        """Get officials for divisions in a state, given its postal code"""
+        return self.filter(office__division__state=state.lower())
+
+    # The filters on meetings and contact attempts use the officials'
+    # summaries, so they're lookups on the summaries' indexes rather than
+    # aggregates over every meeting or contact attempt.  Officials whose
+    # summaries haven't been created yet, such as bulk created officials,
+    # are counted as having no meetings or contact attempts.
 
     def without_meetings(self):
-        return self.annotate(num_meetings=models.Count('meetings'))\
-                   .filter(num_meetings=0)
+        return self.filter(models.Q(summary__meeting_count=0) |
+            models.Q(summary__isnull=True))
 
     def without_meetings_since(self, date):
         """Get officials without a meeting since a given date"""
-
-        return self.annotate(num_meetings=models.Count(
-            models.Case(models.When(meetings__date__gte=date, then=1))))\
-        .filter(num_meetings=0)
+        return self.filter(models.Q(summary__latest_meeting_date__lt=date) |
+            models.Q(summary__meeting_count=0) |
+            models.Q(summary__isnull=True))
 
     def promotes_meetings_through_twitter(self):
         q = (models.Q(meeting_info_source__icontains="social media") |
@@ -24,13 +48,340 @@ class OfficialQuerySet(models.QuerySet):
         return self.filter(q)
 
     def without_contact_attempts(self):
-        return self.annotate(num_contact_attempts=models.Count('contact_attempts'))\
-            .filter(num_contact_attempts=0)
+        return self.filter(models.Q(summary__contact_attempt_count=0) |
+            models.Q(summary__isnull=True))
 
     def order_by_contact_attempts(self, desc=False):
         order_by = 'num_contact_attempts'
         if desc:
             order_by = '-' + order_by
 
-        return self.annotate(num_contact_attempts=models.Count('contact_attempts'))\
-           .order_by(order_by)
+        return self.annotate(
+            num_contact_attempts=Coalesce('summary__contact_attempt_count',
+                0))\
+            .order_by(order_by)
+
+
+class OfficialSummaryQuerySet(models.QuerySet):
+    # Fields computed by ``refresh()``, in the order it computes them
+    summary_fields = (
+        'state',
+        'last_meeting_date',
+        'next_meeting_date',
+        'latest_meeting_date',
+        'meeting_count',
+        'contact_attempt_count',
+        'last_contact_datetime',
+    )
+
+    def stale(self, today=None):
+        """Get summaries whose next meeting date has passed"""
+        if today is None:
+            today = datetime.now().date()
+
+        return self.filter(next_meeting_date__lt=today)
+
+    def refresh(self, official_ids=None, today=None, bump=True):
+        """
+        Recompute the summaries of officials
+
+        Args:
+            official_ids (list): IDs of officials whose summaries should be
+                recomputed.  Defaults to all officials.
+            today (date): Date that separates last meetings from next
+                meetings.  Defaults to the current date.
+            bump (bool): Whether to bump the versions of the officials whose
+                summaries changed.  Pass ``False`` when the caller bumps
+                them along with the data version.
+
+        Returns:
+            List of IDs of officials whose summaries changed.
+
+        """
+        if today is None:
+            today = datetime.now().date()
+
+        Official = self.model._meta.get_field('official').related_model
+        officials = Official.objects.order_by()
+        existing = self.all()
+        if official_ids is not None:
+            official_ids = list(official_ids)
+            officials = officials.filter(pk__in=official_ids)
+            existing = existing.filter(official_id__in=official_ids)
+
+        # Meetings and contact attempts are aggregated in separate queries
+        # because joining both would count each meeting once per contact
+        # attempt
+        meetings = officials.annotate(
+            last_meeting_date=models.Max(models.Case(
+                models.When(meetings__date__lt=today,
+                    then='meetings__date'),
+                output_field=models.DateField())),
+            next_meeting_date=models.Min(models.Case(
+                models.When(meetings__date__gte=today,
+                    then='meetings__date'),
+                output_field=models.DateField())),
+            latest_meeting_date=models.Max('meetings__date'),
+            meeting_count=models.Count('meetings'),
+        ).values_list('pk', 'office__division__state', 'last_meeting_date',
+            'next_meeting_date', 'latest_meeting_date', 'meeting_count')
+        contact_attempts = officials.annotate(
+            contact_attempt_count=models.Count('contact_attempts'),
+            last_contact_datetime=models.Max('contact_attempts__datetime'),
+        ).values_list('pk', 'contact_attempt_count', 'last_contact_datetime')
+
+        summaries = {s[0]: (s[1] or '',) + s[2:] for s in meetings}
+        for s in contact_attempts:
+            summaries[s[0]] += s[1:]
+
+        existing = {s[0]: s[1:] for s in existing.values_list(
+            'official_id', *self.summary_fields)}
+
+        changed_ids = [pk for pk in set(summaries) | set(existing)
+                       if summaries.get(pk) != existing.get(pk)]
+        if not changed_ids:
+            return changed_ids
+
+        with transaction.atomic():
+            self.filter(official_id__in=changed_ids).delete()
+            self.bulk_create([
+                self.model(official_id=pk,
+                    **dict(zip(self.summary_fields, summaries[pk])))
+                for pk in changed_ids if pk in summaries
+            ])
+
+        # Summaries are shown in the list of officials
+        if bump:
+            bump_official_versions(changed_ids)
+
+        return changed_ids
+
+    def rebuild(self):
+        """
+        Recompute the summaries of all officials from scratch
+
+        Returns:
+            List of IDs of officials whose summaries were created.
+
+        """
+        with transaction.atomic():
+            self.all().delete()
+            return self.refresh()
+
+
+class RepresentativeClaimQuerySet(models.QuerySet):
+    def active(self, now=None):
+        """Get claims whose leases haven't expired"""
+        if now is None:
+            now = timezone.now()
+
+        return self.filter(expires_at__gt=now)
+
+    def claim(self, officials, user, ttl=None, now=None):
+        """
+        Lease an official to a user so other users aren't given them
+
+        If the user already holds an unexpired lease on one of the
+        officials, that lease is returned.  Otherwise a random official
+        whose lease has expired is leased to the user.  Leases expire on
+        their own, so officials whose users never finish with them go back
+        into the pool.
+
+        Instead of sorting the officials randomly, this seeks to the first
+        expired claim whose official's random key is at or after a random
+        number, wrapping around to the smallest key.  Both are lookups on
+        the index on the random key.  Officials preceded by a large gap
+        between keys are more likely to be picked, so the leased official
+        gets a new random key.  This keeps the keys independent and
+        uniformly distributed, which makes every official equally likely to
+        be leased.
+
+        Concurrent claims lease different officials without waiting for
+        each other.  On PostgreSQL, the lease is picked with
+        ``SELECT ... FOR UPDATE SKIP LOCKED``, so officials that are being
+        claimed by another transaction are skipped.  On other databases,
+        the lease is picked and updated in a single conditional
+        ``UPDATE``.
+
+        Args:
+            officials (QuerySet): Officials that can be claimed.  Their
+                claims are created by ``add()`` when they're created.
+            user (User): User claiming an official.
+            ttl (timedelta): How long the lease lasts.  Defaults to the
+                ``REPRESENTATIVE_CLAIM_TTL`` setting, in minutes.
+            now (datetime): Defaults to the current time.
+
+        Returns:
+            A claim, with its official, or ``None`` if every official is
+            claimed.
+
+        """
+        if now is None:
+            now = timezone.now()
+
+        if ttl is None:
+            ttl = timedelta(minutes=settings.REPRESENTATIVE_CLAIM_TTL)
+
+        claims = self.filter(official__in=officials)\
+            .select_related('official__office__division')
+        claim = claims.active(now).filter(user=user)\
+            .order_by('-expires_at').first()
+        if claim is not None:
+            return claim
+
+        key = random.random()
+        available = self.filter(official__in=officials,
+                expires_at__lte=now)\
+            .order_by('official__random_key')\
+            .values('pk')
+        expires_at = now + ttl
+        for candidates in (available.filter(official__random_key__gte=key),
+                           available.filter(official__random_key__lt=key)):
+            if self._lease(candidates[:1], user, expires_at):
+                break
+        else:
+            return None
+
+        claim = claims.filter(user=user, expires_at=expires_at).first()
+        if claim is not None:
+            Official = self.model._meta.get_field('official').related_model
+            claim.official.random_key = random.random()
+            Official.objects.filter(pk=claim.official.pk)\
+                .update(random_key=claim.official.random_key)
+
+        return claim
+
+    def _lease(self, candidates, user, expires_at):
+        """Lease the first of the candidate claims that isn't locked"""
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return bool(self.filter(pk__in=candidates).update(user=user,
+                expires_at=expires_at))
+
+        with transaction.atomic(using=self.db):
+            sql, params = candidates.query.sql_with_params()
+            sql += " FOR UPDATE OF {} SKIP LOCKED".format(
+                connection.ops.quote_name(self.model._meta.db_table))
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+
+            if row is None:
+                return False
+
+            return bool(self.filter(pk=row[0]).update(user=user,
+                expires_at=expires_at))
+
+    def add(self, official_ids, now=None):
+        """
+        Create expired claims for new officials
+
+        ``bulk_create()`` doesn't send signals, so call this after bulk
+        creating officials.
+
+        """
+        if now is None:
+            now = timezone.now()
+
+        claims = [self.model(official_id=pk, expires_at=now)
+                  for pk in official_ids]
+        if not claims:
+            return
+
+        try:
+            with transaction.atomic(using=self.db):
+                self.bulk_create(claims)
+        except IntegrityError:
+            # Another request added some of them first
+            for claim in claims:
+                self.get_or_create(official_id=claim.official_id,
+                    defaults={'expires_at': now})
+
+    def release(self, official, user):
+        """Give up a user's lease on an official"""
+        return self.filter(official=official, user=user).update(
+            user=None, expires_at=timezone.now())
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SourceURLQuerySet(models.QuerySet):
+    # Number of URLs looked up in each query
+    batch_size = 500
+
+    def ids_for(self, urls):
+        """
+        Get the IDs of the rows for URLs, creating the rows that don't exist
+
+        Args:
+            urls (list): URLs, which don't need to be normalized.
+
+        Returns:
+            Dictionary of IDs keyed by the URLs as they were given.
+
+        """
+        normalized = {url: self.model.normalize(url) for url in urls}
+        hashes = {url: self.model.hash(url)
+                  for url in set(normalized.values())}
+
+        ids = {}
+        for chunk in _chunks(hashes.values(), self.batch_size):
+            ids.update(self.filter(url_hash__in=chunk)
+                .values_list('url_hash', 'pk'))
+
+        missing = [self.model(url=url, url_hash=url_hash)
+                   for url, url_hash in hashes.items() if url_hash not in ids]
+        if missing:
+            try:
+                with transaction.atomic(using=self.db):
+                    self.bulk_create(missing)
+            except IntegrityError:
+                # Another transaction created some of them first, so create
+                # them one at a time
+                for source_url in missing:
+                    ids[source_url.url_hash] = self.get_or_create(
+                        url_hash=source_url.url_hash,
+                        defaults={'url': source_url.url})[0].pk
+            else:
+                for chunk in _chunks([u.url_hash for u in missing],
+                        self.batch_size):
+                    ids.update(self.filter(url_hash__in=chunk)
+                        .values_list('url_hash', 'pk'))
+
+        return {url: ids[hashes[normalized_url]]
+                for url, normalized_url in normalized.items()}
+
+
+class SourceQuerySet(models.QuerySet):
+    def prefetch_urls(self, objects):
+        """
+        Load the source URLs of many objects of the same model
+
+        Like ``prefetch_related()``, this takes one query however many
+        objects there are, but it only loads the URLs, rather than a
+        ``Source`` and a ``SourceURL`` for each one.  The URLs are set as a
+        ``source_urls`` list on each object, in the order they were added.
+
+        """
+        objects = list(objects)
+        if not objects:
+            return objects
+
+        ContentType = self.model._meta.get_field('content_type').related_model
+        content_type = ContentType.objects.get_for_model(objects[0])
+        rows = self.filter(content_type=content_type,
+                object_id__in=set(obj.pk for obj in objects))\
+            .order_by('pk')\
+            .values_list('object_id', 'source_url__url')
+        urls = {}
+        for object_id, url in rows:
+            urls.setdefault(object_id, []).append(url)
+
+        for obj in objects:
+            obj.source_urls = urls.get(obj.pk, [])
+
+        return objects
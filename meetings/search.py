@@ -0,0 +1,226 @@
+"""
+Full-text search over officials and meetings
+
+Searchable text is copied into ``SearchEntry`` rows, one for each official
+and one for each meeting.  Database triggers, created by a migration, keep a
+full-text index of the entries up to date:
+
+* On PostgreSQL, the ``search_vector`` column of the entries table holds a
+  ``tsvector`` of the text and has a GIN index.
+* On SQLite, an FTS5 table whose content is the entries table indexes the
+  text.
+
+Other databases fall back to unindexed ``LIKE`` matches.
+
+The entries are updated when officials, offices, divisions and meetings are
+saved, but not when they're created with ``bulk_create()``.  Code that does
+that needs to call ``index_officials()`` or ``index_meetings()`` itself.
+
+"""
+import re
+
+from django.db import connections, transaction
+
+from .models import Meeting, Official, SearchEntry
+
+
+# Text search configuration used to parse text and queries on PostgreSQL
+POSTGRES_CONFIG = 'english'
+
+# Name of the FTS5 table on SQLite
+FTS_TABLE = 'meetings_searchentry_fts'
+
+
+def get_terms(query):
+    """Split a search query into terms"""
+    return re.findall(r'\w+', query, re.UNICODE)
+
+
+def official_text(official):
+    """Get the searchable text for an official"""
+    return ' '.join([
+        official.name,
+        official.office.name,
+        official.office.division.name,
+    ])
+
+
+def meeting_text(meeting):
+    """Get the searchable text for a meeting"""
+    return ' '.join(t for t in (meeting.location, meeting.notes) if t)
+
+
+def index_officials(official_ids):
+    """Create or replace the search entries of officials"""
+    official_ids = list(official_ids)
+    officials = Official.objects.filter(pk__in=official_ids)\
+        .select_related('office__division')
+
+    with transaction.atomic():
+        SearchEntry.objects.filter(official_id__in=official_ids,
+            meeting__isnull=True).delete()
+        SearchEntry.objects.bulk_create([
+            SearchEntry(official=official, text=official_text(official))
+            for official in officials
+        ])
+
+
+def index_meetings(meeting_ids):
+    """Create or replace the search entries of meetings"""
+    meeting_ids = list(meeting_ids)
+    meetings = Meeting.objects.filter(pk__in=meeting_ids)\
+        .only('official_id', 'location', 'notes')
+
+    with transaction.atomic():
+        SearchEntry.objects.filter(meeting_id__in=meeting_ids).delete()
+        SearchEntry.objects.bulk_create([
+            SearchEntry(official_id=meeting.official_id, meeting=meeting,
+                text=meeting_text(meeting))
+            for meeting in meetings
+        ])
+
+
+def rebuild_index(chunk_size=1000):
+    """
+    Recreate the search entries of every official and meeting
+
+    Returns:
+        Number of entries that were created.
+
+    """
+    def chunks(qs):
+        ids = list(qs.values_list('pk', flat=True).order_by('pk'))
+        for i in range(0, len(ids), chunk_size):
+            yield ids[i:i + chunk_size]
+
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+
+        for official_ids in chunks(Official.objects.all()):
+            index_officials(official_ids)
+
+        for meeting_ids in chunks(Meeting.objects.all()):
+            index_meetings(meeting_ids)
+
+        return SearchEntry.objects.count()
+
+
+class SearchResults(object):
+    """
+    Search entries matching a query, ordered by how well they match
+
+    The entries are only fetched when the results are sliced, one page at a
+    time, so this can be passed to a ``django.core.paginator.Paginator``.
+    Each entry gets a ``rank`` attribute.  Higher ranks are better matches.
+
+    """
+    def __init__(self, query, using='default'):
+        self.query = query
+        self.terms = get_terms(query)
+        self.using = using
+
+    @property
+    def vendor(self):
+        return connections[self.using].vendor
+
+    def _fetch(self, sql, params):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _where(self):
+        """Get the condition and parameters that match the query"""
+        qn = connections[self.using].ops.quote_name
+        table = qn(SearchEntry._meta.db_table)
+
+        if self.vendor == 'postgresql':
+            return (
+                "{table}.search_vector @@ plainto_tsquery(%s, %s)".format(
+                    table=table),
+                [POSTGRES_CONFIG, ' '.join(self.terms)])
+
+        if self.vendor == 'sqlite':
+            # Quote each term so FTS5 doesn't interpret it as an operator
+            return (
+                "{table}.id IN (SELECT rowid FROM {fts} "
+                "WHERE {fts} MATCH %s)".format(table=table,
+                    fts=qn(FTS_TABLE)),
+                [' '.join('"{}"'.format(t) for t in self.terms)])
+
+        return (
+            ' AND '.join(["{}.text LIKE %s".format(table)] *
+                len(self.terms)),
+            ['%{}%'.format(t) for t in self.terms])
+
+    def _ranked_ids(self, offset, limit):
+        """Get the IDs and ranks of a page of matching entries"""
+        qn = connections[self.using].ops.quote_name
+        table = qn(SearchEntry._meta.db_table)
+
+        if self.vendor == 'postgresql':
+            sql = ("SELECT id, ts_rank(search_vector, plainto_tsquery(%s, %s)) "
+                   "AS search_rank FROM {table} WHERE {where} "
+                   "ORDER BY search_rank DESC, id LIMIT %s OFFSET %s")
+            params = [POSTGRES_CONFIG, ' '.join(self.terms)]
+
+        elif self.vendor == 'sqlite':
+            # FTS5's rank is a BM25 score, where lower is better
+            sql = ("SELECT rowid, -rank FROM {fts} WHERE {fts} MATCH %s "
+                   "ORDER BY rank, rowid LIMIT %s OFFSET %s")
+            params = [' '.join('"{}"'.format(t) for t in self.terms),
+                limit, offset]
+            return self._fetch(sql.format(fts=qn(FTS_TABLE)), params)
+
+        else:
+            sql = ("SELECT id, 0 FROM {table} WHERE {where} "
+                   "ORDER BY id LIMIT %s OFFSET %s")
+            params = []
+
+        where, where_params = self._where()
+        return self._fetch(sql.format(table=table, where=where),
+            params + where_params + [limit, offset])
+
+    def count(self):
+        if not self.terms:
+            return 0
+
+        where, params = self._where()
+        sql = "SELECT COUNT(*) FROM {table} WHERE {where}".format(
+            table=connections[self.using].ops.quote_name(
+                SearchEntry._meta.db_table),
+            where=where)
+        return self._fetch(sql, params)[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("Search results can only be sliced")
+
+        offset = key.start or 0
+        if key.stop is None or not self.terms:
+            limit = 0
+        else:
+            limit = max(key.stop - offset, 0)
+
+        if not limit:
+            return []
+
+        ranked = self._ranked_ids(offset, limit)
+        entries = SearchEntry.objects.using(self.using)\
+            .select_related('official__office__division', 'meeting')\
+            .in_bulk([pk for pk, rank in ranked])
+
+        results = []
+        for pk, rank in ranked:
+            entry = entries[pk]
+            entry.rank = rank
+            results.append(entry)
+
+        return results
+
+
+def search(query, using='default'):
+    """Search officials and meetings"""
+    return SearchResults(query, using)
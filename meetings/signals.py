@@ -0,0 +1,196 @@
+from contextlib import contextmanager
+from functools import wraps
+import threading
+
+from django.db.models.signals import post_delete, post_save
+
+from .models import (Division, Office, Official, OfficialSummary, Address,
+    Email, Phone, SocialMediaChannel, Website, Meeting, ContactAttempt,
+    RepresentativeClaim, Source)
+from .search import index_meetings, index_officials
+from .versions import bump_data_version, bump_official_versions
+
+_deferred = threading.local()
+
+
+@contextmanager
+def defer_updates():
+    """
+    Skip the summary, search and version updates of the handlers here
+
+    Use this when saving several objects for the same official, then do
+    the updates once for all of them, as ``meetings.bulk.create_meetings()``
+    does for bulk inserts.
+
+    """
+    depth = getattr(_deferred, 'depth', 0)
+    _deferred.depth = depth + 1
+    try:
+        yield
+    finally:
+        _deferred.depth = depth
+
+
+def deferrable(handler):
+    """Make a signal handler do nothing inside ``defer_updates()``"""
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not getattr(_deferred, 'depth', 0):
+            return handler(*args, **kwargs)
+
+    return wrapper
+
+
+@deferrable
+def data_changed(sender, **kwargs):
+    bump_data_version()
+
+
+@deferrable
+def official_page_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    if sender is Official:
+        official_ids = [instance.pk]
+    elif sender is Office:
+        official_ids = instance.officials.values_list('pk', flat=True)
+    elif sender is Division:
+        official_ids = Official.objects.filter(office__division=instance)\
+            .values_list('pk', flat=True)
+    else:
+        official_ids = [instance.official_id]
+
+    bump_official_versions(official_ids)
+
+
+@deferrable
+def official_saved(sender, instance, raw=False, update_fields=None,
+        **kwargs):
+    # Creates the summary of new officials and updates the state of officials
+    # whose office changed
+    if raw or (update_fields is not None and 'office' not in update_fields):
+        return
+
+    OfficialSummary.objects.refresh([instance.pk])
+
+
+def official_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        RepresentativeClaim.objects.add([instance.pk])
+
+
+@deferrable
+def official_text_changed(sender, instance, raw=False, update_fields=None,
+        **kwargs):
+    if raw:
+        return
+
+    # Saves that only update other fields don't change the searchable text
+    if update_fields is not None and not (update_fields &
+            SEARCHABLE_FIELDS[sender]):
+        return
+
+    if sender is Official:
+        index_officials([instance.pk])
+    elif sender is Office:
+        index_officials(instance.officials.values_list('pk', flat=True))
+    elif sender is Division:
+        index_officials(Official.objects.filter(office__division=instance)
+            .values_list('pk', flat=True))
+
+
+@deferrable
+def meeting_text_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_meetings([instance.pk])
+
+
+@deferrable
+def summary_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        OfficialSummary.objects.refresh([instance.official_id])
+
+
+# Models whose data is served by the API
+VERSIONED_MODELS = (
+    Division,
+    Office,
+    Official,
+    Email,
+    Phone,
+    SocialMediaChannel,
+    Meeting,
+    Source,
+)
+
+# Models whose data is shown on officials' pages.  Changes to the summaries
+# are handled by ``OfficialSummary.objects.refresh()``, which doesn't send
+# signals.
+OFFICIAL_PAGE_MODELS = (
+    Division,
+    Office,
+    Official,
+    Address,
+    Email,
+    Phone,
+    SocialMediaChannel,
+    Website,
+    Meeting,
+    ContactAttempt,
+)
+
+# Models that are summarized by ``OfficialSummary``
+SUMMARIZED_MODELS = (
+    Meeting,
+    ContactAttempt,
+)
+
+# Models whose text is in the search entries of officials
+OFFICIAL_TEXT_MODELS = (
+    Division,
+    Office,
+    Official,
+)
+
+# Fields of those models whose values are in the search entries
+SEARCHABLE_FIELDS = {
+    Division: frozenset(['name']),
+    Office: frozenset(['name', 'division']),
+    Official: frozenset(['name', 'office']),
+}
+
+for model in VERSIONED_MODELS:
+    post_save.connect(data_changed, sender=model,
+        dispatch_uid='meetings_data_changed_save_{}'.format(model.__name__))
+    post_delete.connect(data_changed, sender=model,
+        dispatch_uid='meetings_data_changed_delete_{}'.format(model.__name__))
+
+for model in OFFICIAL_PAGE_MODELS:
+    post_save.connect(official_page_changed, sender=model,
+        dispatch_uid='meetings_official_page_changed_save_{}'.format(
+            model.__name__))
+    post_delete.connect(official_page_changed, sender=model,
+        dispatch_uid='meetings_official_page_changed_delete_{}'.format(
+            model.__name__))
+
+post_save.connect(official_saved, sender=Official,
+    dispatch_uid='meetings_official_saved')
+
+post_save.connect(official_created, sender=Official,
+    dispatch_uid='meetings_official_created')
+
+for model in SUMMARIZED_MODELS:
+    post_save.connect(summary_changed, sender=model,
+        dispatch_uid='meetings_summary_changed_save_{}'.format(model.__name__))
+    post_delete.connect(summary_changed, sender=model,
+        dispatch_uid='meetings_summary_changed_delete_{}'.format(
+            model.__name__))
+
+for model in OFFICIAL_TEXT_MODELS:
+    post_save.connect(official_text_changed, sender=model,
+        dispatch_uid='meetings_official_text_changed_{}'.format(
+            model.__name__))
+
+post_save.connect(meeting_text_changed, sender=Meeting,
+    dispatch_uid='meetings_meeting_text_changed')
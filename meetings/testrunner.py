@@ -0,0 +1,30 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class BudgetEnforcingTestRunner(DiscoverRunner):
+    """
+    Runs tests with query budgets enforced
+
+    Requests that go over their budget in ``QUERY_BUDGETS`` raise an
+    exception, which fails the test that made the request.
+
+    """
+    def setup_test_environment(self, **kwargs):
+        super(BudgetEnforcingTestRunner, self).setup_test_environment(
+            **kwargs)
+        self._enforce_budgets = override_settings(QUERY_BUDGETS_ENFORCED=True)
+        self._enforce_budgets.enable()
+
+        # Keep the metrics of every request out of the test output
+        self._metrics_logger = logging.getLogger('meetings.middleware')
+        self._metrics_log_level = self._metrics_logger.level
+        self._metrics_logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        self._metrics_logger.setLevel(self._metrics_log_level)
+        self._enforce_budgets.disable()
+        super(BudgetEnforcingTestRunner, self).teardown_test_environment(
+            **kwargs)
@@ -1,6 +1,73 @@
-from django.test import TestCase
+from datetime import date, time as datetime_time, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from meetings.api import OfficialResource
+from meetings.benchmarks.utils import compare, percentile
+from meetings.civicinfo import CivicInfoClient
+from meetings.forms import SourceFormSet
+from meetings.ical import fold, read_events, unfold
+from meetings.management.commands.createusreps import Command as CreateUSRepsCommand
+from meetings.management.commands.importmeetings import Command as ImportMeetingsCommand
+from meetings.management.commands.parsemeetingnotes import Command as ParseMeetingNotesCommand
+from meetings.middleware import QueryBudgetExceeded, fingerprint
+from meetings.query import RepresentativeClaimQuerySet
+from meetings.search import search
+from meetings.versions import get_official_versions
+from meetings.models import (Division, Office, Official, OfficialSummary,
+    Email, Phone, SocialMediaChannel, Meeting, ContactAttempt, Source,
+    SourceURL, SearchEntry, RepresentativeClaim, ImportCheckpoint,
+    NOTES_SCHEMA_VERSION)
+
+STATE_NAMES = {
+    'ky': "Kentucky",
+    'tn': "Tennessee",
+}
+
+
+def create_us_rep(name, district, state='ky'):
+    """Create a U.S. Representative along with their division and office"""
+    division = Division.objects.create(
+        ocd_id="ocd-division/country:us/state:{}/cd:{}".format(state,
+            district),
+        name="{}'s congressional district {}".format(STATE_NAMES[state],
+            district),
+    )
+    office = Office.objects.create(
+        name="United States House of Representatives {}-{:02d}".format(
+            state.upper(), district),
+        division=division,
+    )
+    return Official.objects.create(name=name, office=office)
+
+
+def create_us_reps(count):
+    """
+    Create representatives for the first ``count`` districts of Kentucky
+
+    They're named "Representative 1", "Representative 2" and so on.
+
+    """
+    return [create_us_rep("Representative {}".format(i), i)
+            for i in range(1, count + 1)]
 
-from meetings.models import Division, Office, Official, SocialMediaChannel
 
 class SocialMediaChannelTestCase(TestCase):
     def setUp(self):
@@ -88,3 +155,1591 @@ class SocialMediaChannelTestCase(TestCase):
         )
         self.assertEqual(channel.get_service_name(),
             "Google+")
+
+
+class OfficialResourceTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, official in enumerate(create_us_reps(5), 1):
+            self.add_related(official, i)
+
+    def add_related(self, official, i):
+        meeting_content_type = ContentType.objects.get_for_model(Meeting)
+        SocialMediaChannel.objects.create(
+            official=official,
+            channel_type="Twitter",
+            channel_id="Rep{}".format(i),
+        )
+        Phone.objects.create(official=official, phone="202-555-010{}".format(i))
+        Email.objects.create(official=official,
+            address="rep{}@example.com".format(i))
+
+        for day in (20, 10):
+            meeting = Meeting.objects.create(
+                official=official,
+                date=date(2017, 6, day),
+            )
+            Source.objects.create(
+                source_url=SourceURL.objects.create(
+                    url="http://example.com/{}/{}".format(i, day)),
+                content_type=meeting_content_type,
+                object_id=meeting.pk,
+            )
+
+    def test_list(self):
+        response = self.client.get('/api/v1/officials/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+        officials = json.loads(response.content.decode('utf-8'))['objects']
+        self.assertEqual(len(officials), 5)
+        official = officials[0]
+        self.assertEqual([m['date'] for m in official['meetings']],
+            ['2017-06-10', '2017-06-20'])
+        self.assertEqual(official['meetings'][0]['sources'],
+            ['http://example.com/1/10'])
+        self.assertEqual(official['meetings'][0]['notes_fields'], {})
+        self.assertEqual(official['social_media'], [{
+            'channel_id': 'Rep1',
+            'channel_type': 'Twitter',
+        }])
+        self.assertEqual(official['office']['division']['ocd_id'],
+            "ocd-division/country:us/state:ky/cd:1")
+        self.assertNotIn('phones', official)
+
+    def test_list_num_queries(self):
+        # One query each for the data version, officials (joined with their
+        # offices and divisions), meetings, sources, social media channels,
+        # phones and emails, however many officials there are
+        user = get_user_model().objects.create_user('x@example.com')
+        for num_officials in (5, 15):
+            for i in range(Official.objects.count() + 1, num_officials + 1):
+                official = create_us_rep("Representative {}".format(i), i)
+                self.add_related(official, i)
+                ContactAttempt.objects.create(official=official, user=user,
+                    method='phone')
+
+            cache.clear()
+            with self.assertNumQueries(7):
+                response = self.client.get('/api/v1/officials/',
+                    {'include_field': ['phones', 'emails']})
+
+            officials = json.loads(response.content.decode('utf-8'))['objects']
+            self.assertEqual(len(officials), num_officials)
+
+    def _get_list(self, **params):
+        response = self.client.get('/api/v1/officials/', params)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_list_paginate(self):
+        page = self._get_list(limit=2)
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 1", "Representative 2"])
+        self.assertIsNone(page['meta']['prev'])
+
+        page = self._get_list(limit=2, cursor=page['meta']['next'])
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 3", "Representative 4"])
+
+        page = self._get_list(limit=2, cursor=page['meta']['next'])
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 5"])
+        self.assertIsNone(page['meta']['next'])
+
+        page = self._get_list(limit=2, cursor=page['meta']['prev'])
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 3", "Representative 4"])
+
+        page = self._get_list(limit=2, cursor=page['meta']['prev'])
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 1", "Representative 2"])
+        self.assertIsNone(page['meta']['prev'])
+
+    def test_list_paginate_filtered(self):
+        Meeting.objects.create(
+            official=Official.objects.get(name="Representative 2"),
+            date=date(2017, 7, 4),
+        )
+        page = self._get_list(limit=2, without_meeting_since='2017-07-01')
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 1", "Representative 3"])
+
+        page = self._get_list(limit=2, without_meeting_since='2017-07-01',
+            cursor=page['meta']['next'])
+        self.assertEqual([o['name'] for o in page['objects']],
+            ["Representative 4", "Representative 5"])
+        self.assertIsNone(page['meta']['next'])
+
+    def test_list_max_limit(self):
+        page = self._get_list(limit=100000)
+        self.assertEqual(page['meta']['limit'], OfficialResource.max_limit)
+
+    def test_list_invalid_cursor(self):
+        response = self.client.get('/api/v1/officials/', {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_fields(self):
+        with self.assertNumQueries(2):
+            page = self._get_list(fields='id,name,office')
+
+        official = page['objects'][0]
+        self.assertEqual(set(official.keys()), set(['id', 'name', 'office']))
+        self.assertEqual(official['office']['division']['ocd_id'],
+            "ocd-division/country:us/state:ky/cd:1")
+
+    def test_list_fields_include_field(self):
+        with self.assertNumQueries(3):
+            page = self._get_list(fields='name', include_field='phones')
+
+        self.assertEqual(page['objects'][0], {
+            'name': "Representative 1",
+            'phones': ['202-555-0101'],
+        })
+
+    def test_list_fields_nested_only(self):
+        page = self._get_list(fields='office')
+        official = page['objects'][0]
+        self.assertEqual(set(official.keys()), set(['office']))
+        self.assertEqual(official['office']['name'],
+            "United States House of Representatives KY-01")
+
+        page = self._get_list(fields='meetings')
+        official = page['objects'][0]
+        self.assertEqual(set(official.keys()), set(['meetings']))
+        self.assertEqual(len(official['meetings']), 2)
+
+    def test_list_invalid_fields(self):
+        response = self.client.get('/api/v1/officials/', {'fields': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export(self):
+        response = self.client.get('/api/v1/officials/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+        lines = b''.join(response.streaming_content).decode('utf-8')\
+            .splitlines()
+        officials = [json.loads(line) for line in lines]
+        self.assertEqual([o['name'] for o in officials],
+            ["Representative {}".format(i) for i in range(1, 6)])
+        self.assertEqual(len(officials[0]['meetings']), 2)
+
+    def test_export_chunked(self):
+        OfficialResource.export_chunk_size = 2
+        try:
+            response = self.client.get('/api/v1/officials/export/')
+            # Four queries for each of the three chunks
+            with self.assertNumQueries(12):
+                content = b''.join(response.streaming_content)
+        finally:
+            OfficialResource.export_chunk_size = 100
+
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_list_conditional_get(self):
+        response = self.client.get('/api/v1/officials/')
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/officials/',
+                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/officials/',
+                HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        # A different query gets a different entity tag
+        response = self.client.get('/api/v1/officials/', {'limit': 1},
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_conditional_get_cache_cleared(self):
+        etag = self.client.get('/api/v1/officials/')['ETag']
+
+        # Versions aren't lost with the cache, so the entity tag still matches
+        cache.clear()
+        response = self.client.get('/api/v1/officials/',
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_cached(self):
+        content = self.client.get('/api/v1/officials/').content
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/officials/')
+        self.assertEqual(response.content, content)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+    def test_list_invalidated(self):
+        etag = self.client.get('/api/v1/officials/')['ETag']
+
+        Meeting.objects.create(
+            official=Official.objects.get(name="Representative 1"),
+            date=date(2017, 7, 4),
+        )
+
+        response = self.client.get('/api/v1/officials/',
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        official = json.loads(response.content.decode('utf-8'))['objects'][0]
+        self.assertEqual(len(official['meetings']), 3)
+
+    def test_list_include_fields_num_queries(self):
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/v1/officials/', {
+                'include_field': ['phones', 'emails'],
+            })
+
+        official = json.loads(response.content.decode('utf-8'))['objects'][0]
+        self.assertEqual(official['phones'], ['202-555-0101'])
+        self.assertEqual(official['emails'], ['rep1@example.com'])
+
+
+class DivisionTestCase(TestCase):
+    def test_parse_ocd_id(self):
+        division = Division.objects.create(
+            ocd_id="ocd-division/country:us/state:ky/cd:5",
+            name="Kentucky's 5th congressional district",
+        )
+        self.assertEqual(division.country, 'us')
+        self.assertEqual(division.state, 'ky')
+        self.assertEqual(division.district_type, 'cd')
+        self.assertEqual(division.district_number, 5)
+        self.assertEqual(division.parent_ocd_id,
+            "ocd-division/country:us/state:ky")
+
+    def test_parse_ocd_id_no_district(self):
+        division = Division.objects.create(
+            ocd_id="ocd-division/country:us/district:dc",
+            name="District of Columbia",
+        )
+        self.assertEqual(division.country, 'us')
+        self.assertEqual(division.state, '')
+        self.assertEqual(division.district_type, 'district')
+        self.assertIsNone(division.district_number)
+        self.assertEqual(division.parent_ocd_id, "ocd-division/country:us")
+
+
+class MeetingNotesTestCase(TestCase):
+    notes = "Source: https://example.com/town-hall\nRSVP-Required: yes\n"
+
+    def setUp(self):
+        self.official = create_us_rep("Harold Rogers", 5)
+
+    def test_parsed_on_save(self):
+        meeting = Meeting.objects.create(official=self.official,
+            date=date(2017, 4, 1), notes=self.notes)
+        meeting = Meeting.objects.get(pk=meeting.pk)
+
+        self.assertEqual(meeting.notes_fields, {
+            'source': "https://example.com/town-hall",
+            'rsvp_required': "yes",
+        })
+        self.assertEqual(meeting.notes_version, NOTES_SCHEMA_VERSION)
+        self.assertEqual(meeting.fields_from_notes(), meeting.notes_fields)
+
+    def test_parse_command(self):
+        meetings = [
+            Meeting.objects.create(official=self.official,
+                date=date(2017, 4, i), notes=self.notes if i % 2 else '')
+            for i in range(1, 6)
+        ]
+        Meeting.objects.update(notes_fields={}, notes_version=0)
+        # Outdated fields are parsed again when they're needed
+        self.assertEqual(
+            Meeting.objects.get(pk=meetings[0].pk).fields_from_notes(),
+            {
+                'source': "https://example.com/town-hall",
+                'rsvp_required': "yes",
+            })
+
+        stdout = StringIO()
+        call_command('parsemeetingnotes', chunk_size=2, workers=1,
+            stdout=stdout)
+
+        self.assertIn("Parsed the notes of 5 meetings", stdout.getvalue())
+        self.assertFalse(Meeting.objects.exclude(
+            notes_version=NOTES_SCHEMA_VERSION).exists())
+        self.assertEqual(
+            Meeting.objects.get(pk=meetings[0].pk).notes_fields['source'],
+            "https://example.com/town-hall")
+        self.assertEqual(Meeting.objects.get(pk=meetings[1].pk).notes_fields,
+            {})
+
+
+    def test_parse_command_chunks_in_flight(self):
+        for i in range(1, 7):
+            Meeting.objects.create(official=self.official,
+                date=date(2017, 4, i), notes=self.notes)
+        Meeting.objects.update(notes_version=0)
+
+        get_chunks = ParseMeetingNotesCommand.get_chunks
+        save_chunk = ParseMeetingNotesCommand.save_chunk
+        read = []
+        read_when_saved = []
+
+        def read_chunks(command, *args):
+            for chunk in get_chunks(command, *args):
+                read.append(chunk)
+                yield chunk
+
+        def save_parsed(command, parsed):
+            read_when_saved.append(len(read))
+            return save_chunk(command, parsed)
+
+        with mock.patch.object(ParseMeetingNotesCommand, 'get_chunks',
+                    autospec=True, side_effect=read_chunks), \
+                mock.patch.object(ParseMeetingNotesCommand, 'save_chunk',
+                    autospec=True, side_effect=save_parsed):
+            call_command('parsemeetingnotes', chunk_size=1, workers=1,
+                stdout=StringIO())
+
+        # Two chunks are waiting to be parsed when the next one is read
+        self.assertEqual(read_when_saved[0], 3)
+        self.assertEqual(len(read), 6)
+        self.assertFalse(Meeting.objects.exclude(
+            notes_version=NOTES_SCHEMA_VERSION).exists())
+
+class OfficialSummaryTestCase(TestCase):
+    def setUp(self):
+        self.official = create_us_rep("Harold Rogers", 5)
+
+    def test_created(self):
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertIsNone(summary.last_meeting_date)
+        self.assertIsNone(summary.next_meeting_date)
+
+    def test_meeting_saved(self):
+        Meeting.objects.create(official=self.official, date=date(2017, 6, 10))
+        meeting = Meeting.objects.create(official=self.official,
+            date=date(2099, 6, 10))
+
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertEqual(summary.last_meeting_date, date(2017, 6, 10))
+        self.assertEqual(summary.next_meeting_date, date(2099, 6, 10))
+
+        meeting.delete()
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertIsNone(summary.next_meeting_date)
+
+    def test_refresh_stale(self):
+        Meeting.objects.create(official=self.official, date=date(2017, 6, 10))
+        Meeting.objects.create(official=self.official, date=date(2017, 6, 20))
+        OfficialSummary.objects.refresh(today=date(2017, 6, 15))
+
+        self.assertEqual(OfficialSummary.objects.stale().count(), 1)
+        call_command('updateofficialsummaries', stdout=StringIO())
+
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertEqual(summary.last_meeting_date, date(2017, 6, 20))
+        self.assertIsNone(summary.next_meeting_date)
+
+    def test_counts(self):
+        user = get_user_model().objects.create_user('caller@example.com')
+        Meeting.objects.create(official=self.official, date=date(2017, 6, 10))
+        Meeting.objects.create(official=self.official, date=date(2099, 6, 10))
+        attempt = ContactAttempt.objects.create(official=self.official,
+            user=user, method='phone')
+
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertEqual(summary.state, 'ky')
+        self.assertEqual(summary.latest_meeting_date, date(2099, 6, 10))
+        self.assertEqual(summary.meeting_count, 2)
+        self.assertEqual(summary.contact_attempt_count, 1)
+        self.assertEqual(summary.last_contact_datetime, attempt.datetime)
+        # Refreshing an up to date summary doesn't change it
+        self.assertEqual(OfficialSummary.objects.refresh(), [])
+
+        attempt.delete()
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertEqual(summary.contact_attempt_count, 0)
+        self.assertIsNone(summary.last_contact_datetime)
+
+    def test_filters(self):
+        Meeting.objects.create(official=self.official, date=date(2017, 6, 10))
+        other = Official.objects.create(name="Other", office=self.official.office)
+
+        self.assertEqual(list(Official.objects.without_meetings()), [other])
+        self.assertEqual(
+            list(Official.objects.without_meetings_since(date(2017, 6, 1))),
+            [other])
+        self.assertEqual(
+            set(Official.objects.without_meetings_since(date(2017, 7, 1))),
+            set([self.official, other]))
+        self.assertEqual(Official.objects.in_state('KY').count(), 2)
+
+    def test_rebuild(self):
+        Meeting.objects.create(official=self.official, date=date(2017, 6, 10))
+        OfficialSummary.objects.update(meeting_count=0,
+            latest_meeting_date=None)
+
+        stdout = StringIO()
+        call_command('updateofficialsummaries', rebuild=True, stdout=stdout)
+
+        self.assertIn("Rebuilt 1 summaries", stdout.getvalue())
+        summary = OfficialSummary.objects.get(official=self.official)
+        self.assertEqual(summary.meeting_count, 1)
+        self.assertEqual(summary.latest_meeting_date, date(2017, 6, 10))
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class OfficialListViewTestCase(TestCase):
+    def setUp(self):
+        for i, official in enumerate(create_us_reps(5), 1):
+            Meeting.objects.create(official=official, date=date(2017, 6, i))
+
+    def test_num_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/meetings/')
+
+        self.assertContains(response, "Kentucky&#39;s congressional district 3")
+        self.assertContains(response, "June 3, 2017")
+
+    def assert_rows_cached(self):
+        cache.clear()
+        official = Official.objects.get(name="Representative 3")
+        self.client.get('/meetings/')
+
+        # Changes that don't send signals aren't shown until the official's
+        # data version changes
+        Official.objects.filter(pk=official.pk).update(name="Harold Rogers")
+        response = self.client.get('/meetings/')
+        self.assertContains(response, "Representative 3")
+
+        Meeting.objects.create(official=official, date=date(2017, 6, 30))
+        response = self.client.get('/meetings/')
+        self.assertContains(response, "Harold Rogers")
+        self.assertContains(response, "June 30, 2017")
+
+    def test_rows_cached_locmem(self):
+        with self.settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assert_rows_cached()
+
+    def test_rows_cached_file(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with self.settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location}}):
+            self.assert_rows_cached()
+
+    def test_rows_cached_every_rep(self):
+        # Enough officials to fill a cache with the default size limit
+        for i in range(6, 436):
+            create_us_rep("Representative {}".format(i), i)
+
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with self.settings(CACHES={'default': dict(settings.CACHES['default'],
+                BACKEND='django.core.cache.backends.filebased.FileBasedCache',
+                LOCATION=location)}):
+            self.client.get('/meetings/')
+
+            with mock.patch.object(FileBasedCache, 'set', autospec=True,
+                    side_effect=FileBasedCache.set) as cache_set:
+                response = self.client.get('/meetings/')
+
+        self.assertContains(response, "Representative 435")
+        self.assertEqual(cache_set.call_count, 0)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class OfficialDetailViewTestCase(TestCase):
+    def setUp(self):
+        self.official = create_us_rep("Harold Rogers", 5)
+        self.user = get_user_model().objects.create_user('caller@example.com')
+        self.client.force_login(self.user)
+
+    def add_related(self, i):
+        Phone.objects.create(official=self.official,
+            phone="(202) 225-460{}".format(i))
+        Email.objects.create(official=self.official,
+            address="rep{}@example.com".format(i))
+        SocialMediaChannel.objects.create(official=self.official,
+            channel_type='Twitter', channel_id="Rep{}".format(i))
+        Meeting.objects.create(official=self.official, date=date(2017, 6, i),
+            location="Library {}".format(i))
+        ContactAttempt.objects.create(official=self.official, user=self.user,
+            method='phone', notes="Attempt {}".format(i))
+
+    def test_num_queries(self):
+        url = '/meetings/officials/{}-harold-rogers/'.format(self.official.pk)
+        self.add_related(1)
+
+        # Two queries for the session and user, one for the official, one
+        # for its version and one for each prefetched relation
+        with self.assertNumQueries(10):
+            response = self.client.get(url)
+
+        self.assertContains(response, "United States House of Representatives KY-05")
+        self.assertContains(response, "Library 1")
+        self.assertContains(response, "Attempt 1")
+        self.assertContains(response, "rep1@example.com")
+
+        for i in range(2, 6):
+            self.add_related(i)
+
+        with self.assertNumQueries(10):
+            response = self.client.get(url)
+
+        self.assertContains(response, "Library 5")
+        self.assertContains(response, "Attempt 5")
+
+        # Nothing is loaded for the fragments that are cached
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        self.assertContains(response, "Library 5")
+        self.assertContains(response, "rep5@example.com")
+
+    def test_fragments_invalidated(self):
+        url = '/meetings/officials/{}-harold-rogers/'.format(self.official.pk)
+        self.add_related(1)
+        self.client.get(url)
+
+        Meeting.objects.filter(official=self.official)\
+            .update(location="Somerset")
+        response = self.client.get(url)
+        self.assertContains(response, "Library 1")
+
+        phone = self.official.phones.get()
+        phone.phone = "(606) 679-8346"
+        phone.save()
+        response = self.client.get(url)
+        self.assertContains(response, "Somerset")
+        self.assertContains(response, "(606) 679-8346")
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SearchTestCase(TestCase):
+    def setUp(self):
+        for i, official in enumerate(create_us_reps(5), 1):
+            Meeting.objects.create(official=official, date=date(2017, 6, i),
+                location="Pulaski County Library",
+                notes="Source: http://example.com/{}".format(i))
+
+        self.official = official
+        self.official.name = "Harold Rogers"
+        self.official.save()
+
+    def test_search(self):
+        results = search("rogers")
+        self.assertEqual(results.count(), 1)
+        self.assertEqual(results[0:10][0].official, self.official)
+        self.assertIsNone(results[0:10][0].meeting)
+
+        # Every term has to match
+        self.assertEqual(search("libraries pulaski").count(), 5)
+        self.assertEqual(search("library rogers").count(), 0)
+        self.assertEqual(search("").count(), 0)
+        self.assertEqual(search('"district" OR').count(), 0)
+
+    def test_search_updated(self):
+        meeting = self.official.meetings.get()
+        meeting.location = "Somerset Community Center"
+        meeting.save()
+        self.assertEqual(search("somerset")[0:1][0].meeting, meeting)
+
+        self.official.office.division.name = "Fifth district"
+        self.official.office.division.save()
+        self.assertEqual(search("fifth")[0:1][0].official, self.official)
+
+        self.official.delete()
+        self.assertEqual(search("somerset").count(), 0)
+        self.assertEqual(search("rogers").count(), 0)
+
+    def test_rebuild(self):
+        SearchEntry.objects.all().delete()
+        self.assertEqual(search("rogers").count(), 0)
+
+        stdout = StringIO()
+        call_command('rebuildsearchindex', chunk_size=2, stdout=stdout)
+
+        self.assertIn("Created 10 search entries", stdout.getvalue())
+        self.assertEqual(search("rogers").count(), 1)
+
+    def test_api(self):
+        response = self.client.get('/api/v1/search',
+            {'q': "library", 'limit': 2, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(len(data['objects']), 2)
+        self.assertEqual(data['meta'], {
+            'limit': 2,
+            'page': 2,
+            'next': 3,
+            'prev': 1,
+        })
+        result = data['objects'][0]
+        self.assertEqual(result['type'], 'meeting')
+        self.assertEqual(result['meeting']['location'],
+            "Pulaski County Library")
+
+        response = self.client.get('/api/v1/search', {'q': "x", 'page': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_view(self):
+        response = self.client.get('/meetings/search/', {'q': "rogers"})
+        self.assertContains(response, "Harold Rogers")
+        self.assertNotContains(response, "Representative 1")
+
+
+class OfficialQuerySetTestCase(TestCase):
+    def setUp(self):
+        create_us_reps(3)
+
+    def test_us_reps(self):
+        division = Division.objects.create(
+            ocd_id="ocd-division/country:us/state:ky",
+            name="Kentucky",
+        )
+        office = Office.objects.create(name="Governor", division=division)
+        Official.objects.create(name="Governor", office=office)
+
+        self.assertEqual(Official.objects.us_reps().count(), 3)
+        self.assertEqual(Official.objects.in_state('KY').count(), 4)
+
+        # The state comes from the division, not from the summaries, which
+        # aren't created for officials that are bulk inserted
+        OfficialSummary.objects.all().delete()
+        self.assertEqual(Official.objects.in_state('KY').count(), 4)
+        children = Official.objects.children_of(
+            "ocd-division/country:us/state:ky")
+        self.assertEqual(children.count(), 3)
+
+    def test_without_summary(self):
+        officials = list(Official.objects.order_by('pk'))
+        user = get_user_model().objects.create_user('x@example.com')
+        Meeting.objects.create(official=officials[0], date=date(2017, 6, 1))
+        ContactAttempt.objects.create(official=officials[0], user=user,
+            method='phone')
+        OfficialSummary.objects.filter(official=officials[1]).delete()
+
+        # Officials without summaries count as having no meetings or contact
+        # attempts
+        expected = set(officials[1:])
+        self.assertEqual(set(Official.objects.without_meetings()), expected)
+        self.assertEqual(set(Official.objects.without_meetings_since(
+            date(2017, 7, 1))), set(officials))
+        self.assertEqual(set(Official.objects.without_contact_attempts()),
+            expected)
+        self.assertEqual(
+            list(Official.objects.order_by_contact_attempts(desc=True)
+                .values_list('num_contact_attempts', flat=True)),
+            [1, 0, 0])
+
+
+def fake_representative_info(ocd_id, name):
+    return {
+        'divisions': {
+            ocd_id: {
+                'name': "District for {}".format(name),
+                'officeIndices': [0],
+            },
+        },
+        'offices': [
+            {
+                'name': "United States House of Representatives",
+                'divisionId': ocd_id,
+                'officialIndices': [0],
+            },
+        ],
+        'officials': [
+            {
+                'name': name,
+                'party': "Republican",
+                'address': [
+                    {
+                        'line1': "2406 Rayburn House Office Building",
+                        'city': "Washington",
+                        'state': "DC",
+                        'zip': "20515",
+                    },
+                ],
+                'phones': ["(202) 225-4601"],
+                'urls': ["https://example.com/{}".format(name)],
+                'channels': [
+                    {'type': "Twitter", 'id': name.replace(' ', '')},
+                ],
+            },
+        ],
+    }
+
+
+class FakeCivicInfoHandler(BaseHTTPRequestHandler):
+    """Handles requests to a fake Civic Information API"""
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        ocd_id = unquote(path[len('/representatives/'):])
+        server = self.server
+
+        with server.lock:
+            server.requests.append(ocd_id)
+            fail = server.failures.get(ocd_id, 0)
+            if fail:
+                server.failures[ocd_id] = fail - 1
+
+        if fail or ocd_id not in server.representatives:
+            self.send_response(503 if fail else 404)
+            self.end_headers()
+            return
+
+        body = json.dumps(fake_representative_info(ocd_id,
+            server.representatives[ocd_id])).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RepresentativeClaimTestCase(TestCase):
+    def setUp(self):
+        create_us_reps(3)
+
+        User = get_user_model()
+        self.users = [User.objects.create_user('{}@example.com'.format(i))
+                      for i in range(4)]
+        self.officials = Official.objects.us_reps()
+
+    def test_claim(self):
+        claims = [RepresentativeClaim.objects.claim(self.officials, user)
+                  for user in self.users]
+
+        self.assertEqual(len(set(c.official.pk for c in claims[:3])), 3)
+        self.assertEqual(claims[0].user, self.users[0])
+        self.assertIsNone(claims[3])
+
+        # Users keep the official they already claimed
+        claim = RepresentativeClaim.objects.claim(self.officials,
+            self.users[0])
+        self.assertEqual(claim.official, claims[0].official)
+
+    def test_claim_expired(self):
+        now = timezone.now()
+        for user in self.users[:3]:
+            RepresentativeClaim.objects.claim(self.officials, user, now=now)
+
+        # Once the leases expire, every official can be claimed again
+        later = now + timedelta(minutes=11)
+        claims = [RepresentativeClaim.objects.claim(self.officials, user,
+                      now=later)
+                  for user in self.users[1:]]
+        self.assertEqual(set(c.official for c in claims), set(self.officials))
+        self.assertEqual([c.user for c in claims], self.users[1:])
+
+    def test_claim_candidates(self):
+        claim = RepresentativeClaim.objects.claim(
+            self.officials.filter(name="Representative 2"), self.users[0])
+        self.assertEqual(claim.official.name, "Representative 2")
+
+        # A claim on an official that's no longer a candidate isn't kept
+        claim = RepresentativeClaim.objects.claim(
+            self.officials.exclude(name="Representative 2"), self.users[0])
+        self.assertNotEqual(claim.official.name, "Representative 2")
+
+    def test_claim_random(self):
+        now = timezone.now()
+        picked = set()
+        for i in range(100):
+            RepresentativeClaim.objects.update(user=None, expires_at=now)
+            picked.add(RepresentativeClaim.objects.claim(self.officials,
+                self.users[0], now=now).official.name)
+
+        self.assertEqual(picked, set(["Representative 1",
+            "Representative 2", "Representative 3"]))
+
+    def test_add(self):
+        # Claims are created along with officials, so claiming doesn't have
+        # to look for officials without one
+        self.assertEqual(RepresentativeClaim.objects.filter(
+            official__in=self.officials).count(), 3)
+
+        official = self.officials[0]
+        RepresentativeClaim.objects.add([official.pk])
+        self.assertEqual(RepresentativeClaim.objects.filter(
+            official=official).count(), 1)
+
+    def test_release(self):
+        claims = [RepresentativeClaim.objects.claim(self.officials, user)
+                  for user in self.users[:3]]
+        RepresentativeClaim.objects.release(claims[1].official,
+            self.users[1])
+
+        claim = RepresentativeClaim.objects.claim(self.officials,
+            self.users[3])
+        self.assertEqual(claim.official, claims[1].official)
+
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CallUsRepViewTestCase(TestCase):
+    def setUp(self):
+        create_us_reps(3)
+
+        User = get_user_model()
+        self.users = [User.objects.create_user('{}@example.com'.format(i))
+                      for i in range(3)]
+
+    def get_data(self, official, **kwargs):
+        data = {
+            'representative': official.pk,
+            'contact_attempt-method': 'phone',
+            'contact_attempt-contacted': 'on',
+            'contact_attempt-notes': "Left a voicemail",
+            'meeting_info_source-meeting_info_source': "",
+        }
+        data.update(kwargs)
+        return data
+
+    def test_get(self):
+        names = set()
+        for user in self.users:
+            self.client.force_login(user)
+            response = self.client.get('/meetings/call-us-rep/')
+            names.add(response.context['representative'].name)
+
+        self.assertEqual(len(names), 3)
+
+    def test_post(self):
+        self.client.force_login(self.users[0])
+        response = self.client.get('/meetings/call-us-rep/')
+        official = response.context['representative']
+
+        response = self.client.post('/meetings/call-us-rep/',
+            self.get_data(official, **{
+                'next_meeting-date': '2027-08-01',
+                'next_meeting-meeting_type': 'in-person',
+                'last_meeting-date': '2017-08-01',
+                'meeting_info_source-meeting_info_source': "Twitter",
+            }))
+        self.assertEqual(response.status_code, 302)
+
+        contact_attempt = ContactAttempt.objects.get()
+        self.assertEqual(contact_attempt.official, official)
+        self.assertEqual(contact_attempt.user, self.users[0])
+        self.assertEqual(Meeting.objects.filter(official=official).count(), 2)
+        self.assertEqual(Official.objects.get(pk=official.pk)
+            .meeting_info_source, "Twitter")
+        self.assertFalse(RepresentativeClaim.objects.active()
+            .filter(official=official).exists())
+
+        # The summary and search entries are updated once, after the saves
+        summary = OfficialSummary.objects.get(official=official)
+        self.assertEqual(summary.meeting_count, 2)
+        self.assertEqual(summary.contact_attempt_count, 1)
+        self.assertEqual(SearchEntry.objects.filter(official=official,
+            meeting__isnull=False).count(), 2)
+
+    def test_post_without_meetings(self):
+        self.client.force_login(self.users[0])
+        official = Official.objects.first()
+        version = get_official_versions([official.pk])[official.pk]
+
+        response = self.client.post('/meetings/call-us-rep/',
+            self.get_data(official))
+        self.assertEqual(response.status_code, 302)
+
+        summary = OfficialSummary.objects.get(official=official)
+        self.assertEqual(summary.meeting_count, 0)
+        self.assertEqual(summary.contact_attempt_count, 1)
+        self.assertNotEqual(
+            get_official_versions([official.pk])[official.pk], version)
+
+    def test_post_missing_representative(self):
+        self.client.force_login(self.users[0])
+        official = Official.objects.first()
+
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.post('/meetings/call-us-rep/',
+                self.get_data(official, representative=''))
+            self.assertEqual(response.status_code, 404)
+
+            response = self.client.post('/meetings/call-us-rep/',
+                self.get_data(official, representative=official.pk + 100))
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse(ContactAttempt.objects.exists())
+
+    def test_post_atomic(self):
+        self.client.force_login(self.users[0])
+        official = Official.objects.first()
+        data = self.get_data(official, **{
+            'next_meeting-date': '2017-08-01',
+            'next_meeting-meeting_type': 'in-person',
+        })
+
+        with mock.patch.object(RepresentativeClaimQuerySet, 'release',
+                side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError), \
+                    self.assertLogs('django.request', 'ERROR'):
+                self.client.post('/meetings/call-us-rep/', data)
+
+        self.assertFalse(ContactAttempt.objects.exists())
+        self.assertFalse(Meeting.objects.exists())
+
+
+class MeetingBatchResourceTestCase(TestCase):
+    def setUp(self):
+        self.official = create_us_rep("James Comer", 1)
+        self.user = get_user_model().objects.create_user('x@example.com')
+
+    def post(self, data):
+        return self.client.post('/api/v1/meetings/batch', json.dumps(data),
+            content_type='application/json')
+
+    def test_unauthenticated(self):
+        response = self.post([])
+        self.assertEqual(response.status_code, 401)
+
+    def test_csrf(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.user)
+        data = [{'official': self.official.pk, 'date': '2017-08-01'}]
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.post(data)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Meeting.objects.count(), 0)
+
+        token = 'a' * 64
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = token
+        response = self.client.post('/api/v1/meetings/batch',
+            json.dumps(data), content_type='application/json',
+            HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 201)
+
+    def test_create(self):
+        self.client.force_login(self.user)
+        response = self.post([
+            {
+                'official': self.official.pk,
+                'date': '2017-08-01',
+                'time': '18:30',
+                'meeting_type': 'in-person',
+                'location': "Paducah Public Library",
+                'notes': "RSVP-Required: yes",
+                'sources': [
+                    "https://example.com/town-hall",
+                    "https://example.com/town-hall-2",
+                ],
+            },
+            {
+                'official': self.official.pk,
+                'date': '2017-09-01',
+            },
+        ])
+        self.assertEqual(response.status_code, 201)
+
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['count'], 2)
+        meetings = Meeting.objects.order_by('date')
+        self.assertEqual([m.pk for m in meetings], data['ids'])
+        self.assertEqual(meetings[0].notes_fields, {'rsvp_required': 'yes'})
+        self.assertEqual(
+            sorted(s.url for s in meetings[0].sources.all()),
+            ["https://example.com/town-hall",
+             "https://example.com/town-hall-2"])
+        self.assertEqual(meetings[1].sources.count(), 0)
+
+        self.assertEqual(OfficialSummary.objects.get(
+            official=self.official).meeting_count, 2)
+        self.assertEqual(search("Paducah").count(), 1)
+
+    def test_invalid(self):
+        self.client.force_login(self.user)
+        response = self.post([
+            {
+                'official': self.official.pk,
+                'date': '2017-08-01',
+            },
+            {
+                'official': self.official.pk + 1,
+                'date': 'August 1',
+                'sources': ["not a url"],
+            },
+            {
+                'official': self.official.pk,
+            },
+            "meeting",
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Meeting.objects.exists())
+
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['error'], "3 of 4 meetings are invalid")
+        self.assertEqual([item['index'] for item in data['items']],
+            [1, 2, 3])
+        self.assertEqual(sorted(data['items'][0]['errors']),
+            ['date', 'official', 'sources'])
+        self.assertEqual(list(data['items'][1]['errors']), ['date'])
+
+    def test_invalid_body(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/api/v1/meetings/batch', "[{",
+            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post({'official': self.official.pk})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportMeetingsTestCase(TestCase):
+    csv_content = (
+        "official,date,time,meeting_type,location,notes,sources\n"
+        "James Comer,2017-08-01,18:30,in-person,Paducah Public Library,,"
+        "https://example.com/1 https://example.com/2\n"
+        "ocd-division/country:us/state:ky/cd:1,2017-09-01,,,Murray,,\n"
+        "Nobody,2017-10-01,,,,,\n"
+        "{pk},not a date,,,,,\n"
+        "{pk},2017-11-01,,telephone,,,\n"
+    )
+
+    ics_content = (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART:20170801T183000\r\n"
+        "LOCATION:Paducah Public Library\\, Room 1\r\n"
+        "DESCRIPTION:Town hall\\nRSVP-Required: y\r\n"
+        " es\r\n"
+        "URL:https://example.com/town-hall\r\n"
+        "BEGIN:VALARM\r\n"
+        "DESCRIPTION:Reminder\r\n"
+        "END:VALARM\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART;VALUE=DATE:20170901\r\n"
+        "X-OFFICIAL:Nobody\r\n"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+
+    def setUp(self):
+        self.official = create_us_rep("James Comer", 1)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write_file(self, filename, content):
+        path = os.path.join(self.tmp_dir, filename)
+        with open(path, 'w', newline='') as f:
+            f.write(content)
+
+        return path
+
+    def call_command(self, *args, **kwargs):
+        out = StringIO()
+        err = StringIO()
+        call_command('importmeetings', *args, stdout=out, stderr=err,
+            **kwargs)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv(self):
+        path = self.write_file('meetings.csv',
+            self.csv_content.format(pk=self.official.pk))
+        out, err = self.call_command(path, batch_size=2)
+
+        self.assertIn("Imported 3 meetings from 5 rows, skipping 2 invalid "
+            "rows", out)
+        self.assertIn("Row 3: official: No official matches 'Nobody'", err)
+        self.assertIn("Row 4: date:", err)
+
+        meetings = self.official.meetings.order_by('date')
+        self.assertEqual([str(m.date) for m in meetings],
+            ['2017-08-01', '2017-09-01', '2017-11-01'])
+        self.assertEqual(sorted(s.url for s in meetings[0].sources.all()),
+            ["https://example.com/1", "https://example.com/2"])
+        self.assertEqual(OfficialSummary.objects.get(
+            official=self.official).meeting_count, 3)
+        self.assertEqual(search("Paducah").count(), 1)
+
+    def test_ics(self):
+        path = self.write_file('calendar.ics', self.ics_content)
+        out, err = self.call_command(path, official=str(self.official.pk),
+            source=["https://example.com/calendar.ics"])
+
+        self.assertIn("Imported 1 meetings from 2 rows", out)
+        meeting = self.official.meetings.get()
+        self.assertEqual(str(meeting.date), '2017-08-01')
+        self.assertEqual(str(meeting.time), '18:30:00')
+        self.assertEqual(meeting.location, "Paducah Public Library, Room 1")
+        self.assertEqual(meeting.notes, "Town hall\nRSVP-Required: yes")
+        self.assertEqual(meeting.event_website,
+            "https://example.com/town-hall")
+        self.assertEqual([s.url for s in meeting.sources.all()],
+            ["https://example.com/calendar.ics"])
+
+    def test_ics_invalid_line(self):
+        content = self.ics_content.replace("LOCATION:Paducah",
+            "LOCATION Paducah")
+        path = self.write_file('calendar.ics', content)
+        out, err = self.call_command(path, official=str(self.official.pk))
+
+        # The event with the line is skipped and the import goes on
+        self.assertIn("Imported 0 meetings from 2 rows, skipping 2 invalid "
+            "rows", out)
+        self.assertIn("Row 1: event: Invalid content line 'LOCATION Paducah "
+            "Public Library\\, Room 1'", err)
+        self.assertIn("Row 2: official: No official matches 'Nobody'", err)
+        self.assertFalse(Meeting.objects.exists())
+
+    def test_dry_run(self):
+        path = self.write_file('meetings.csv',
+            self.csv_content.format(pk=self.official.pk))
+        out, err = self.call_command(path, dry_run=True)
+
+        self.assertIn("Checked 3 meetings from 5 rows", out)
+        self.assertFalse(Meeting.objects.exists())
+
+    def test_checkpoint(self):
+        path = self.write_file('meetings.csv',
+            self.csv_content.format(pk=self.official.pk))
+        ImportCheckpoint.objects.create(name='town-halls',
+            path=os.path.abspath(path), rows=2)
+
+        out, err = self.call_command(path, checkpoint='town-halls')
+        self.assertIn("Imported 1 meetings from 3 rows", out)
+        self.assertEqual(Meeting.objects.count(), 1)
+        self.assertEqual(
+            ImportCheckpoint.objects.get(name='town-halls').rows, 5)
+
+        # Everything has been imported
+        out, err = self.call_command(path, checkpoint='town-halls')
+        self.assertIn("Imported 0 meetings from 0 rows", out)
+        self.assertEqual(Meeting.objects.count(), 1)
+
+    def test_checkpoint_atomic(self):
+        path = self.write_file('meetings.csv',
+            self.csv_content.format(pk=self.official.pk))
+
+        # A batch isn't saved without its checkpoint, so resuming doesn't
+        # import it twice
+        with mock.patch.object(ImportMeetingsCommand, 'write_checkpoint',
+                side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            self.call_command(path, checkpoint='town-halls', batch_size=1)
+
+        self.assertEqual(Meeting.objects.count(), 0)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+
+class MeetingFeedViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.officials = [
+            create_us_rep("James Comer", 1),
+            create_us_rep("Phil Roe", 1, state='tn'),
+        ]
+
+        today = date.today()
+        self.meeting = Meeting.objects.create(official=self.officials[0],
+            date=today + timedelta(days=7), time=datetime_time(18, 30),
+            meeting_type='in-person',
+            location="Paducah Public Library, Room 1",
+            event_website="https://example.com/town-hall")
+        Meeting.objects.create(official=self.officials[0],
+            date=today - timedelta(days=365))
+        Meeting.objects.create(official=self.officials[1],
+            date=today + timedelta(days=14))
+
+    def get_url(self, official):
+        return '/meetings/officials/{}-{}/meetings.ics'.format(official.pk,
+            official.slug)
+
+    def test_official_feed(self):
+        response = self.client.get(self.get_url(self.officials[0]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'],
+            'text/calendar; charset=utf-8')
+
+        content = response.content.decode('utf-8')
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('X-WR-CALNAME:Public meetings with James Comer\r\n',
+            content)
+
+        # Meetings from long ago are left out
+        events = list(read_events(content.splitlines()))
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['DTSTART'],
+            self.meeting.date.strftime('%Y%m%d') + 'T183000')
+        self.assertEqual(events[0]['SUMMARY'],
+            "James Comer: In-person")
+        self.assertEqual(events[0]['LOCATION'],
+            "Paducah Public Library, Room 1")
+        self.assertEqual(events[0]['URL'], "https://example.com/town-hall")
+        self.assertEqual(events[0]['X-OFFICIAL'],
+            "ocd-division/country:us/state:ky/cd:1")
+
+    def test_state_feed(self):
+        response = self.client.get('/meetings/states/tn/meetings.ics')
+        events = list(read_events(
+            response.content.decode('utf-8').splitlines()))
+        self.assertEqual([e['SUMMARY'] for e in events],
+            ["Phil Roe: Public meeting"])
+
+        response = self.client.get('/meetings/meetings.ics')
+        events = list(read_events(
+            response.content.decode('utf-8').splitlines()))
+        self.assertEqual(len(events), 2)
+
+    def test_conditional(self):
+        url = self.get_url(self.officials[0])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        # Only the official and the version of its feed are looked up
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # The generated feed is cached
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        # Saving a meeting changes the feed's version
+        self.meeting.location = "Murray"
+        self.meeting.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('LOCATION:Murray', response.content.decode('utf-8'))
+
+    def test_missing_official(self):
+        # Nothing is cached for feeds that don't exist
+        with self.assertLogs('django.request', 'WARNING'), \
+                mock.patch('meetings.views.cache') as views_cache, \
+                mock.patch('meetings.versions.get_versions') as get_versions:
+            response = self.client.get('/meetings/officials/999-nobody/'
+                'meetings.ics')
+            self.assertEqual(response.status_code, 404)
+
+            response = self.client.get('/meetings/states/zz/meetings.ics')
+            self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(views_cache.mock_calls, [])
+        self.assertFalse(get_versions.called)
+
+    def test_fold(self):
+        line = "DESCRIPTION:" + "é" * 100
+        folded = fold(line)
+        lines = folded.split('\r\n')
+        self.assertTrue(all(len(l.encode('utf-8')) <= 75 for l in lines))
+        self.assertEqual(list(unfold(folded.splitlines(True))), [line])
+
+
+class SourceTestCase(TestCase):
+    def setUp(self):
+        official = create_us_rep("James Comer", 1)
+        self.meetings = [
+            Meeting.objects.create(official=official, date=date(2017, 8, day))
+            for day in (1, 2, 3)
+        ]
+
+    def test_normalize(self):
+        self.assertEqual(
+            SourceURL.normalize(" HTTPS://Example.COM/Town-Hall?Q=1 "),
+            "https://example.com/Town-Hall?Q=1")
+
+    def test_ids_for(self):
+        existing = SourceURL.objects.create(url="https://example.com/a")
+        ids = SourceURL.objects.ids_for([
+            "https://Example.com/a",
+            "https://example.com/b",
+            "https://example.com/b ",
+        ])
+        self.assertEqual(ids["https://Example.com/a"], existing.pk)
+        self.assertEqual(ids["https://example.com/b"],
+            ids["https://example.com/b "])
+        self.assertEqual(SourceURL.objects.count(), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(SourceURL.objects.ids_for(
+                ["https://example.com/b"]),
+                {"https://example.com/b": ids["https://example.com/b"]})
+
+    def test_prefetch_urls(self):
+        content_type = ContentType.objects.get_for_model(Meeting)
+        url_ids = SourceURL.objects.ids_for(
+            ["https://example.com/a", "https://example.com/b"])
+        for url in ("https://example.com/b", "https://example.com/a"):
+            Source.objects.create(source_url_id=url_ids[url],
+                content_type=content_type, object_id=self.meetings[0].pk)
+        Source.objects.create(source_url_id=url_ids["https://example.com/a"],
+            content_type=content_type, object_id=self.meetings[1].pk)
+
+        meetings = list(Meeting.objects.order_by('date'))
+        with self.assertNumQueries(1):
+            Source.objects.prefetch_urls(meetings)
+        self.assertEqual([m.source_urls for m in meetings], [
+            ["https://example.com/b", "https://example.com/a"],
+            ["https://example.com/a"],
+            [],
+        ])
+
+    def test_form(self):
+        formset = SourceFormSet({
+            'meetings-source-content_type-object_id-TOTAL_FORMS': '1',
+            'meetings-source-content_type-object_id-INITIAL_FORMS': '0',
+            'meetings-source-content_type-object_id-0-url':
+                "https://Example.com/town-hall",
+        }, instance=self.meetings[0])
+        self.assertTrue(formset.is_valid(), formset.errors)
+        formset.save()
+
+        source = self.meetings[0].sources.get()
+        self.assertEqual(source.url, "https://example.com/town-hall")
+        self.assertEqual(SourceFormSet(instance=self.meetings[0]).forms[0]
+            .initial['url'], "https://example.com/town-hall")
+
+
+class CreateUSRepsTestCase(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), FakeCivicInfoHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.failures = {}
+        self.server.representatives = {
+            "ocd-division/country:us/state:ky/cd:{}".format(i):
+                "Representative {}".format(i)
+            for i in range(1, 7)
+        }
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def call_command(self, *args, **options):
+        command = CreateUSRepsCommand()
+        command.client = CivicInfoClient('key',
+            base_url="http://127.0.0.1:{}/".format(self.server.server_port),
+            retries=1, backoff=0)
+        options.setdefault('cache_dir', self.cache_dir)
+        stdout = StringIO()
+        call_command(command, *args, stdout=stdout, stderr=StringIO(),
+            **options)
+        return stdout.getvalue()
+
+    def test_create(self):
+        ocd_ids = sorted(self.server.representatives)
+        # Fail once, then succeed on retry
+        self.server.failures[ocd_ids[0]] = 1
+
+        with self.assertLogs('meetings.civicinfo', 'WARNING'):
+            output = self.call_command(*ocd_ids, workers=3, batch_size=4)
+
+        self.assertIn("Fetched 6 of 6 divisions and created 6 officials",
+            output)
+        self.assertEqual(len(self.server.requests), 7)
+        official = Official.objects.get(name="Representative 1")
+        self.assertEqual(official.office.division.ocd_id, ocd_ids[0])
+        self.assertEqual(official.office.division.district_number, 1)
+        self.assertEqual(official.phones.get().phone, "(202) 225-4601")
+        self.assertEqual(official.channels.get().channel_id, "Representative1")
+        self.assertEqual(official.addresses.get().postal_code, "20515")
+        self.assertEqual(official.urls.count(), 1)
+        self.assertTrue(
+            OfficialSummary.objects.filter(official=official).exists())
+        self.assertTrue(
+            RepresentativeClaim.objects.filter(official=official).exists())
+        self.assertEqual(Official.objects.us_reps().count(), 6)
+
+        output = self.call_command(*ocd_ids, no_cache=True)
+        self.assertIn("created 0 officials", output)
+        self.assertEqual(Official.objects.count(), 6)
+        self.assertEqual(Phone.objects.count(), 6)
+        self.assertEqual(len(self.server.requests), 13)
+
+    def test_sync(self):
+        ocd_ids = sorted(self.server.representatives)
+        self.call_command(*ocd_ids)
+
+        official = Official.objects.get(name="Representative 1")
+        official.party = "Democratic"
+        official.save()
+        official.addresses.all().delete()
+        Phone.objects.create(official=official, phone="(202) 555-0100")
+        Phone.objects.create(official=official, phone="(202) 225-4601")
+        # A new representative for the second district
+        self.server.representatives[ocd_ids[1]] = "Representative 7"
+
+        output = self.call_command(*ocd_ids, no_cache=True, sync=True)
+
+        self.assertIn("created 1 officials", output)
+        self.assertIn("Official left office: 1", output)
+        self.assertIn("Phone deleted: 2", output)
+        official.refresh_from_db()
+        self.assertEqual(official.party, "Republican")
+        self.assertEqual([p.phone for p in official.phones.all()],
+            ["(202) 225-4601"])
+        self.assertEqual(official.addresses.count(), 1)
+        self.assertFalse(
+            Official.objects.get(name="Representative 2").in_office)
+        self.assertTrue(
+            Official.objects.get(name="Representative 7").in_office)
+        self.assertEqual(Phone.objects.count(), 7)
+
+        # Nothing changes when syncing again
+        output = self.call_command(*ocd_ids, sync=True)
+        self.assertIn("created 0 officials", output)
+        self.assertNotIn("deleted", output)
+        self.assertEqual(Phone.objects.count(), 7)
+
+    def test_cache(self):
+        ocd_ids = sorted(self.server.representatives)
+        self.call_command(*ocd_ids[:3])
+        self.assertEqual(len(self.server.requests), 3)
+
+        # Cached responses are used
+        self.call_command(*ocd_ids)
+        self.assertEqual(len(self.server.requests), 6)
+
+        # Stale responses are fetched again
+        self.call_command(*ocd_ids, refresh_older_than=0)
+        self.assertEqual(len(self.server.requests), 12)
+
+    def test_offline(self):
+        ocd_ids = sorted(self.server.representatives)
+        self.call_command(*ocd_ids)
+        Division.objects.all().delete()
+
+        output = self.call_command(offline=True, refresh_older_than=0)
+
+        self.assertIn("Fetched 6 of 6 divisions and created 6 officials",
+            output)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertEqual(Official.objects.count(), 6)
+
+    def test_create_missing_division(self):
+        output = self.call_command("ocd-division/country:us/state:ky/cd:1",
+            "ocd-division/country:us/state:ky/cd:99")
+
+        self.assertIn("Fetched 1 of 2 divisions and created 1 officials",
+            output)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryMetricsMiddlewareTestCase(TestCase):
+    def setUp(self):
+        create_us_rep("Harold Rogers", 5)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'O''Hara'"),
+            "SELECT * FROM t WHERE id = ? AND name = ?")
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3)"),
+            fingerprint("SELECT * FROM t WHERE id IN (4)"))
+
+    @override_settings(DEBUG=True)
+    def test_headers(self):
+        response = self.client.get('/meetings/')
+
+        self.assertEqual(response['X-Query-View'], 'index')
+        self.assertEqual(response['X-Query-Count'], '2')
+        self.assertEqual(response['X-Query-Duplicates'], '0')
+        self.assertIn('X-Query-DB-Time', response)
+        self.assertIn('X-Query-Render-Time', response)
+
+    def test_no_headers(self):
+        response = self.client.get('/meetings/')
+        self.assertNotIn('X-Query-Count', response)
+
+    def test_log(self):
+        with self.assertLogs('meetings.middleware', 'INFO') as logs:
+            self.client.get('/api/v1/officials/')
+
+        metrics = json.loads(logs.records[0].getMessage())
+        self.assertEqual(metrics['view'], 'api_official_list')
+        self.assertEqual(metrics['queries'], 4)
+        self.assertEqual(metrics['duplicate_fingerprints'], [])
+
+    @override_settings(QUERY_BUDGETS={'index': {'queries': 0}})
+    def test_budget_enforced(self):
+        # The exception is also logged as a server error
+        with self.assertRaises(QueryBudgetExceeded), \
+                self.assertLogs('django.request', 'ERROR'):
+            self.client.get('/meetings/')
+
+    @override_settings(QUERY_BUDGETS={'index': {'queries': 0}},
+        QUERY_BUDGETS_ENFORCED=False, QUERY_METRICS_SAMPLE_RATE=1)
+    def test_budget_warning(self):
+        with self.assertLogs('meetings.middleware', 'WARNING') as logs:
+            response = self.client.get('/meetings/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(logs.output, [
+            "WARNING:meetings.middleware:GET index went over its budget: "
+            "queries 2 > 0",
+        ])
+
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=False,
+        QUERY_METRICS_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        connection.force_debug_cursor = False
+        with mock.patch('meetings.middleware.logger') as logger:
+            response = self.client.get('/meetings/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(logger.info.called)
+        self.assertFalse(connection.force_debug_cursor)
+
+    def test_streaming(self):
+        with self.assertLogs('meetings.middleware', 'INFO') as logs:
+            response = self.client.get('/api/v1/officials/export/')
+            self.assertEqual(logs.output, [])
+            b''.join(response.streaming_content)
+
+        metrics = json.loads(logs.records[0].getMessage())
+        self.assertEqual(metrics['view'], 'api_official_export')
+        self.assertEqual(metrics['queries'], 4)
+
+    @override_settings(QUERY_BUDGETS={'api_official_export': {'queries': 0}})
+    def test_streaming_budget_enforced(self):
+        response = self.client.get('/api/v1/officials/export/')
+        with self.assertRaises(QueryBudgetExceeded):
+            b''.join(response.streaming_content)
+
+
+class BenchmarkUtilsTestCase(TestCase):
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 90), 5)
+        self.assertEqual(percentile(values, 0), 1)
+
+    def test_compare(self):
+        baseline = {'p50': 10.0, 'queries': 4}
+
+        self.assertEqual(compare({'p50': 11.0, 'queries': 4}, baseline),
+            (10.0, []))
+        self.assertEqual(compare({'p50': 15.0, 'queries': 5}, baseline),
+            (50.0, ["p50 +50%", "queries 4 -> 5"]))
+        self.assertEqual(compare({'p50': 1.0, 'queries': 4}, None),
+            (None, []))
+
+        # Small absolute changes in fast scenarios are noise
+        change, regressions = compare({'p50': 0.8, 'queries': 1},
+            {'p50': 0.4, 'queries': 1})
+        self.assertEqual(regressions, [])
@@ -4,9 +4,17 @@ from . import views
 
 urlpatterns = [
     url(r'^$', views.OfficialListView.as_view(), name='index'),
+    url(r'^search/$', views.SearchView.as_view(), name='search'),
+    url(r'^meetings\.ics$', views.MeetingFeedView.as_view(),
+        name='meetings-feed'),
+    url(r'^states/(?P<state>[a-z]{2})/meetings\.ics$',
+        views.StateMeetingFeedView.as_view(), name='state-meetings-feed'),
     url(r'^officials/(?P<pk>\d+)-(?P<slug>[a-z0-9\-]+)/$',
         views.OfficialDetailView.as_view(), name='official-detail'),
     url(r'^officials/(?P<pk>\d+)-(?P<slug>[a-z0-9\-]+)/add-meeting/$',
         views.MeetingCreateView.as_view(), name='add-meeting'),
+    url(r'^officials/(?P<pk>\d+)-(?P<slug>[a-z0-9\-]+)/meetings\.ics$',
+        views.OfficialMeetingFeedView.as_view(),
+        name='official-meetings-feed'),
     url(r'^call-us-rep/', views.CallUsRepView.as_view(), name='call-us-rep'),
 ]
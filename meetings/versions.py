@@ -0,0 +1,150 @@
+"""
+Version tokens for data that's cached or served with conditional responses
+
+A version changes every time the data it covers is saved or deleted.
+Cached content is stored under keys that include the version, so
+changing the version makes stale content unreachable instead of having
+to find and delete it.
+
+Versions are stored as ``DataVersion`` rows rather than in the cache.  A
+version that was evicted from the cache would be replaced by a new one,
+changing ETags and missing cached content without any change to the
+data.
+
+"""
+import math
+import time
+import uuid
+
+from django.db import IntegrityError, transaction
+
+DATA_VERSION_KEY = 'meetings:data-version'
+
+OFFICIAL_VERSION_KEY = 'meetings:official-version:{}'
+
+
+def _new_version():
+    # The timestamp lets a version double as a last modified time.  The
+    # random part keeps versions unique even if two are created within
+    # the same millisecond.
+    return "{:d}-{}".format(int(time.time() * 1000), uuid.uuid4().hex[:8])
+
+
+def _create_versions(keys):
+    """Store new versions at keys that don't have one yet"""
+    # Imported here because the models' query sets import this module
+    from .models import DataVersion
+
+    versions = {key: _new_version() for key in keys}
+    try:
+        with transaction.atomic():
+            DataVersion.objects.bulk_create(
+                DataVersion(key=key, version=version)
+                for key, version in versions.items())
+    except IntegrityError:
+        # Another request created some of them first
+        for key in keys:
+            versions[key] = DataVersion.objects.get_or_create(key=key,
+                defaults={'version': versions[key]})[0].version
+
+    return versions
+
+
+def get_version(key):
+    """Get the current version stored at a key, creating it if needed"""
+    return get_versions([key])[key]
+
+
+def get_versions(keys):
+    """
+    Get the current versions stored at keys, creating them if needed
+
+    Returns:
+        Dictionary of versions keyed by key.
+
+    """
+    from .models import DataVersion
+
+    versions = dict(DataVersion.objects.filter(key__in=keys)
+        .values_list('key', 'version'))
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        versions.update(_create_versions(missing))
+
+    return versions
+
+
+def bump_version(key):
+    """Replace the version stored at a key with a new one"""
+    return bump_versions([key])
+
+
+def bump_versions(keys):
+    """
+    Replace the versions stored at keys with a new one
+
+    Returns:
+        The new version.
+
+    """
+    from .models import DataVersion
+
+    version = _new_version()
+    updated = DataVersion.objects.filter(key__in=keys)\
+        .update(version=version)
+    if updated < len(keys):
+        existing = set(DataVersion.objects.filter(key__in=keys)
+            .values_list('key', flat=True))
+        _create_versions([key for key in keys if key not in existing])
+
+    return version
+
+
+def get_last_modified(version):
+    """
+    Get the time at which a version was created
+
+    Returns:
+        Seconds since the epoch, rounded up so the time is never before
+        the change that created the version.
+
+    """
+    milliseconds = int(version.split('-')[0])
+    return int(math.ceil(milliseconds / 1000))
+
+
+def get_data_version():
+    """Get the version of all the data about officials and meetings"""
+    return get_version(DATA_VERSION_KEY)
+
+
+def bump_data_version(official_ids=()):
+    """
+    Replace the version of all the data with a new one
+
+    The versions of the data of the officials in ``official_ids`` are
+    replaced in the same query.
+
+    """
+    return bump_versions([DATA_VERSION_KEY] +
+        [OFFICIAL_VERSION_KEY.format(pk) for pk in official_ids])
+
+
+def get_official_versions(official_ids):
+    """
+    Get the versions of the data shown on the pages of officials
+
+    The versions of all the officials are read at once.
+
+    Returns:
+        Dictionary of versions keyed by official ID.
+
+    """
+    keys = {OFFICIAL_VERSION_KEY.format(pk): pk for pk in official_ids}
+    versions = get_versions(list(keys))
+    return {pk: versions[key] for key, pk in keys.items()}
+
+
+def bump_official_versions(official_ids):
+    """Replace the versions of officials' data with new ones"""
+    bump_versions([OFFICIAL_VERSION_KEY.format(pk) for pk in official_ids])
@@ -1,19 +1,34 @@
-from datetime import datetime
+import calendar
+from datetime import datetime, timedelta
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.core.exceptions import ImproperlyConfigured
-from django.http import HttpResponseRedirect
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django.utils.encoding import force_text
+from django.utils.http import http_date, quote_etag
 from django.utils.translation import ugettext_lazy as _
-from django.views.generic import DetailView, ListView, CreateView
+from django.views.generic import DetailView, ListView, CreateView, View
 from django.views.generic.base import ContextMixin, TemplateResponseMixin
 from django.views.generic.edit import ProcessFormView
 
-from .forms import (ContactAttemptForm, MeetingForm, OfficialMeetingInfoForm,
-    SourceFormSet)
-from .models import Meeting, Official
+from .bulk import create_meetings
+from .forms import (ContactAttemptForm, MeetingForm, OfficialMeetingForm,
+    OfficialMeetingInfoForm, SourceFormSet)
+from .ical import escape, format_date, format_date_time, write_calendar
+from .models import (ContactAttempt, Meeting, Official, OfficialSummary,
+    RepresentativeClaim)
+from .search import search
+from .signals import defer_updates
+from .versions import (bump_data_version, get_data_version,
+    get_last_modified, get_official_versions)
 
 
 class MeetingCreateView(LoginRequiredMixin, CreateView):
@@ -70,21 +85,233 @@ class OfficialDetailView(LoginRequiredMixin, DetailView):
     model = Official
     context_object_name = 'official'
 
+    # Relations used by each cached fragment of the template
+    fragment_prefetches = {
+        'official_contact_information': ('phones', 'emails', 'urls',
+            'channels'),
+        'official_meetings': (
+            Prefetch('meetings', queryset=Meeting.objects.order_by('date')),
+        ),
+        'official_contact_attempts': (
+            Prefetch('contact_attempts',
+                queryset=ContactAttempt.objects.order_by('datetime')),
+        ),
+    }
+
+    def get_queryset(self):
+        return Official.objects.select_related('office')
+
+    def get_object(self, queryset=None):
+        official = super(OfficialDetailView, self).get_object(queryset)
+        # Cached fragments of the page are keyed by this version
+        official.data_version = get_official_versions([official.pk])[
+            official.pk]
+        self.load_related(official)
+        return official
+
+    def load_related(self, official):
+        """
+        Load the relations used by the fragments of the page that aren't cached
+
+        Rendering the page takes the same number of queries no matter how
+        many meetings, contact attempts or contact details the official has,
+        and none for the fragments that are cached.
+
+        """
+        keys = {
+            make_template_fragment_key(name,
+                [official.pk, official.data_version]): name
+            for name in self.fragment_prefetches
+        }
+        cached = cache.get_many(list(keys))
+        prefetch_related_objects([official], *[
+            lookup
+            for key, name in keys.items() if key not in cached
+            for lookup in self.fragment_prefetches[name]
+        ])
+
 
 class OfficialListView(ListView):
     model = Official
     context_object_name = 'officials'
 
     def get_queryset(self):
-        qs = Official.objects.all()
+        qs = Official.objects.select_related('office__division', 'summary')
 
         without_meetings_since = self.request.GET.get('without_meetings_since')
         if without_meetings_since is not None:
-            since_date = datetime.strptime(without_meetings_since, '%Y-%m-%d')
+            since_date = datetime.strptime(without_meetings_since,
+                '%Y-%m-%d').date()
             qs = qs.without_meetings_since(since_date)
 
         return qs.order_by('office__division__name')
 
+    def get_context_data(self, **kwargs):
+        context = super(OfficialListView, self).get_context_data(**kwargs)
+
+        # Cached rows of the list are keyed by these versions
+        officials = context['officials']
+        versions = get_official_versions([o.pk for o in officials])
+        for official in officials:
+            official.data_version = versions[official.pk]
+
+        return context
+
+
+class SearchView(ListView):
+    """Officials and meetings matching a search query, best matches first"""
+    template_name = 'meetings/search.html'
+    context_object_name = 'results'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return search(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super(SearchView, self).get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+class MeetingFeedView(View):
+    """
+    iCalendar feed of meetings
+
+    Calendar apps poll feeds often, so generated feeds are cached under
+    keys that include the version of the data they're built from, and
+    responses have an ETag and a Last-Modified time.  Polls whose
+    validators match get a 304 response without generating the feed.  The
+    only query they run is the one in ``check_exists()``, if any.
+
+    Feeds only include meetings from the last ``past_days`` days onward,
+    so the validators also change once a day.
+
+    """
+    # Number of seconds to cache generated feeds
+    cache_timeout = 60 * 60 * 24
+
+    # Number of days before today of the earliest meetings in the feed
+    past_days = 90
+
+    def check_exists(self):
+        """
+        Raise ``Http404`` if there's no feed at the requested URL
+
+        This is called before the feed's version or cached content are
+        looked up, so requests for missing feeds don't add entries to the
+        cache.
+
+        """
+
+    def get_version(self):
+        """Get the version of the data in the feed"""
+        return get_data_version()
+
+    def get_meetings(self):
+        return Meeting.objects.all()
+
+    def get_calendar_name(self):
+        return _("Public meetings")
+
+    def get_event(self, meeting, dtstamp):
+        """Get the properties of a meeting's event"""
+        official = meeting.official
+        properties = [
+            ('UID', 'meeting-{}@{}'.format(meeting.pk,
+                self.request.get_host())),
+            ('DTSTAMP', dtstamp),
+        ]
+
+        if meeting.time is not None:
+            properties.append(('DTSTART', format_date_time(
+                datetime.combine(meeting.date, meeting.time))))
+        else:
+            properties.append(('DTSTART;VALUE=DATE',
+                format_date(meeting.date)))
+
+        properties.append(('SUMMARY', escape("{}: {}".format(official.name,
+            meeting.get_meeting_type_display() or _("Public meeting")))))
+
+        if meeting.location:
+            properties.append(('LOCATION', escape(meeting.location)))
+
+        if meeting.event_website:
+            properties.append(('URL', meeting.event_website))
+
+        properties.append(('X-OFFICIAL',
+            escape(official.office.division.ocd_id)))
+
+        return properties
+
+    def write_feed(self, since, last_modified):
+        meetings = self.get_meetings().filter(date__gte=since)\
+            .select_related('official__office__division')\
+            .order_by('date', 'time', 'pk')
+        dtstamp = format_date_time(
+            datetime.utcfromtimestamp(last_modified)) + 'Z'
+        events = (self.get_event(meeting, dtstamp)
+                  for meeting in meetings.iterator())
+        return ''.join(write_calendar(self.get_calendar_name(), events))
+
+    def get(self, request, *args, **kwargs):
+        self.check_exists()
+        today = datetime.utcnow().date()
+        since = today - timedelta(days=self.past_days)
+        version = self.get_version()
+        etag = "{}-{}".format(version, since.strftime('%Y%m%d'))
+        last_modified = max(get_last_modified(version),
+            calendar.timegm(today.timetuple()))
+
+        response = get_conditional_response(request, etag=etag,
+            last_modified=last_modified)
+        if response is None:
+            cache_key = 'meetings:feed:{}:{}'.format(request.path, etag)
+            content = cache.get(cache_key)
+            if content is None:
+                content = self.write_feed(since, last_modified)
+                cache.set(cache_key, content, self.cache_timeout)
+
+            response = HttpResponse(content,
+                content_type='text/calendar; charset=utf-8')
+
+        response['ETag'] = quote_etag(etag)
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class OfficialMeetingFeedView(MeetingFeedView):
+    """iCalendar feed of an official's meetings"""
+
+    def check_exists(self):
+        self.official = get_object_or_404(Official.objects.only('name'),
+            pk=self.kwargs['pk'])
+
+    def get_version(self):
+        return get_official_versions([self.official.pk])[self.official.pk]
+
+    def get_meetings(self):
+        return self.official.meetings.all()
+
+    def get_calendar_name(self):
+        return _("Public meetings with {name}").format(
+            name=self.official.name)
+
+
+class StateMeetingFeedView(MeetingFeedView):
+    """iCalendar feed of the meetings of officials in a state"""
+
+    def check_exists(self):
+        if not Official.objects.in_state(self.kwargs['state']).exists():
+            raise Http404("No officials in this state")
+
+    def get_meetings(self):
+        return Meeting.objects.filter(
+            official__office__division__state=self.kwargs['state'])
+
+    def get_calendar_name(self):
+        return _("Public meetings in {state}").format(
+            state=self.kwargs['state'].upper())
+
 
 class MultipleFormsMixin(ContextMixin):
     """
@@ -194,8 +421,8 @@ class CallUsRepView(LoginRequiredMixin, MultipleFormsView):
     template_name = "meetings/call_us_rep.html"
 
     form_classes = {
-        'next_meeting': MeetingForm,
-        'last_meeting': MeetingForm,
+        'next_meeting': OfficialMeetingForm,
+        'last_meeting': OfficialMeetingForm,
         'contact_attempt': ContactAttemptForm,
         'meeting_info_source': OfficialMeetingInfoForm,
     }
@@ -203,24 +430,40 @@ class CallUsRepView(LoginRequiredMixin, MultipleFormsView):
     def get_success_url(self):
         return reverse('call-us-rep')
 
-    def get_representative(self):
+    def get_candidates(self):
         return Official.objects.us_reps()\
             .without_meetings()\
-            .without_contact_attempts()\
-            .order_by('?')\
-            .first()
+            .without_contact_attempts()
+
+    def get_representative(self):
+        # Representatives are leased to volunteers so that volunteers who
+        # load this page at the same time call different offices
+        claim = RepresentativeClaim.objects.claim(self.get_candidates(),
+            self.request.user)
+        return claim.official if claim is not None else None
+
+    def get_submitted_representative(self):
+        """
+        Get the representative that the submitted form was shown for
+
+        The form carries the representative's ID, so the submission is
+        saved for the representative the volunteer contacted, even if their
+        claim has expired.
+
+        """
+        pk = self.request.POST.get('representative', '')
+        if not pk.isdigit():
+            raise Http404("No representative was submitted")
+
+        return get_object_or_404(
+            Official.objects.us_reps().select_related('office__division'),
+            pk=pk)
 
     def get_initial(self, prefix=None):
         if prefix == 'contact_attempt':
             return {
-                'official': self._representative,
-                'user': self._user,
                 'method': 'phone',
             }
-        elif prefix in ('next_meeting', 'last_meeting'):
-            return {
-                'official': self._representative,
-            }
 
     def get_context_data(self, **kwargs):
         context = super(CallUsRepView, self).get_context_data(**kwargs)
@@ -240,27 +483,45 @@ class CallUsRepView(LoginRequiredMixin, MultipleFormsView):
         return super(CallUsRepView, self).get(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        self._representative = self.get_representative()
+        self._representative = self.get_submitted_representative()
         self._user = request.user
 
         form_classes = self.get_form_classes()
         forms = self.get_forms(form_classes)
         if all([form.is_valid() for form in forms.values()]):
-            forms['contact_attempt'].save()
+            # Save everything or nothing.  The summary, search entries and
+            # versions are updated once at the end rather than after each
+            # save.
+            with transaction.atomic(), defer_updates():
+                forms['contact_attempt'].save()
+
+                # Only save the field that's on the form, so the official's
+                # summary and search entry aren't recomputed
+                if forms['meeting_info_source'].has_changed():
+                    official = forms['meeting_info_source'].save(commit=False)
+                    official.save(update_fields=['meeting_info_source'])
+
+                RepresentativeClaim.objects.release(self._representative,
+                    request.user)
+
+                meetings = [forms[prefix].save(commit=False)
+                            for prefix in ('next_meeting', 'last_meeting')
+                            if forms[prefix].cleaned_data['date']]
+                if meetings:
+                    # This also updates the summary, search entries and
+                    # versions
+                    create_meetings(meetings, [[] for meeting in meetings])
+                else:
+                    OfficialSummary.objects.refresh(
+                        [self._representative.pk], bump=False)
+                    bump_data_version([self._representative.pk])
+
             msg = _("You contacted {representative_name}.  Thanks! "
                     "You can contact another representative using "
                     "the form below.").format(
                 representative_name=self._representative.name)
             messages.add_message(request, messages.SUCCESS, msg)
 
-            if forms['next_meeting'].cleaned_data['date']:
-                forms['next_meeting'].save()
-
-            if forms['last_meeting'].cleaned_data['date']:
-                forms['last_meeting'].save()
-
-            forms['meeting_info_source'].save()
-
             return self.forms_valid(forms)
         else:
             return self.forms_invalid(forms)
@@ -270,5 +531,10 @@ class CallUsRepView(LoginRequiredMixin, MultipleFormsView):
 
         if prefix == 'meeting_info_source':
             kwargs['instance'] = self._representative
+        elif prefix == 'contact_attempt':
+            kwargs['instance'] = ContactAttempt(
+                official=self._representative, user=self._user)
+        elif prefix in ('next_meeting', 'last_meeting'):
+            kwargs['instance'] = Meeting(official=self._representative)
 
         return kwargs
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/1.10/ref/settings/
 """
 
 import os
+import tempfile
 from urllib.parse import urlparse
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'meetings.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +58,29 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'publicmeetings.urls'
 
+# Maximum number of queries, duplicate queries and milliseconds spent in the
+# database for requests handled by each URL pattern.  Requests that go over
+# budget are logged as warnings and fail the tests.  See
+# meetings.middleware.
+QUERY_BUDGETS = {
+    'index': {'queries': 2, 'duplicates': 0},
+    'search': {'queries': 3, 'duplicates': 0},
+    'official-detail': {'queries': 10, 'duplicates': 0},
+    'call-us-rep': {'queries': 26, 'duplicates': 0},
+    'meetings-feed': {'queries': 2, 'duplicates': 0},
+    'state-meetings-feed': {'queries': 3, 'duplicates': 0},
+    'official-meetings-feed': {'queries': 3, 'duplicates': 0},
+    'api_official_list': {'queries': 7, 'duplicates': 0},
+    'api-search': {'queries': 2, 'duplicates': 0},
+}
+
+# Fraction of requests whose queries are measured when not in debug mode.
+# See meetings.middleware.
+QUERY_METRICS_SAMPLE_RATE = float(
+    os.environ.get('QUERY_METRICS_SAMPLE_RATE', 0.01))
+
+TEST_RUNNER = 'meetings.testrunner.BudgetEnforcingTestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -90,6 +115,10 @@ LOGGING = {
             'handlers': ['console'],
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
         },
+        'meetings': {
+            'handlers': ['console'],
+            'level': os.getenv('MEETINGS_LOG_LEVEL', 'INFO'),
+        },
     },
 }
 
@@ -142,6 +171,30 @@ DATABASES = {
     'default': get_database_config(os.environ.get('DATABASE_URL')),
 }
 
+# Cache
+# https://docs.djangoproject.com/en/1.10/topics/cache/
+
+# Cached data is invalidated by changing version tokens that are stored in
+# the database (see meetings.versions), so entries can be culled or the
+# cache cleared without changing ETags or serving stale content.  Sharing
+# one cache between the processes serving the site saves rendering the
+# same content in each of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'publicmeetings_cache')),
+        'OPTIONS': {
+            # Each official has a row of the officials list and three
+            # sections of their page in the cache.  When the cache is full,
+            # a third of its entries are culled, so it needs room for
+            # several times as many entries as there are officials.
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 5000)),
+        },
+    }
+}
+
 AUTHENTICATION_BACKENDS = (
     'nopassword.backends.email.EmailBackend',
 )
@@ -191,6 +244,19 @@ STATICFILES_STORAGE = 'whitenoise.django.GzipManifestStaticFilesStorage'
 
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 
+# Directory where raw responses from the Google Civic Information API are
+# cached
+CIVIC_INFO_CACHE_DIR = os.environ.get('CIVIC_INFO_CACHE_DIR',
+    os.path.join(BASE_DIR, '.civicinfo_cache'))
+
+# Number of days after which cached Civic Information API responses are
+# fetched again
+CIVIC_INFO_CACHE_TTL = int(os.environ.get('CIVIC_INFO_CACHE_TTL', 30))
+
+# Number of minutes a volunteer on the call page has to contact a
+# representative before the representative can be given to someone else
+REPRESENTATIVE_CLAIM_TTL = int(os.environ.get('REPRESENTATIVE_CLAIM_TTL', 10))
+
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
@@ -16,10 +16,13 @@ Including another URLconf
 from django.conf.urls import include, url
 from django.contrib import admin
 
-from meetings.api import OfficialResource
+from meetings.api import MeetingBatchResource, OfficialResource, SearchResource
 
 urlpatterns = [
     url(r'^api/v1/officials/', include(OfficialResource.urls())),
+    url(r'^api/v1/search/?$', SearchResource.as_list(), name='api-search'),
+    url(r'^api/v1/meetings/batch/?$', MeetingBatchResource.as_list(),
+        name='api-meeting-batch'),
     url(r'^meetings/', include('meetings.urls')),
     url(r'^admin/', admin.site.urls),
     url(r'^accounts/', include('nopassword.urls', namespace='nopassword')),